@@ -35,6 +35,10 @@ class OptimizationStrategy(Model):
     target_apy: float
     estimated_gas_cost: float
     timestamp: int
+    # Position risk, so non-urgent plans can wait for a gas trough
+    risk_level: Optional[str] = None
+    health_factor: Optional[float] = None
+    predicted_liquidation_time: Optional[int] = None
 
 
 class ExecutionPlan(Model):
@@ -21,6 +21,9 @@ except ImportError:
     HYPERON_AVAILABLE = False
     logger.warning("⚠️  Hyperon not available - using fallback logic")
 
+# Score points deducted per protocol risk point above 1 (risk 10/10 = -18)
+PROTOCOL_RISK_PENALTY = 2.0
+
 
 class MeTTaReasoner:
     """
@@ -486,6 +489,7 @@ class MeTTaReasoner:
             urgency: Urgency score (0-10) or string ('low', 'medium', 'high')
             market_trend: Market trend (crash, declining, stable, rising)
             available_strategies: List of available target protocols
+                (an optional 'protocol_risk' 1-10 lowers a strategy's score)
 
         Returns:
             Optimal strategy with reasoning
@@ -517,6 +521,9 @@ class MeTTaReasoner:
                 urgency,
                 amount
             )
+            protocol_risk = target.get('protocol_risk')
+            if protocol_risk is not None:
+                score = max(0.0, score - PROTOCOL_RISK_PENALTY * (protocol_risk - 1))
 
             # Select execution method
             execution_method = self.select_execution_method(
@@ -540,6 +547,7 @@ class MeTTaReasoner:
                 "execution_cost": target.get('execution_cost', 50.0),
                 "break_even_months": profitability['break_even_months'],
                 "strategy_score": score,
+                "protocol_risk": protocol_risk,
                 "execution_method": execution_method,
                 "is_profitable": True,
                 "confidence": min(100, score)
@@ -15,8 +15,13 @@ NO MOCK DATA - ALL REAL:
 
 from agents.metta_reasoner import get_metta_reasoner
 from data.ethereum_tokens import get_token_symbol
+from data.token_registry import get_token_registry
 from data.price_feeds import get_price_feed_manager
+from data.price_stream import PriceStream
 from data.subgraph_fetcher import get_subgraph_fetcher
+from data.http_client import get_http_client, close_http_client
+from data.request_scheduler import (
+    Priority, get_request_scheduler, request_priority, with_priority)
 from agents.message_protocols import (
     PositionAlert,
     PresentationTrigger,
@@ -54,6 +59,9 @@ CRITICAL_HF = float(os.getenv('CRITICAL_HEALTH_FACTOR', '1.3'))
 MODERATE_HF = float(os.getenv('MODERATE_HEALTH_FACTOR', '1.5'))
 SAFE_HF = float(os.getenv('SAFE_HEALTH_FACTOR', '1.8'))
 
+# Re-check positions immediately when a streamed price moves this much (%)
+PRICE_DEVIATION_ALERT_PCT = float(os.getenv('PRICE_DEVIATION_ALERT_PCT', '1.0'))
+
 # Alert cooldown (prevent spam)
 ALERT_COOLDOWN_SECONDS = 300  # 5 minutes
 
@@ -81,6 +89,7 @@ class PositionMonitorAgent:
         self.subgraph_fetcher = get_subgraph_fetcher()
         self.price_manager = get_price_feed_manager()
         self.metta_reasoner = get_metta_reasoner()
+        self.price_stream = PriceStream(self.price_manager)
 
         # State
         self.positions: Dict[str, Dict] = {}
@@ -92,6 +101,7 @@ class PositionMonitorAgent:
         # Demo state tracking (for presentation)
         self.demo_status: Dict[str, Dict] = {}  # position_id -> status info
         self._pending_demo_alert = None  # Stores alert to be sent in next cycle
+        self._ctx = None  # Agent context for alerts raised by price callbacks
 
         # Setup
         self._start_http_server()
@@ -142,7 +152,8 @@ class PositionMonitorAgent:
                         'status': 'online',
                         'positions_monitored': len(agent_instance.positions),
                         'alerts_sent': len(agent_instance.alerted_positions),
-                        'address': str(agent_instance.agent.address)
+                        'address': str(agent_instance.agent.address),
+                        'upstreams': get_request_scheduler().get_stats()
                     }
                     self.wfile.write(json.dumps(response).encode())
 
@@ -159,15 +170,21 @@ class PositionMonitorAgent:
                         import asyncio
                         loop = asyncio.new_event_loop()
 
+                        def read_price(token):
+                            # Memory read first; only fetch tokens never priced
+                            cached = agent_instance.price_manager.get_price_with_age(
+                                token)
+                            if cached:
+                                return cached[0]
+                            # Dashboard reads queue behind position monitoring
+                            with request_priority(Priority.BACKGROUND):
+                                return loop.run_until_complete(
+                                    agent_instance.price_manager.get_token_price(token))
+
                         try:
-                            collateral_price = loop.run_until_complete(
-                                agent_instance.price_manager.get_token_price(
-                                    pos['collateral_token'])
-                            )
-                            debt_price = loop.run_until_complete(
-                                agent_instance.price_manager.get_token_price(
-                                    pos['debt_token'])
-                            )
+                            collateral_price = read_price(
+                                pos['collateral_token'])
+                            debt_price = read_price(pos['debt_token'])
 
                             collateral_amount = pos['collateral_amount'] / 1e18
                             debt_amount = pos['debt_amount'] / 1e18
@@ -177,6 +194,9 @@ class PositionMonitorAgent:
                             collateral_usd = 0
                             debt_usd = 0
                         finally:
+                            # Release the pooled session bound to this throwaway loop
+                            loop.run_until_complete(
+                                get_http_client().close())
                             loop.close()
 
                         positions_list.append({
@@ -202,6 +222,42 @@ class PositionMonitorAgent:
                     }
                     self.wfile.write(json.dumps(response).encode())
 
+                elif self.path.startswith('/market/volatility'):
+                    # Rolling stats maintained incrementally by PriceFeedManager
+                    from urllib.parse import urlparse, parse_qs
+                    query = parse_qs(urlparse(self.path).query)
+                    token = query.get('token', ['WETH'])[0]
+                    # Frontend passes CoinGecko ids (ethereum, bitcoin, ...)
+                    known = get_token_registry().get(token)
+                    symbol = known['symbol'] if known else token.upper()
+
+                    stats = agent_instance.price_manager.get_price_stats(symbol)
+                    if stats and stats['volatility_24h'] is not None:
+                        self.send_response(200)
+                        response = {'success': True, **stats}
+                    else:
+                        self.send_response(404)
+                        response = {
+                            'success': False,
+                            'error': f'Not enough price history for {symbol}'
+                        }
+                    self.send_header('Content-type', 'application/json')
+                    self.send_header('Access-Control-Allow-Origin', '*')
+                    self.end_headers()
+                    self.wfile.write(json.dumps(response).encode())
+
+                elif self.path == '/market/correlation':
+                    self.send_response(200)
+                    self.send_header('Content-type', 'application/json')
+                    self.send_header('Access-Control-Allow-Origin', '*')
+                    self.end_headers()
+                    response = {
+                        'success': True,
+                        'matrix': agent_instance.price_manager.get_correlation_matrix(),
+                        'timestamp': int(time.time() * 1000)
+                    }
+                    self.wfile.write(json.dumps(response).encode())
+
                 elif self.path == '/demo/positions':
                     # DEMO POSITIONS ENDPOINT - Returns curated scenarios for presentation
                     self.send_response(200)
@@ -507,6 +563,22 @@ class PositionMonitorAgent:
             logger.info("   Using real CoinGecko prices")
             logger.info("   Sending alerts to Yield Optimizer")
 
+            # Keep collateral/debt prices warm so position checks never block
+            self.price_manager.start_background_refresh()
+
+            # React to streamed price moves instead of waiting for the next cycle
+            self._ctx = ctx
+            self.price_manager.subscribe_deviation(
+                None, PRICE_DEVIATION_ALERT_PCT, self._on_price_deviation)
+            self.price_stream.start()
+
+        @self.agent.on_event("shutdown")
+        async def shutdown(ctx: Context):
+            await self.price_stream.stop()
+            await self.price_manager.stop_background_refresh()
+            self.price_manager.stop_recording()
+            await close_http_client()
+
         @self.agent.on_interval(period=30.0)
         async def monitor_positions(ctx: Context):
             """AUTONOMOUS: Fetch from subgraph and check all positions every 30s"""
@@ -597,7 +669,7 @@ class PositionMonitorAgent:
                                 logger.info(
                                     f"  Mapped to: {collateral_token} / {debt_token}")
 
-                                # Store position (even with UNKNOWN tokens - will use fallback prices)
+                                # Store position (unlisted tokens keep their address as symbol and are priced by contract address)
                                 self.positions[user_id] = {
                                     'position_id': pos['id'],
                                     'protocol': 'aave-v3',
@@ -611,6 +683,8 @@ class PositionMonitorAgent:
                                     'health_factor': health_factor,
                                     'last_updated': pos['updatedAt']
                                 }
+                                self.price_manager.add_hot_tokens(
+                                    [collateral_token, debt_token])
                                 loaded_count += 1
 
                             except Exception as parse_error:
@@ -721,6 +795,31 @@ class PositionMonitorAgent:
                 'message': msg.message
             })
 
+    async def _on_price_deviation(
+        self,
+        token: str,
+        old_price: float,
+        new_price: float,
+        change_pct: float
+    ):
+        """Re-evaluate positions collateralised by a token that just moved"""
+        if self._ctx is None:
+            return
+
+        affected = [
+            (user_address, position_data)
+            for user_address, position_data in list(self.positions.items())
+            if position_data['collateral_token'] == token
+        ]
+        if not affected:
+            return
+
+        logger.warning(
+            f"⚡ {token} moved {change_pct:+.2f}% - re-checking {len(affected)} positions now")
+        for user_address, position_data in affected:
+            await self._check_position(self._ctx, user_address, position_data)
+
+    @with_priority(Priority.CRITICAL)
     async def _check_position(self, ctx: Context, user_address: str, position_data: Dict):
         """Check a single position and send alert if risky"""
         try:
@@ -744,13 +843,21 @@ class PositionMonitorAgent:
             health_factor = (collateral_value * liquidation_threshold) / \
                 debt_value if debt_value > 0 else 999.0
 
-            # MeTTa risk assessment
+            # MeTTa risk assessment (volatility/trend from recorded price history)
+            risk_inputs = {}
+            price_stats = self.price_manager.get_price_stats(
+                position_data['collateral_token'])
+            if price_stats and price_stats['volatility_24h'] is not None:
+                risk_inputs['volatility'] = price_stats['volatility_24h'] * 100
+                risk_inputs['market_trend'] = 'declining' if price_stats['trend'] == 'down' else 'rising'
+
             metta_risk = self.metta_reasoner.assess_risk(
                 health_factor=health_factor,
                 collateral_usd=collateral_value,
                 debt_usd=debt_value,
                 collateral_token=position_data['collateral_token'],
-                debt_token=position_data['debt_token']
+                debt_token=position_data['debt_token'],
+                **risk_inputs
             )
 
             risk_level = metta_risk.get('risk_level', 'moderate')
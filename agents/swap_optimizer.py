@@ -13,6 +13,12 @@ NO MOCK DATA - ALL REAL:
 - Real token prices and slippage calculations
 """
 
+from data.execution_scheduler import get_execution_scheduler
+from data.gas_estimator import get_gas_estimator
+from data.http_client import get_http_session, close_http_client
+from data.request_scheduler import (
+    RateLimitedError, get_request_scheduler, retry_after_seconds)
+from data.token_registry import get_token_registry
 from agents.message_protocols import (
     OptimizationStrategy,
     ExecutionPlan,
@@ -75,6 +81,11 @@ class SwapOptimizerAgent:
             endpoint=[f"http://localhost:{AGENT_PORT}/submit"]
         )
 
+        # Cached per-chain operation costs (USD)
+        self.gas_estimator = get_gas_estimator()
+        # Holds non-urgent plans until gas is cheap (or their deadline)
+        self.execution_scheduler = get_execution_scheduler()
+
         # State
         self.message_history: list = []
         self.routes_calculated = 0
@@ -127,7 +138,10 @@ class SwapOptimizerAgent:
                     response = {
                         'status': 'online',
                         'routes_calculated': agent_instance.routes_calculated,
-                        'address': str(agent_instance.agent.address)
+                        'address': str(agent_instance.agent.address),
+                        'upstreams': get_request_scheduler().get_stats(),
+                        'execution_scheduler': agent_instance.execution_scheduler.get_stats(),
+                        'deferred_plans': agent_instance.execution_scheduler.get_pending()
                     }
                     self.wfile.write(json.dumps(response).encode())
 
@@ -162,6 +176,12 @@ class SwapOptimizerAgent:
             logger.info(
                 "   Listening for OptimizationStrategy from Yield Optimizer")
             logger.info("   Using real 1inch Fusion+ API for swap routes")
+            self.gas_estimator.start_background_refresh()
+
+        @self.agent.on_event("shutdown")
+        async def shutdown(ctx: Context):
+            await self.gas_estimator.stop_background_refresh()
+            await close_http_client()
 
         @self.agent.on_message(model=OptimizationStrategy)
         async def handle_optimization_strategy(ctx: Context, sender: str, msg: OptimizationStrategy):
@@ -187,27 +207,29 @@ class SwapOptimizerAgent:
             execution_plan = await self._create_execution_plan(msg)
 
             if execution_plan:
-                # Send to Executor
-                await ctx.send(EXECUTOR_ADDRESS, execution_plan)
-                self.routes_calculated += 1
-
-                logger.success(f"✅ EXECUTION PLAN SENT to Executor")
-                logger.info(f"   Steps: {len(execution_plan.steps)}")
-                logger.info(
-                    f"   Total Gas: ${execution_plan.total_gas_cost:.4f}")
-
-                self._log_message('sent', 'ExecutionPlan', EXECUTOR_ADDRESS, {
-                    'position_id': msg.position_id,
-                    'steps': len(execution_plan.steps),
-                    'step_types': [step.get('type', 'unknown') for step in execution_plan.steps[:5]],  # Show first 5 step types
-                    'total_gas_cost': f"${execution_plan.total_gas_cost:.4f}",
-                    'estimated_duration': f"{execution_plan.estimated_completion_time}s",
-                    'target_protocol': msg.target_protocol,
-                    'target_chain': msg.target_chain
-                })
+                # Low-urgency plans wait for a gas trough (or their deadline)
+                if self.execution_scheduler.submit(
+                    execution_plan,
+                    risk_level=msg.risk_level,
+                    health_factor=msg.health_factor,
+                    predicted_liquidation_time=msg.predicted_liquidation_time
+                ):
+                    self._log_message('deferred', 'ExecutionPlan', EXECUTOR_ADDRESS, {
+                        'position_id': msg.position_id,
+                        'risk_level': msg.risk_level,
+                        'total_gas_cost': f"${execution_plan.total_gas_cost:.4f}"
+                    })
+                    return
+                await self._send_plan(ctx, execution_plan)
             else:
                 logger.error("❌ Failed to create execution plan")
 
+        @self.agent.on_interval(period=float(os.getenv('GAS_SCHEDULER_INTERVAL', '15')))
+        async def release_deferred_plans(ctx: Context):
+            """Send held plans whose gas trough or deadline arrived"""
+            for plan in self.execution_scheduler.due():
+                await self._send_plan(ctx, plan)
+
         @self.agent.on_message(model=HealthCheckRequest)
         async def handle_health_check(ctx: Context, sender: str, msg: HealthCheckRequest):
             """Respond to health checks"""
@@ -218,12 +240,33 @@ class SwapOptimizerAgent:
             )
             await ctx.send(sender, response)
 
+    async def _send_plan(self, ctx: Context, execution_plan: ExecutionPlan):
+        """Send an execution plan to the Executor"""
+        await ctx.send(EXECUTOR_ADDRESS, execution_plan)
+        self.routes_calculated += 1
+
+        logger.success(f"✅ EXECUTION PLAN SENT to Executor")
+        logger.info(f"   Steps: {len(execution_plan.steps)}")
+        logger.info(
+            f"   Total Gas: ${execution_plan.total_gas_cost:.4f}")
+
+        self._log_message('sent', 'ExecutionPlan', EXECUTOR_ADDRESS, {
+            'position_id': execution_plan.position_id,
+            'steps': len(execution_plan.steps),
+            'step_types': [step.get('type', 'unknown') for step in execution_plan.steps[:5]],  # Show first 5 step types
+            'total_gas_cost': f"${execution_plan.total_gas_cost:.4f}",
+            'estimated_duration': f"{execution_plan.estimated_completion_time}s",
+            'target_protocol': execution_plan.target_protocol,
+            'target_chain': execution_plan.target_chain
+        })
+
     async def _create_execution_plan(self, strategy: OptimizationStrategy) -> Optional[ExecutionPlan]:
         """Create execution plan using REAL 1inch Fusion+ API"""
 
         try:
             steps = []
             total_gas = 0.0
+            gas = self.gas_estimator
 
             # Step 1: Withdraw from current protocol (if needed)
             if strategy.debt_amount > 0:
@@ -234,9 +277,11 @@ class SwapOptimizerAgent:
                     'chain': strategy.current_chain,
                     'asset': strategy.debt_token,
                     'amount': strategy.debt_amount,
-                    'estimated_gas': 0.005
+                    'estimated_gas': gas.get_operation_cost(
+                        strategy.current_chain, 'repay',
+                        protocol=strategy.current_protocol, token=strategy.debt_token)
                 })
-                total_gas += 0.005
+                total_gas += steps[-1]['estimated_gas']
 
             # Withdraw collateral
             steps.append({
@@ -245,9 +290,11 @@ class SwapOptimizerAgent:
                 'chain': strategy.current_chain,
                 'asset': strategy.collateral_token,
                 'amount': strategy.collateral_amount,
-                'estimated_gas': 0.005
+                'estimated_gas': gas.get_operation_cost(
+                    strategy.current_chain, 'withdraw',
+                    protocol=strategy.current_protocol, token=strategy.collateral_token)
             })
-            total_gas += 0.005
+            total_gas += steps[-1]['estimated_gas']
 
             # Step 2: Swap tokens if needed (using 1inch Fusion+)
             swap_route = await self._get_1inch_swap_route(
@@ -278,9 +325,11 @@ class SwapOptimizerAgent:
                     'amount': strategy.collateral_amount,
                     'expected_output': strategy.collateral_amount * 0.99,  # 1% slippage estimate
                     'route': 'fallback_estimate',
-                    'estimated_gas': 0.01
+                    'estimated_gas': gas.get_operation_cost(
+                        strategy.current_chain, 'swap',
+                        protocol='uniswap', token=strategy.collateral_token)
                 })
-                total_gas += 0.01
+                total_gas += steps[-1]['estimated_gas']
 
             # Step 3: Bridge if cross-chain
             if strategy.target_chain != strategy.current_chain:
@@ -322,9 +371,9 @@ class SwapOptimizerAgent:
                         'asset': strategy.debt_token,
                         'amount': strategy.collateral_amount,
                         'bridge_protocol': 'stargate',  # Use Stargate/LayerZero
-                        'estimated_gas': 5.0  # Cross-chain is expensive
+                        'estimated_gas': gas.get_operation_cost(strategy.current_chain, 'bridge')
                     })
-                    total_gas += 5.0
+                    total_gas += steps[-1]['estimated_gas']
 
             # Step 4: Supply to new protocol
             steps.append({
@@ -333,9 +382,11 @@ class SwapOptimizerAgent:
                 'chain': strategy.target_chain,
                 'asset': strategy.collateral_token,
                 'amount': strategy.collateral_amount,
-                'estimated_gas': 0.005
+                'estimated_gas': gas.get_operation_cost(
+                    strategy.target_chain, 'deposit',
+                    protocol=strategy.target_protocol, token=strategy.collateral_token)
             })
-            total_gas += 0.005
+            total_gas += steps[-1]['estimated_gas']
 
             # Create execution plan
             plan = ExecutionPlan(
@@ -372,24 +423,17 @@ class SwapOptimizerAgent:
         try:
             import aiohttp
 
-            # Token addresses (Ethereum Mainnet)
-            token_addresses = {
-                'WETH': '0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2',
-                'USDC': '0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48',
-                'USDT': '0xdAC17F958D2ee523a2206206994597C13D831ec7',
-                'WBTC': '0x2260FAC5E5542a773Aa44fBCfeDf7C193bc2C599',
-                'DAI': '0x6B175474E89094C44Da98b954EedeAC495271d0F'
-            }
-
-            from_address = token_addresses.get(from_token)
-            to_address = token_addresses.get(to_token)
+            # Token addresses and decimals (Ethereum Mainnet)
+            tokens = get_token_registry()
+            from_address = tokens.get_address(from_token, 'ethereum')
+            to_address = tokens.get_address(to_token, 'ethereum')
 
             if not from_address or not to_address:
                 logger.warning(f"Unknown token: {from_token} or {to_token}")
                 return None
 
-            # Convert amount to wei (assuming 18 decimals)
-            amount_wei = int(amount * 10**18)
+            # Convert amount to base units
+            amount_wei = int(amount * 10**tokens.get_decimals(from_token, 18))
 
             # 1inch Swap API v6.0 (more reliable than Fusion+ for quotes)
             chain_id = 1  # Ethereum Mainnet
@@ -406,56 +450,61 @@ class SwapOptimizerAgent:
                 'amount': str(amount_wei)
             }
 
-            async with aiohttp.ClientSession() as session:
+            async def request():
+                session = get_http_session(verify_ssl=True)
                 async with session.get(url, headers=headers, params=params, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                    if response.status == 429:
+                        raise RateLimitedError(retry_after_seconds(response.headers))
                     if response.status == 200:
-                        data = await response.json()
-
-                        # Handle different decimal places (USDC=6, WETH/DAI=18)
-                        decimals = 18 if to_token in [
-                            'WETH', 'DAI'] else 6 if to_token in ['USDC', 'USDT'] else 18
-                        output_amount = int(
-                            data.get('dstAmount', 0)) / 10**decimals
-
-                        logger.success(f"✅ 1inch route found")
-                        logger.info(f"   Input: {amount:.4f} {from_token}")
-                        logger.info(
-                            f"   Output: {output_amount:.4f} {to_token}")
-
-                        # Track 1inch response for frontend
-                        self.oneinch_responses.append({
-                            'timestamp': int(time.time() * 1000),
-                            'from_token': from_token,
-                            'to_token': to_token,
-                            'input_amount': amount,
-                            'output_amount': output_amount,
-                            'route': '1inch_v6',
-                            'estimated_gas': int(data.get('gas', 150000)),
-                            'status': 'success'
-                        })
-
-                        return {
-                            'toAmount': output_amount,
-                            'route': '1inch_v6',
-                            # Rough estimate
-                            'gas_cost': int(data.get('gas', 150000)) / 10**9 * 50 / 10**9
-                        }
-                    else:
-                        error_text = await response.text()
-                        logger.warning(
-                            f"1inch API error ({response.status}): {error_text}")
-
-                        # Track failed response
-                        self.oneinch_responses.append({
-                            'timestamp': int(time.time() * 1000),
-                            'from_token': from_token,
-                            'to_token': to_token,
-                            'input_amount': amount,
-                            'status': 'error',
-                            'error': f"API returned {response.status}"
-                        })
-
-                        return None
+                        return response.status, await response.json()
+                    return response.status, await response.text()
+
+            # 429s are re-queued under the 1inch quota, not failed
+            status, data = await get_request_scheduler().run('oneinch', request)
+            if status == 200:
+                decimals = tokens.get_decimals(to_token, 18)
+                output_amount = int(
+                    data.get('dstAmount', 0)) / 10**decimals
+
+                logger.success(f"✅ 1inch route found")
+                logger.info(f"   Input: {amount:.4f} {from_token}")
+                logger.info(
+                    f"   Output: {output_amount:.4f} {to_token}")
+
+                # Track 1inch response for frontend
+                self.oneinch_responses.append({
+                    'timestamp': int(time.time() * 1000),
+                    'from_token': from_token,
+                    'to_token': to_token,
+                    'input_amount': amount,
+                    'output_amount': output_amount,
+                    'route': '1inch_v6',
+                    'estimated_gas': int(data.get('gas', 150000)),
+                    'status': 'success'
+                })
+
+                return {
+                    'toAmount': output_amount,
+                    'route': '1inch_v6',
+                    # Quoted gas at the cached Ethereum gas price (USD)
+                    'gas_cost': self.gas_estimator.cost_for_gas_units(
+                        'ethereum', int(data.get('gas', 150000)))
+                }
+            else:
+                logger.warning(
+                    f"1inch API error ({status}): {data}")
+
+                # Track failed response
+                self.oneinch_responses.append({
+                    'timestamp': int(time.time() * 1000),
+                    'from_token': from_token,
+                    'to_token': to_token,
+                    'input_amount': amount,
+                    'status': 'error',
+                    'error': f"API returned {status}"
+                })
+
+                return None
 
         except Exception as e:
             logger.error(f"1inch API call failed: {e}")
@@ -476,51 +525,20 @@ class SwapOptimizerAgent:
             return None
 
         try:
-            # Token address mapping for cross-chain
-            token_addresses = {
-                'ethereum': {
-                    'USDC': '0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48',
-                    'WETH': '0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2',
-                    'USDT': '0xdAC17F958D2ee523a2206206994597C13D831ec7',
-                },
-                'arbitrum': {
-                    'USDC': '0xaf88d065e77c8cC2239327C5EDb3A432268e5831',
-                    'WETH': '0x82aF49447D8a07e3bd95BD0d56f35241523fBab1',
-                    'USDT': '0xFd086bC7CD5C481DCC9C85ebE478A1C0b69FCbb9',
-                },
-                'optimism': {
-                    'USDC': '0x0b2C639c533813f4Aa9D7837CAf62653d097Ff85',
-                    'USDT': '0x94b008aA00579c1307B0EF2c499aD98a8ce58e58',  # USDT on Optimism
-                    'WETH': '0x4200000000000000000000000000000000000006',
-                },
-                'base': {
-                    'USDC': '0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913',
-                    'USDT': '0xfde4C96c8593536E31F229EA8f37b2ADa2699bb2',  # USDT on Base
-                    'WETH': '0x4200000000000000000000000000000000000006',
-                },
-                'polygon': {
-                    'USDC': '0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359',
-                    'WETH': '0x7ceB23fD6bC0adD59E62ac25578270cFf1b9f619',
-                },
-                'solana': {
-                    'USDC': 'EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v',
-                    'SOL': 'So11111111111111111111111111111111111111112',
-                }
-            }
+            # Token addresses on each chain (cross-chain equivalents)
+            tokens = get_token_registry()
 
             # Get token addresses
-            src_token_addr = token_addresses.get(
-                from_chain.lower(), {}).get(from_token)
-            dst_token_addr = token_addresses.get(
-                to_chain.lower(), {}).get(to_token)
+            src_token_addr = tokens.get_address(from_token, from_chain.lower())
+            dst_token_addr = tokens.get_address(to_token, to_chain.lower())
 
             if not src_token_addr or not dst_token_addr:
                 logger.warning(
                     f"Token addresses not found for {from_token} on {from_chain} or {to_token} on {to_chain}")
                 return None
 
-            # Convert amount to wei (6 decimals for USDC, 18 for others)
-            decimals = 6 if from_token == 'USDC' else 18
+            # Convert amount to base units
+            decimals = tokens.get_decimals(from_token, 18)
             amount_wei = str(int(amount * 10**decimals))
 
             # Dummy wallet for quote (no execution)
@@ -541,7 +559,7 @@ class SwapOptimizerAgent:
 
             if result.get('success'):
                 # Convert output amount back to readable format
-                dst_decimals = 6 if to_token == 'USDC' else 18
+                dst_decimals = tokens.get_decimals(to_token, 18)
                 dst_amount = int(result['dstAmount']) / 10**dst_decimals
 
                 logger.success(f"✅ Fusion+ quote received")
@@ -15,12 +15,18 @@ NO MOCK DATA - ALL REAL:
 
 from agents.metta_reasoner import get_metta_reasoner
 from data.protocol_data import get_protocol_data_fetcher
+from data.protocol_risk import get_protocol_risk_scorer
+from data.http_client import close_http_client
+from data.request_scheduler import get_request_scheduler
+from data.yield_watcher import get_yield_watcher
+from data.yield_spreads import get_spread_matrix
 from agents.message_protocols import (
     PositionAlert,
     OptimizationStrategy,
     HealthCheckRequest,
     HealthCheckResponse
 )
+import asyncio
 import os
 import sys
 import time
@@ -69,6 +75,12 @@ class YieldOptimizerAgent:
 
         # Data managers
         self.protocol_data = get_protocol_data_fetcher()
+        # Always-current ranked opportunities, updated on every snapshot refresh
+        self.yield_watcher = get_yield_watcher()
+        # Net-of-cost strategies per source chain/token, rebuilt with the watcher
+        self.spread_matrix = get_spread_matrix()
+        # Precomputed protocol x chain x size risk scores (TVL refreshed in background)
+        self.risk_scorer = get_protocol_risk_scorer()
         self.metta_reasoner = get_metta_reasoner()  # MeTTa symbolic AI reasoning
 
         # State
@@ -127,7 +139,14 @@ class YieldOptimizerAgent:
                     response = {
                         'status': 'online',
                         'optimizations_sent': agent_instance.optimizations_sent,
-                        'address': str(agent_instance.agent.address)
+                        'address': str(agent_instance.agent.address),
+                        'upstreams': get_request_scheduler().get_stats(),
+                        'pools_snapshot': agent_instance.protocol_data.snapshot.get_stats(),
+                        'apy_history': agent_instance.protocol_data.apy_history.get_summary(),
+                        'yield_watcher': agent_instance.yield_watcher.get_stats(),
+                        'spread_matrix': agent_instance.spread_matrix.get_stats(),
+                        'gas': agent_instance.protocol_data.gas_estimator.get_stats(),
+                        'protocol_risk': agent_instance.risk_scorer.get_stats()
                     }
                     self.wfile.write(json.dumps(response).encode())
 
@@ -145,6 +164,22 @@ class YieldOptimizerAgent:
                     }
                     self.wfile.write(json.dumps(response).encode())
 
+                elif self.path == '/opportunities':
+                    self.send_response(200)
+                    self.send_header('Content-type', 'application/json')
+                    self.send_header('Access-Control-Allow-Origin', '*')
+                    self.end_headers()
+                    # Ranked opportunity set and its recent changes
+                    watcher = agent_instance.yield_watcher
+                    response = {
+                        'success': True,
+                        'opportunities': watcher.get_opportunities(limit=20),
+                        'events': list(watcher.events)[-50:],
+                        'version': watcher.version,
+                        'timestamp': int(time.time() * 1000)
+                    }
+                    self.wfile.write(json.dumps(response).encode())
+
                 else:
                     self.send_response(404)
                     self.end_headers()
@@ -162,6 +197,25 @@ class YieldOptimizerAgent:
             logger.success("🚀 Yield Optimizer started - AUTONOMOUS MODE")
             logger.info("   Listening for PositionAlert from Position Monitor")
             logger.info("   Using real DeFi Llama API for yields")
+            # Keep the shared pools snapshot warm so alerts never wait on a download
+            self.yield_watcher.start()
+            self.yield_watcher.subscribe(self._on_yield_event)
+            self.spread_matrix.start()
+            self.protocol_data.gas_estimator.start_background_refresh()
+            self.risk_scorer.start_background_refresh()
+            self.protocol_data.snapshot.start_background_refresh()
+            # Seed APY history for the top pools (background priority)
+            self._backfill_task = asyncio.ensure_future(
+                self.protocol_data.backfill_apy_history())
+
+        @self.agent.on_event("shutdown")
+        async def shutdown(ctx: Context):
+            self.yield_watcher.stop()
+            self.spread_matrix.stop()
+            await self.protocol_data.gas_estimator.stop_background_refresh()
+            await self.risk_scorer.stop_background_refresh()
+            await self.protocol_data.snapshot.stop_background_refresh()
+            await close_http_client()
 
         @self.agent.on_message(model=PositionAlert)
         async def handle_position_alert(ctx: Context, sender: str, msg: PositionAlert):
@@ -217,7 +271,10 @@ class YieldOptimizerAgent:
                     current_apy=strategy['current_apy'],
                     target_apy=strategy['target_apy'],
                     estimated_gas_cost=strategy['estimated_gas'],
-                    timestamp=int(time.time() * 1000)
+                    timestamp=int(time.time() * 1000),
+                    risk_level=msg.risk_level,
+                    health_factor=msg.health_factor,
+                    predicted_liquidation_time=msg.predicted_liquidation_time
                 )
 
                 await ctx.send(SWAP_OPTIMIZER_ADDRESS, optimization)
@@ -313,58 +370,45 @@ class YieldOptimizerAgent:
         logger.info(
             "🧠 MeTTa analyzing ALL available yields (all tokens, all chains)...")
 
-        # Get top 15 yields with diverse protocols for MeTTa evaluation
-        top_yields = await self.protocol_data.get_all_yields(
-            token=None,  # Don't filter by token - get best yields across all assets
-            min_apy=current_apy + MIN_APY_IMPROVEMENT,
-            limit=15  # Top 15 from diverse protocols (max 3 per protocol)
+        # Top 15 strategies from the precomputed spread matrix: the watcher's
+        # opportunities with execution costs for this chain/token already
+        # applied, ranked on net APY at this position size. Query the
+        # snapshot only if the matrix can't fill 15.
+        min_apy = current_apy + MIN_APY_IMPROVEMENT
+        available_strategies = self.spread_matrix.get_strategies(
+            source_chain=current_chain,
+            source_token=collateral_token,
+            position_size=position_size,
+            min_apy=min_apy,
+            limit=15
         )
+        if len(available_strategies) < 15:
+            top_yields = await self.protocol_data.get_all_yields(
+                token=None,  # Don't filter by token - get best yields across all assets
+                min_apy=min_apy,
+                limit=15,  # Top 15 from diverse protocols (max 3 per protocol)
+                rank_by='stability'
+            )
+            available_strategies = [
+                self.spread_matrix.strategy(current_chain, collateral_token, y)
+                for y in top_yields
+            ]
 
-        if not top_yields:
+        if not available_strategies:
             logger.warning(
                 "   ❌ No yields found meeting minimum APY requirement")
             return None
 
+        # Protocol risk from the precomputed table (one lookup per candidate)
+        for s in available_strategies:
+            s['protocol_risk'] = self.risk_scorer.get_risk_score(
+                s['protocol'], s['chain'], position_size)
+
         logger.info(
-            f"📊 Found {len(top_yields)} candidate strategies for MeTTa evaluation:")
-        for i, y in enumerate(top_yields[:5], 1):  # Show top 5
+            f"📊 Found {len(available_strategies)} candidate strategies for MeTTa evaluation:")
+        for i, s in enumerate(available_strategies[:5], 1):  # Show top 5
             logger.info(
-                f"   {i}. {y['protocol']} ({y['chain']}): {y['apy']:.2f}% APY")
-
-        # Prepare strategies for MeTTa reasoning
-        available_strategies = []
-        for yield_data in top_yields:
-            # Calculate execution costs based on chain
-            gas_cost = yield_data.get('estimated_gas', 50.0)  # Default $50
-            bridge_cost = 0.0
-            swap_cost = 0.0
-
-            # Estimate bridge costs for cross-chain
-            if yield_data['chain'] != current_chain:
-                if yield_data['chain'] == 'solana':
-                    bridge_cost = 15.0  # Wormhole ETH→Solana
-                elif yield_data['chain'] in ['arbitrum', 'optimism', 'base']:
-                    bridge_cost = 10.0  # LayerZero/Stargate
-
-            # Estimate swap costs for cross-asset (USDC→SOL, ETH→USDC, etc.)
-            target_token = yield_data.get('token', 'USDC')
-            if target_token != collateral_token:
-                swap_cost = 5.0  # 1inch swap cost (~0.3% slippage + gas)
-                logger.debug(
-                    f"   Cross-asset swap: {collateral_token} → {target_token} (+${swap_cost})")
-
-            strategy = {
-                'protocol': yield_data['protocol'],
-                'chain': yield_data['chain'],
-                'token': target_token,  # Target asset
-                'apy': yield_data['apy'],
-                'pool': yield_data.get('pool', 'unknown'),
-                'tvl': yield_data.get('tvlUsd', 0),
-                'execution_cost': gas_cost + bridge_cost + swap_cost,
-                'is_cross_chain': yield_data['chain'] != current_chain,
-                'is_cross_asset': target_token != collateral_token
-            }
-            available_strategies.append(strategy)
+                f"   {i}. {s['protocol']} ({s['chain']}): {s['apy']:.2f}% APY (stable {s['stable_apy']:.2f}%, cost ${s['execution_cost']:.2f}, risk {s['protocol_risk']}/10)")
 
         # MeTTa symbolic AI reasoning
         logger.info(
@@ -386,6 +430,9 @@ class YieldOptimizerAgent:
                 'estimated_gas': strat['execution_cost'],
                 'is_cross_chain': strat['is_cross_chain'],
                 'is_cross_asset': strat['is_cross_asset'],
+                'stable_apy': strat['stable_apy'],
+                'apy_volatility': strat['apy_volatility'],
+                'protocol_risk': strat['protocol_risk'],
                 'selected': False  # Will mark the selected one later
             })
 
@@ -436,6 +483,9 @@ class YieldOptimizerAgent:
             f"   💰 Execution Cost: ${optimal_strategy['execution_cost']:.2f}")
         logger.info(f"   ⏱️  Break-even: {break_even_days:.0f} days")
         logger.info(f"   🔀 Execution Method: {execution_method}")
+        logger.info(
+            f"   🛡️ Protocol Risk: {optimal_strategy['protocol_risk']}/10 "
+            f"({self.risk_scorer.get_risk_description(optimal_strategy['protocol_risk'])})")
 
         # Determine if cross-chain
         is_cross_chain = optimal_strategy['source_chain'] != optimal_strategy['target_chain']
@@ -461,11 +511,20 @@ class YieldOptimizerAgent:
             'break_even_days': break_even_days,
             'route_type': execution_method,
             'risk_level': 'medium',  # Based on MeTTa analysis
+            'protocol_risk': optimal_strategy['protocol_risk'],
             'metta_score': score,
             'metta_reasoning': reasoning,
             'metta_confidence': confidence
         }
 
+    def _on_yield_event(self, event: Dict):
+        """Log opportunity set changes pushed by the yield watcher"""
+        if event['type'] == 'apy_changed':
+            details = f"{event['previous_apy']:.2f}% → {event['apy']:.2f}%"
+        else:
+            details = f"{event['apy']:.2f}% (rank {event['rank']})" if event['rank'] else f"{event['apy']:.2f}%"
+        logger.debug(f"👀 {event['type']}: {event['pool']} {details}")
+
     def _calculate_break_even(
         self,
         position_size: float,
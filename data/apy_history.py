@@ -0,0 +1,350 @@
+"""
+LiquidityGuard AI - Pool APY History
+
+Compact per-pool APY time series so strategies are ranked on how a pool
+has yielded, not on one snapshot's instantaneous APY:
+- Downsampled to fixed buckets (APY_HISTORY_BUCKET_SECONDS, mean per bucket)
+- Array-backed ring buffer per pool with running sums, so mean, volatility
+  and trend are O(1) reads on the alert path
+- Fed by every pools snapshot refresh; backfilled from DeFi Llama's
+  /chart/{pool} endpoint for pools without enough history
+"""
+
+import asyncio
+import math
+import os
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+from loguru import logger
+
+from data.http_client import get_http_session
+from data.pool_index import PoolIndex
+from data.request_scheduler import (
+    Priority, RateLimitedError, get_request_scheduler, retry_after_seconds)
+
+load_dotenv()
+
+SECONDS_PER_DAY = 86400.0
+
+
+class PoolApyBuffer:
+    """
+    Ring buffer of (bucket, mean APY) for one pool
+
+    The newest bucket is updated in place while it is open. Running sums
+    of y, y^2, t, t^2 and t*y (t = bucket offset) give mean, standard
+    deviation and the least-squares slope without touching the samples.
+    """
+
+    __slots__ = ('capacity', 'values', 'buckets', 'head', 'count', 'origin',
+                 'last_n', 'sum_y', 'sum_y2', 'sum_t', 'sum_t2', 'sum_ty')
+
+    def __init__(self, capacity: int):
+        if capacity < 2:
+            raise ValueError("PoolApyBuffer capacity must be at least 2")
+        self.capacity = capacity
+        self.values = array('f', [0.0] * capacity)
+        self.buckets = array('l', [0] * capacity)
+        self.head = 0   # Next write index
+        self.count = 0  # Stored buckets (<= capacity)
+        self.origin: Optional[int] = None  # Bucket of t = 0
+        self.last_n = 0  # Observations averaged into the newest bucket
+
+        self.sum_y = self.sum_y2 = 0.0
+        self.sum_t = self.sum_t2 = self.sum_ty = 0.0
+
+    def _add(self, idx: int, sign: int):
+        y = self.values[idx]
+        t = float(self.buckets[idx] - self.origin)
+        self.sum_y += sign * y
+        self.sum_y2 += sign * y * y
+        self.sum_t += sign * t
+        self.sum_t2 += sign * t * t
+        self.sum_ty += sign * t * y
+
+    @property
+    def last_bucket(self) -> Optional[int]:
+        if self.count == 0:
+            return None
+        return self.buckets[(self.head - 1) % self.capacity]
+
+    def push(self, bucket: int, apy: float):
+        """
+        Add an observation (older-than-newest buckets are ignored)
+
+        Args:
+            bucket: Bucket number (timestamp // bucket_seconds)
+            apy: APY in percent
+        """
+        last = self.last_bucket
+        if last is not None and bucket < last:
+            return
+
+        if last == bucket:
+            # Same bucket: fold into its running mean
+            idx = (self.head - 1) % self.capacity
+            self._add(idx, -1)
+            self.last_n += 1
+            self.values[idx] += (apy - self.values[idx]) / self.last_n
+            self._add(idx, 1)
+            return
+
+        if self.origin is None:
+            self.origin = bucket
+        if self.count == self.capacity:
+            self._add(self.head, -1)  # Evict the oldest bucket
+
+        idx = self.head
+        self.values[idx] = apy  # Stored as float32: sums use the stored value
+        self.buckets[idx] = bucket
+        self._add(idx, 1)
+        self.last_n = 1
+        self.head = (idx + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def mean(self) -> Optional[float]:
+        if self.count == 0:
+            return None
+        return self.sum_y / self.count
+
+    def stdev(self) -> Optional[float]:
+        """Sample standard deviation of bucket APYs (percentage points)"""
+        n = self.count
+        if n < 2:
+            return None
+        mean = self.sum_y / n
+        return math.sqrt(max(0.0, (self.sum_y2 - n * mean * mean) / (n - 1)))
+
+    def slope(self) -> Optional[float]:
+        """Least-squares APY change per bucket"""
+        n = self.count
+        denominator = n * self.sum_t2 - self.sum_t * self.sum_t
+        if n < 2 or denominator <= 1e-9:
+            return None
+        return (n * self.sum_ty - self.sum_t * self.sum_y) / denominator
+
+    def samples(self) -> List[Tuple[int, float]]:
+        """Chronological copy of (bucket, apy)"""
+        start = (self.head - self.count) % self.capacity
+        return [
+            (self.buckets[(start + i) % self.capacity],
+             self.values[(start + i) % self.capacity])
+            for i in range(self.count)
+        ]
+
+
+class ApyHistory:
+    """
+    Per-pool APY history with stability-adjusted scoring
+    """
+
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = base_url or os.getenv(
+            'DEFILLAMA_BASE_URL',
+            'https://yields.llama.fi'
+        )
+        self.bucket_seconds = int(os.getenv('APY_HISTORY_BUCKET_SECONDS', '3600'))
+        self.capacity = int(os.getenv('APY_HISTORY_SIZE', '336'))  # 14 days hourly
+        # Below this many buckets the spot APY is used as-is
+        self.min_samples = int(os.getenv('APY_HISTORY_MIN_SAMPLES', '6'))
+        # Score = min(spot, mean) - penalty * stdev
+        self.penalty = float(os.getenv('APY_STABILITY_PENALTY', '1.0'))
+
+        self._pools: Dict[str, PoolApyBuffer] = {}
+        self.last_recorded_version = 0
+
+        logger.info(
+            f"📈 ApyHistory initialized ({self.capacity} x {self.bucket_seconds}s buckets)")
+
+    def _bucket(self, timestamp: float) -> int:
+        return int(timestamp // self.bucket_seconds)
+
+    def record(self, pool_id: str, apy: float, timestamp: Optional[float] = None):
+        """Add one APY observation for a pool"""
+        bucket = self._bucket(timestamp if timestamp is not None else time.time())
+        buffer = self._pools.get(pool_id)
+        if buffer is None:
+            buffer = self._pools[pool_id] = PoolApyBuffer(self.capacity)
+        buffer.push(bucket, apy)
+
+    def record_index(self, index: PoolIndex, timestamp: Optional[float] = None):
+        """
+        Record every lending pool of a snapshot (PoolSnapshot listener)
+
+        Args:
+            index: Snapshot index
+            timestamp: Wall-clock time the data was fetched
+        """
+        if index.version <= self.last_recorded_version:
+            return
+        self.last_recorded_version = index.version
+
+        timestamp = timestamp if timestamp is not None else time.time()
+        recorded = 0
+        for row in index.rows(index.lending):
+            self.record(index.pool_ids[row], index.apy[row], timestamp)
+            recorded += 1
+
+        # Forget pools that left the dataset a whole window ago
+        horizon = self._bucket(timestamp) - self.capacity
+        stale = [pid for pid, buf in self._pools.items()
+                 if buf.last_bucket is None or buf.last_bucket < horizon]
+        for pool_id in stale:
+            del self._pools[pool_id]
+
+        logger.debug(
+            f"📈 APY history: recorded {recorded} pools (tracking {len(self._pools)})")
+
+    def load_chart(self, pool_id: str, points: Iterable[Tuple[float, float]]):
+        """
+        Backfill a pool with (timestamp, apy) points older than its history
+
+        Args:
+            pool_id: DeFi Llama pool id
+            points: Chronological (unix timestamp, apy) pairs
+        """
+        existing = self._pools.get(pool_id)
+        first_bucket = existing.samples()[0][0] if existing and existing.count else None
+
+        buffer = PoolApyBuffer(self.capacity)
+        for timestamp, apy in points:
+            bucket = self._bucket(timestamp)
+            if first_bucket is None or bucket < first_bucket:
+                buffer.push(bucket, apy)
+        if existing:
+            for bucket, apy in existing.samples():
+                buffer.push(bucket, apy)
+        if buffer.count:
+            self._pools[pool_id] = buffer
+
+    def sample_count(self, pool_id: str) -> int:
+        buffer = self._pools.get(pool_id)
+        return buffer.count if buffer else 0
+
+    def get_stats(self, pool_id: str) -> Optional[Dict]:
+        """
+        Mean, volatility and trend of a pool's APY
+
+        Returns:
+            Stats dict, or None without history
+        """
+        buffer = self._pools.get(pool_id)
+        if buffer is None or buffer.count == 0:
+            return None
+        slope = buffer.slope()
+        return {
+            'samples': buffer.count,
+            'window_hours': buffer.count * self.bucket_seconds / 3600,
+            'mean_apy': buffer.mean(),
+            'apy_volatility': buffer.stdev(),
+            'apy_trend_per_day': (slope * SECONDS_PER_DAY / self.bucket_seconds
+                                  if slope is not None else None)
+        }
+
+    def stability_adjusted_apy(self, pool_id: str, apy: float) -> float:
+        """
+        APY a pool can be expected to hold: min(spot, mean) - penalty * stdev
+
+        A pool spiking for an hour scores on its mean, not the spike.
+
+        Args:
+            pool_id: DeFi Llama pool id
+            apy: Current (spot) APY
+
+        Returns:
+            Stability-adjusted APY (spot APY while history is too short)
+        """
+        buffer = self._pools.get(pool_id)
+        if buffer is None or buffer.count < self.min_samples:
+            return apy
+        return min(apy, buffer.mean()) - self.penalty * (buffer.stdev() or 0.0)
+
+    # ═══════════════════════════════════════════════════════
+    # BACKFILL (DeFi Llama /chart/{pool})
+    # ═══════════════════════════════════════════════════════
+
+    async def backfill(self, pool_ids: Iterable[str]) -> int:
+        """
+        Load chart history for pools without enough samples
+
+        Runs at background priority, so it never delays position pricing.
+
+        Args:
+            pool_ids: DeFi Llama pool ids
+
+        Returns:
+            Number of pools backfilled
+        """
+        wanted = [pid for pid in dict.fromkeys(pool_ids)
+                  if pid and self.sample_count(pid) < self.min_samples]
+        if not wanted:
+            return 0
+
+        results = await asyncio.gather(
+            *(self._backfill_pool(pid) for pid in wanted))
+        loaded = sum(1 for ok in results if ok)
+        logger.info(f"📈 APY history backfilled for {loaded}/{len(wanted)} pools")
+        return loaded
+
+    async def _backfill_pool(self, pool_id: str) -> bool:
+        url = f"{self.base_url}/chart/{pool_id}"
+
+        async def request() -> Optional[Dict]:
+            session = get_http_session(verify_ssl=False)
+            async with session.get(url, timeout=15) as response:
+                if response.status == 429:
+                    raise RateLimitedError(retry_after_seconds(response.headers))
+                if response.status != 200:
+                    logger.debug(f"DeFi Llama chart error {response.status} for {pool_id}")
+                    return None
+                return await response.json()
+
+        try:
+            # 429s are re-queued under the DeFi Llama quota, not failed
+            data = await get_request_scheduler().run('defillama', request, Priority.BACKGROUND)
+        except Exception as e:
+            logger.debug(f"DeFi Llama chart fetch failed for {pool_id}: {e}")
+            return False
+        if data is None:
+            return False
+
+        window_start = time.time() - self.capacity * self.bucket_seconds
+        points = []
+        for point in data.get('data', []):
+            apy = point.get('apy')
+            if apy is None:
+                continue
+            try:
+                timestamp = datetime.fromisoformat(
+                    point['timestamp'].replace('Z', '+00:00')).timestamp()
+            except (KeyError, ValueError):
+                continue
+            if timestamp >= window_start:
+                points.append((timestamp, apy))
+
+        points.sort()
+        self.load_chart(pool_id, points)
+        return bool(points)
+
+    def get_summary(self) -> Dict:
+        return {
+            'pools': len(self._pools),
+            'bucket_seconds': self.bucket_seconds,
+            'capacity': self.capacity,
+            'snapshot_version': self.last_recorded_version
+        }
+
+
+# Singleton instance
+_apy_history = None
+
+
+def get_apy_history() -> ApyHistory:
+    """Get singleton instance of ApyHistory"""
+    global _apy_history
+    if _apy_history is None:
+        _apy_history = ApyHistory()
+    return _apy_history
@@ -0,0 +1,12 @@
+"""
+LiquidityGuard AI - Environment Configuration Helpers
+
+Shared checks for optional settings read from the environment (.env).
+"""
+
+from typing import Optional
+
+
+def is_configured(value: Optional[str]) -> bool:
+    """Treat unset values and .env.example placeholders as not configured"""
+    return bool(value) and "YOUR_" not in value and "your_" not in value
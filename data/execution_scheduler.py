@@ -0,0 +1,268 @@
+"""
+LiquidityGuard AI - Gas-Trough Execution Scheduler
+
+Holds non-urgent execution plans between the Swap Optimizer and the
+Executor, and releases each one when:
+- the forecast migration cost on its source chain falls to the trough
+  target (GAS_TROUGH_PERCENTILE of the costs seen over GAS_TROUGH_WINDOW), or
+- its deadline is reached: a fraction of the predicted time to
+  liquidation, capped by a per-risk-level maximum delay
+
+Critical/high risk positions, positions below GAS_DEFER_MIN_HEALTH and
+cheap plans are never held.
+"""
+
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from loguru import logger
+
+from data.gas_estimator import GasEstimator, get_gas_estimator, normalize_chain
+
+load_dotenv()
+
+# Risk levels that always execute immediately
+URGENT_RISK_LEVELS = ('critical', 'high')
+
+# Fee tier sampled for the trough history and compared against it
+TROUGH_SPEED = 'slow'
+
+# Longest hold (seconds) by risk level, before the liquidation-based deadline
+MAX_DEFERRAL_BY_RISK = {
+    'moderate': 3600.0,
+    'low': 21600.0,
+    'safe': 21600.0
+}
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), round(pct / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+class ExecutionScheduler:
+    """
+    Defers non-urgent ExecutionPlans to gas troughs
+    """
+
+    def __init__(self, gas_estimator: GasEstimator):
+        self.gas = gas_estimator
+        self.trough_percentile = float(os.getenv('GAS_TROUGH_PERCENTILE', '30'))
+        self.window_seconds = float(os.getenv('GAS_TROUGH_WINDOW', '86400'))
+        self.sample_seconds = float(os.getenv('GAS_TROUGH_SAMPLE_SECONDS', '60'))
+        # Below this many samples there is no trough to wait for
+        self.min_samples = int(os.getenv('GAS_TROUGH_MIN_SAMPLES', '30'))
+        self.min_health = float(os.getenv('GAS_DEFER_MIN_HEALTH', '1.5'))
+        self.min_cost = float(os.getenv('GAS_DEFER_MIN_COST', '5'))
+        # Share of the predicted time to liquidation a plan may wait
+        self.liquidation_fraction = float(os.getenv('GAS_DEFER_LIQUIDATION_FRACTION', '0.25'))
+
+        # chain -> deque of (timestamp, TROUGH_SPEED migration cost USD)
+        self._history: Dict[str, deque] = {}
+        self._last_sample: Optional[float] = None
+
+        # position_id -> held plan
+        self.pending: Dict[str, Dict] = {}
+
+        # Stats
+        self.immediate = 0
+        self.deferred = 0
+        self.released_trough = 0
+        self.released_deadline = 0
+        self.estimated_savings = 0.0
+
+    # ═══════════════════════════════════════════════════════
+    # GAS TROUGH
+    # ═══════════════════════════════════════════════════════
+
+    def observe(self, now: Optional[float] = None):
+        """Sample every chain's migration cost (at most once per sample interval)"""
+        now = now if now is not None else time.time()
+        if self._last_sample is not None and now - self._last_sample < self.sample_seconds:
+            return
+        self._last_sample = now
+
+        horizon = now - self.window_seconds
+        for chain, cost in self.gas.get_chain_costs(TROUGH_SPEED).items():
+            samples = self._history.get(chain)
+            if samples is None:
+                samples = self._history[chain] = deque()
+            samples.append((now, cost))
+            while samples and samples[0][0] < horizon:
+                samples.popleft()
+
+    def trough_target(self, chain: str) -> Optional[float]:
+        """
+        Migration cost (USD) a held plan waits for on a chain
+
+        Returns:
+            Target cost, or None without enough history
+        """
+        samples = self._history.get(normalize_chain(chain))
+        if not samples or len(samples) < self.min_samples:
+            return None
+        return _percentile([cost for _, cost in samples], self.trough_percentile)
+
+    def in_trough(self, chain: str) -> bool:
+        """Whether the forecast cost is at or below the trough target (same tier as the samples)"""
+        target = self.trough_target(chain)
+        if target is None:
+            return True
+        return self.gas.get_migration_cost(chain, TROUGH_SPEED) <= target
+
+    # ═══════════════════════════════════════════════════════
+    # DEFERRAL
+    # ═══════════════════════════════════════════════════════
+
+    def is_urgent(
+        self,
+        risk_level: Optional[str],
+        health_factor: Optional[float],
+        time_to_liquidation: Optional[float]
+    ) -> bool:
+        if risk_level is None or risk_level.lower() in URGENT_RISK_LEVELS:
+            return True
+        if health_factor is not None and health_factor < self.min_health:
+            return True
+        if time_to_liquidation is not None and time_to_liquidation * self.liquidation_fraction < self.sample_seconds:
+            return True
+        return False
+
+    def deadline(
+        self,
+        risk_level: str,
+        time_to_liquidation: Optional[float],
+        now: float
+    ) -> float:
+        """Latest release time for a held plan"""
+        delay = MAX_DEFERRAL_BY_RISK.get(risk_level.lower(), 0.0)
+        if time_to_liquidation is not None:
+            delay = min(delay, time_to_liquidation * self.liquidation_fraction)
+        return now + delay
+
+    def submit(
+        self,
+        plan,
+        risk_level: Optional[str] = None,
+        health_factor: Optional[float] = None,
+        predicted_liquidation_time: Optional[int] = None,
+        now: Optional[float] = None
+    ) -> bool:
+        """
+        Hold a plan for a gas trough if it can wait
+
+        Args:
+            plan: ExecutionPlan
+            risk_level: Position risk level (None is treated as urgent)
+            health_factor: Position health factor
+            predicted_liquidation_time: Predicted liquidation (unix ms)
+            now: Current unix time (seconds)
+
+        Returns:
+            True if the plan was held, False if it should execute now
+        """
+        now = now if now is not None else time.time()
+        self.observe(now)
+        # A new plan for a position supersedes any plan still held for it:
+        # it either executes now or replaces the held one below
+        self.pending.pop(plan.position_id, None)
+        chain = normalize_chain(plan.source_chain)
+        time_to_liquidation = (predicted_liquidation_time / 1000 - now
+                               if predicted_liquidation_time else None)
+
+        if (self.is_urgent(risk_level, health_factor, time_to_liquidation)
+                or plan.total_gas_cost < self.min_cost
+                or self.in_trough(chain)):
+            self.immediate += 1
+            return False
+
+        deadline = self.deadline(risk_level, time_to_liquidation, now)
+        if deadline <= now:
+            self.immediate += 1
+            return False
+
+        self.pending[plan.position_id] = {
+            'plan': plan,
+            'chain': chain,
+            'risk_level': risk_level,
+            'deferred_at': now,
+            'deadline': deadline,
+            'cost_at_deferral': self.gas.get_migration_cost(chain, TROUGH_SPEED)
+        }
+        self.deferred += 1
+        logger.info(
+            f"⏳ Deferring plan {plan.position_id[:10]}... on {chain} until migration gas "
+            f"≤ ${self.trough_target(chain):.2f} (now ${self.gas.get_migration_cost(chain, TROUGH_SPEED):.2f}) "
+            f"or {deadline - now:.0f}s")
+        return True
+
+    def due(self, now: Optional[float] = None) -> List:
+        """
+        Release held plans whose chain hit its trough or whose deadline passed
+
+        Returns:
+            ExecutionPlans to send to the Executor
+        """
+        now = now if now is not None else time.time()
+        self.observe(now)
+
+        released = []
+        for position_id, held in list(self.pending.items()):
+            if now >= held['deadline']:
+                reason = 'deadline'
+                self.released_deadline += 1
+            elif self.in_trough(held['chain']):
+                reason = 'trough'
+                self.released_trough += 1
+            else:
+                continue
+
+            del self.pending[position_id]
+            plan = held['plan']
+            current = self.gas.get_migration_cost(held['chain'], TROUGH_SPEED)
+            if held['cost_at_deferral'] > 0:
+                saved = plan.total_gas_cost * (1 - current / held['cost_at_deferral'])
+                self.estimated_savings += saved
+            logger.info(
+                f"⛽ Releasing plan {position_id[:10]}... ({reason}, held {now - held['deferred_at']:.0f}s)")
+            released.append(plan)
+        return released
+
+    def get_pending(self) -> List[Dict]:
+        return [
+            {
+                'position_id': position_id,
+                'chain': held['chain'],
+                'risk_level': held['risk_level'],
+                'deferred_at': held['deferred_at'],
+                'deadline': held['deadline'],
+                'total_gas_cost': held['plan'].total_gas_cost
+            }
+            for position_id, held in self.pending.items()
+        ]
+
+    def get_stats(self) -> Dict:
+        return {
+            'pending': len(self.pending),
+            'immediate': self.immediate,
+            'deferred': self.deferred,
+            'released_trough': self.released_trough,
+            'released_deadline': self.released_deadline,
+            'estimated_savings_usd': self.estimated_savings,
+            'trough_targets': {chain: self.trough_target(chain) for chain in self._history}
+        }
+
+
+# Singleton instance
+_execution_scheduler = None
+
+
+def get_execution_scheduler() -> ExecutionScheduler:
+    """Get singleton instance of ExecutionScheduler"""
+    global _execution_scheduler
+    if _execution_scheduler is None:
+        _execution_scheduler = ExecutionScheduler(get_gas_estimator())
+    return _execution_scheduler
@@ -0,0 +1,379 @@
+"""
+LiquidityGuard AI - Gas Unit Calibration
+
+Measures gas units per (protocol, operation, token) with batched JSON-RPC
+eth_estimateGas calls against a forked node (e.g. `anvil --fork-url ...`)
+instead of assuming fixed numbers per operation:
+- One batch request per GAS_CALIBRATION_BATCH_SIZE calls
+- Results persist to GAS_CALIBRATION_PATH and are re-measured once older
+  than GAS_CALIBRATION_MAX_AGE
+- Combinations that revert (no balance, allowance or position for the
+  calibration account) keep the GasEstimator defaults
+
+The calibration account (GAS_CALIBRATION_ACCOUNT) must hold each token,
+have approved each protocol, and have a supplied and borrowed position on
+the fork, since every estimate runs against current fork state.
+"""
+
+import asyncio
+import json
+import os
+import time
+from statistics import median
+from typing import Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from loguru import logger
+
+from data.env_config import is_configured
+from data.http_client import get_http_session
+from data.pool_index import normalize_project, token_key
+from data.request_scheduler import (
+    Priority, RateLimitedError, get_request_scheduler, retry_after_seconds)
+from data.token_registry import get_token_registry
+
+load_dotenv()
+
+# Ethereum mainnet contracts (fork targets)
+AAVE_V3_POOL = "0x87870Bca3F3fD6335C3F4ce8392D69350B4fA4E2"
+COMPOUND_V3_USDC = "0xc3d688B66703497DAA19211EEdff47f25384cdc3"  # Comet cUSDCv3
+UNISWAP_V3_ROUTER = "0x68b3465833fb72A70ecDF485E0e4C7bD8665Fc45"  # SwapRouter02
+
+# Function selectors
+APPROVE_SELECTOR = "0x095ea7b3"             # approve(address,uint256)
+AAVE_SUPPLY_SELECTOR = "0x617ba037"         # supply(address,uint256,address,uint16)
+AAVE_WITHDRAW_SELECTOR = "0x69328dec"       # withdraw(address,uint256,address)
+AAVE_REPAY_SELECTOR = "0x573ade81"          # repay(address,uint256,uint256,address)
+COMET_SUPPLY_SELECTOR = "0xf2b9fdb8"        # supply(address,uint256)
+COMET_WITHDRAW_SELECTOR = "0xf3fef3a3"      # withdraw(address,uint256)
+EXACT_INPUT_SINGLE_SELECTOR = "0x04e45aaf"  # exactInputSingle((address,address,uint24,address,uint256,uint256,uint160))
+
+AAVE_VARIABLE_RATE = 2
+
+CALIBRATION_TOKENS = ('WETH', 'USDC', 'USDT', 'DAI', 'WBTC')
+COMPOUND_ASSETS = ('USDC', 'WETH', 'WBTC')  # cUSDCv3 base + collateral
+
+# Uniswap V3 fee tier of the pool each token is swapped through
+SWAP_FEE_TIERS = {'WETH': 500, 'USDC': 500, 'USDT': 100, 'DAI': 100, 'WBTC': 3000}
+
+CalibrationKey = Tuple[str, str, str]  # (protocol, operation, token)
+
+
+def _word(value) -> str:
+    """ABI-encode an address or uint as one 32-byte word"""
+    if isinstance(value, str):
+        return value.lower().replace('0x', '').rjust(64, '0')
+    return format(value, '064x')
+
+
+def _calldata(selector: str, *args) -> str:
+    return selector + ''.join(_word(a) for a in args)
+
+
+def calibration_key(protocol: str, operation: str, token: str) -> CalibrationKey:
+    """Normalized lookup key (aave-v3/WETH -> aave/ETH)"""
+    return (normalize_project(protocol), operation, token_key(token))
+
+
+def build_calibration_calls(account: str) -> List[Dict]:
+    """
+    eth_estimateGas calls for every calibrated (protocol, operation, token)
+
+    Args:
+        account: Calibration account (sender, recipient, onBehalfOf)
+
+    Returns:
+        [{'key': (protocol, operation, token), 'to': address, 'data': calldata}]
+    """
+    tokens = get_token_registry()
+    calls = []
+    for symbol in CALIBRATION_TOKENS:
+        asset = tokens.get_address(symbol, 'ethereum')
+        if not asset:
+            continue
+        # 1% of one token: small enough for any funded fork account
+        amount = 10 ** max(0, tokens.get_decimals(symbol, 18) - 2)
+
+        def add(protocol: str, operation: str, to: str, data: str):
+            calls.append({
+                'key': calibration_key(protocol, operation, symbol),
+                'to': to,
+                'data': data
+            })
+
+        add('aave', 'approve', asset, _calldata(APPROVE_SELECTOR, AAVE_V3_POOL, amount))
+        add('aave', 'deposit', AAVE_V3_POOL,
+            _calldata(AAVE_SUPPLY_SELECTOR, asset, amount, account, 0))
+        add('aave', 'withdraw', AAVE_V3_POOL,
+            _calldata(AAVE_WITHDRAW_SELECTOR, asset, amount, account))
+        add('aave', 'repay', AAVE_V3_POOL,
+            _calldata(AAVE_REPAY_SELECTOR, asset, amount, AAVE_VARIABLE_RATE, account))
+
+        if symbol in COMPOUND_ASSETS:
+            add('compound', 'approve', asset,
+                _calldata(APPROVE_SELECTOR, COMPOUND_V3_USDC, amount))
+            add('compound', 'deposit', COMPOUND_V3_USDC,
+                _calldata(COMET_SUPPLY_SELECTOR, asset, amount))
+            add('compound', 'withdraw', COMPOUND_V3_USDC,
+                _calldata(COMET_WITHDRAW_SELECTOR, asset, amount))
+
+        token_out = tokens.get_address('WETH' if symbol == 'USDC' else 'USDC', 'ethereum')
+        add('uniswap', 'approve', asset, _calldata(APPROVE_SELECTOR, UNISWAP_V3_ROUTER, amount))
+        add('uniswap', 'swap', UNISWAP_V3_ROUTER, _calldata(
+            EXACT_INPUT_SINGLE_SELECTOR,
+            asset, token_out, SWAP_FEE_TIERS[symbol], account, amount, 0, 0))
+    return calls
+
+
+class GasCalibration:
+    """
+    Measured gas units per (protocol, operation, token)
+    """
+
+    def __init__(self, rpc_url: Optional[str] = None, account: Optional[str] = None):
+        self.rpc_url = rpc_url or os.getenv('GAS_CALIBRATION_RPC_URL')
+        if not is_configured(self.rpc_url):
+            self.rpc_url = None
+        self.account = account or os.getenv('GAS_CALIBRATION_ACCOUNT')
+        if not is_configured(self.account):
+            self.account = None
+        self.path = os.getenv('GAS_CALIBRATION_PATH', './data/cache/gas_calibration.json')
+        self.max_age = float(os.getenv('GAS_CALIBRATION_MAX_AGE', '86400'))
+        self.batch_size = int(os.getenv('GAS_CALIBRATION_BATCH_SIZE', '50'))
+        self.timeout = float(os.getenv('GAS_CALIBRATION_TIMEOUT', '30'))
+
+        self.gas_units: Dict[CalibrationKey, int] = {}
+        self.operation_units: Dict[str, int] = {}  # operation -> median across combinations
+        self.measured_at: Optional[float] = None  # Unix time
+        self.failed: List[CalibrationKey] = []
+
+        self._listeners: List[Callable] = []
+        self._refresh_task: Optional[asyncio.Task] = None
+
+        self.load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rpc_url is not None and self.account is not None
+
+    @property
+    def age(self) -> Optional[float]:
+        if self.measured_at is None:
+            return None
+        return time.time() - self.measured_at
+
+    # ═══════════════════════════════════════════════════════
+    # LOOKUPS (no I/O)
+    # ═══════════════════════════════════════════════════════
+
+    def get_gas_units(
+        self,
+        operation: str,
+        protocol: Optional[str] = None,
+        token: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        Measured gas units, most specific first
+
+        Args:
+            operation: approve, deposit, withdraw, repay, swap
+            protocol: Protocol name (any version suffix)
+            token: Token symbol
+
+        Returns:
+            Gas units for the combination, else the operation's median,
+            else None
+        """
+        if protocol and token:
+            units = self.gas_units.get(calibration_key(protocol, operation, token))
+            if units is not None:
+                return units
+        return self.operation_units.get(operation)
+
+    def _set_results(self, gas_units: Dict[CalibrationKey, int], measured_at: float):
+        self.gas_units = gas_units
+        by_operation: Dict[str, List[int]] = {}
+        for (_, operation, _), units in gas_units.items():
+            by_operation.setdefault(operation, []).append(units)
+        self.operation_units = {op: int(median(v)) for op, v in by_operation.items()}
+        self.measured_at = measured_at
+        for callback in list(self._listeners):
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Gas calibration listener failed: {e}")
+
+    def add_listener(self, callback: Callable):
+        """Call callback() whenever calibrated units change"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    # ═══════════════════════════════════════════════════════
+    # PERSISTENCE
+    # ═══════════════════════════════════════════════════════
+
+    def load(self) -> bool:
+        """Load persisted measurements (any age: stale units beat defaults)"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            gas_units = {
+                (r['protocol'], r['operation'], r['token']): int(r['gas'])
+                for r in saved['results']
+            }
+        except Exception as e:
+            logger.warning(f"Could not load gas calibration {self.path}: {e}")
+            return False
+
+        self._set_results(gas_units, float(saved['measured_at']))
+        logger.info(
+            f"💾 Gas calibration loaded: {len(gas_units)} combinations ({self.age / 3600:.1f}h old)")
+        return True
+
+    def _save(self):
+        """Atomically replace the persisted measurements (runs in a worker thread)"""
+        tmp_path = f"{self.path}.tmp"
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'measured_at': self.measured_at,
+                    'results': [
+                        {'protocol': p, 'operation': o, 'token': t, 'gas': units}
+                        for (p, o, t), units in sorted(self.gas_units.items())
+                    ]
+                }, f, indent=1)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Could not write gas calibration {self.path}: {e}")
+
+    # ═══════════════════════════════════════════════════════
+    # MEASUREMENT
+    # ═══════════════════════════════════════════════════════
+
+    async def calibrate(self) -> int:
+        """
+        Re-measure every combination with batched eth_estimateGas
+
+        Returns:
+            Number of combinations measured
+        """
+        if not self.enabled:
+            return 0
+
+        calls = build_calibration_calls(self.account)
+        started = time.monotonic()
+        batches = [calls[i:i + self.batch_size] for i in range(0, len(calls), self.batch_size)]
+        results = await asyncio.gather(
+            *(self._estimate_batch(batch) for batch in batches), return_exceptions=True)
+
+        gas_units: Dict[CalibrationKey, int] = {}
+        failed: List[CalibrationKey] = []
+        for batch, estimates in zip(batches, results):
+            if isinstance(estimates, Exception):
+                logger.warning(f"Gas calibration batch failed: {estimates}")
+                estimates = [None] * len(batch)
+            for call, units in zip(batch, estimates):
+                if units is None:
+                    failed.append(call['key'])
+                else:
+                    gas_units[call['key']] = units
+
+        if not gas_units:
+            logger.warning("⛽ Gas calibration measured nothing - keeping previous units")
+            return 0
+
+        self.failed = failed
+        self._set_results(gas_units, time.time())
+        await asyncio.to_thread(self._save)
+        logger.info(
+            f"⛽ Gas calibration: {len(gas_units)}/{len(calls)} combinations measured "
+            f"in {len(batches)} batches ({time.monotonic() - started:.2f}s)")
+        return len(gas_units)
+
+    async def _estimate_batch(self, batch: List[Dict]) -> List[Optional[int]]:
+        """One JSON-RPC batch of eth_estimateGas (None for calls that revert)"""
+        payload = [
+            {
+                "jsonrpc": "2.0",
+                "id": i,
+                "method": "eth_estimateGas",
+                "params": [{"from": self.account, "to": call['to'], "data": call['data']}]
+            }
+            for i, call in enumerate(batch)
+        ]
+
+
+        async def request() -> List[Dict]:
+            session = get_http_session(verify_ssl=True)
+            async with session.post(self.rpc_url, json=payload, timeout=self.timeout) as response:
+                if response.status == 429:
+                    raise RateLimitedError(retry_after_seconds(response.headers))
+                if response.status != 200:
+                    raise ConnectionError(f"RPC error: {response.status}")
+                return await response.json(content_type=None)
+
+        replies = await get_request_scheduler().run('rpc', request, Priority.NORMAL)
+
+        if isinstance(replies, dict):
+            replies = [replies]
+        by_id = {r.get('id'): r.get('result') for r in replies}
+        return [int(by_id[i], 16) if by_id.get(i) else None for i in range(len(batch))]
+
+    # ═══════════════════════════════════════════════════════
+    # BACKGROUND REFRESH
+    # ═══════════════════════════════════════════════════════
+
+    def start_background_refresh(self):
+        """Re-measure whenever results are older than GAS_CALIBRATION_MAX_AGE (idempotent)"""
+        if not self.enabled:
+            logger.debug("⛽ Gas calibration disabled: no fork RPC URL or account")
+            return
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.ensure_future(self._refresh_loop())
+
+    async def stop_background_refresh(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self):
+        while True:
+            age = self.age
+            if age is None or age >= self.max_age:
+                try:
+                    await self.calibrate()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Gas calibration failed: {e}")
+            await asyncio.sleep(max(60.0, self.max_age - (self.age or 0.0)))
+
+    def get_stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'combinations': len(self.gas_units),
+            'failed': len(self.failed),
+            'age_seconds': self.age,
+            'operation_units': dict(self.operation_units)
+        }
+
+
+# Singleton instance
+_gas_calibration = None
+
+
+def get_gas_calibration() -> GasCalibration:
+    """Get singleton instance of GasCalibration"""
+    global _gas_calibration
+    if _gas_calibration is None:
+        _gas_calibration = GasCalibration()
+    return _gas_calibration
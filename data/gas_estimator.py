@@ -1,17 +1,82 @@
 """
 Real-time Gas Price Estimation
-Fetches current Ethereum gas prices and estimates swap costs
+Fetches current gas prices and estimates swap and migration costs
+
+Gas prices come from the cached EIP-1559 gas oracle when an RPC endpoint
+is configured, otherwise from Etherscan's gas tracker (cached for
+GAS_ORACLE_TTL seconds).
+
+Multi-chain: fee data for every chain in NATIVE_TOKENS and the native
+token prices are refreshed concurrently into a USD cost table (chain x
+speed x operation), the one source planners read execution costs from.
+
+Gas units per operation are the measured (protocol, operation, token)
+numbers from gas calibration when available, else the static defaults.
 """
 
+import inspect
 import os
+import time
 import aiohttp
 import asyncio
-from typing import Optional, Dict
+from typing import Callable, Dict, List, Optional
 from loguru import logger
 from dotenv import load_dotenv
 
+from data.gas_calibration import get_gas_calibration
+from data.gas_oracle import FALLBACK_GAS_PRICES, TIERS, get_gas_oracle
+from data.http_client import get_http_session
+from data.price_feeds import get_price_feed_manager
+from data.request_scheduler import (
+    RateLimitedError, get_request_scheduler, retry_after_seconds)
+
 load_dotenv()
 
+# Token gas is paid in, per chain
+NATIVE_TOKENS = {
+    'ethereum': 'ETH',
+    'arbitrum': 'ETH',
+    'optimism': 'ETH',
+    'base': 'ETH',
+    'polygon': 'POL',
+    'solana': 'SOL'
+}
+
+# Estimated migration gas cost (USD) by chain, used until live fee data
+# and native prices are available
+FALLBACK_MIGRATION_COSTS = {
+    'ethereum': 50.0,
+    'arbitrum': 5.0,
+    'optimism': 5.0,
+    'base': 5.0,
+    'polygon': 2.0,
+    'solana': 0.1,
+    'avalanche': 3.0
+}
+DEFAULT_MIGRATION_COST = 10.0
+
+# Etherscan answers HTTP 200 with this result when the per-second limit is hit
+ETHERSCAN_RATE_LIMIT_MESSAGE = 'Max rate limit reached'
+
+# A migration: approve + withdraw + swap + deposit
+MIGRATION_OPERATIONS = ('approve', 'withdraw', 'swap', 'deposit')
+
+# Solana: fixed fee per signature plus compute units per operation
+SOLANA_SIGNATURE_FEE_LAMPORTS = 5000
+SOLANA_COMPUTE_UNITS = {
+    'withdraw': 200000,
+    'repay': 200000,
+    'swap': 400000,
+    'deposit': 200000,
+    'approve': 0,            # SPL delegation rides along with the transfer
+    'bridge': 300000,
+}
+
+
+def normalize_chain(chain: str) -> str:
+    """ethereum-sepolia -> ethereum"""
+    return chain.lower().replace('-sepolia', '')
+
 
 class GasEstimator:
     """
@@ -22,34 +87,88 @@ class GasEstimator:
         self.etherscan_api_key = os.getenv('ETHERSCAN_API_KEY')
         self.etherscan_url = "https://api.etherscan.io/api"
 
-        # Gas usage estimates (in gas units) for different operations
+        # fee-history oracle (preferred) and Etherscan cache (prices, fetched_at)
+        self.oracle = get_gas_oracle('ethereum')
+        self.cache_ttl = float(os.getenv('GAS_ORACLE_TTL', '12'))
+        self._etherscan_cache: Optional[tuple] = None
+
+        # Default gas units per operation (calibrated units take precedence)
         self.gas_estimates = {
             'withdraw': 150000,      # Withdraw collateral from protocol
+            'repay': 150000,         # Repay debt
             'swap': 200000,          # Token swap (1inch/Uniswap)
             'deposit': 150000,       # Deposit to new protocol
             'approve': 50000,        # Token approval
             'bridge': 300000,        # Cross-chain bridge
         }
+        self.calibration = get_gas_calibration()
+
+        # Multi-chain cost table: chain -> speed -> operation -> USD
+        self.oracles = {chain: get_gas_oracle(chain) for chain in NATIVE_TOKENS}
+        self.native_prices: Dict[str, float] = {}
+        self.costs: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self.updated_at: Optional[float] = None
+        self._listeners: List[Callable] = []
+        self._background_tasks: set = set()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._rebuild_costs()
+        self.calibration.add_listener(self._on_calibration)
 
         logger.info("⛽ GasEstimator initialized")
+        logger.info(
+            f"   Fee history oracle: {'Configured' if self.oracle.enabled else 'Not configured'}")
         logger.info(
             f"   Etherscan API: {'Configured' if self.etherscan_api_key else 'Not configured'}")
+        logger.info(
+            f"   Gas calibration: {len(self.calibration.gas_units)} measured combinations")
+
+    def gas_units(
+        self,
+        operation: str,
+        protocol: Optional[str] = None,
+        token: Optional[str] = None
+    ) -> int:
+        """
+        Gas units for an operation (calibrated, else default)
+
+        Args:
+            operation: withdraw, repay, swap, deposit, approve or bridge
+            protocol: Protocol the operation runs against
+            token: Token being moved
+
+        Returns:
+            Gas units
+        """
+        units = self.calibration.get_gas_units(operation, protocol, token)
+        if units is not None:
+            return units
+        return self.gas_estimates.get(operation, 150000)
+
+    def _on_calibration(self):
+        previous = self.get_chain_costs()
+        self._rebuild_costs()
+        costs = self.get_chain_costs()
+        if costs != previous and self.updated_at is not None:
+            self._notify(costs)
 
     async def get_current_gas_price(self) -> Optional[Dict[str, float]]:
         """
-        Get current gas prices from Etherscan
+        Get current gas prices (fee-history oracle, then Etherscan)
 
         Returns:
             Dict with 'slow', 'standard', 'fast' gas prices in Gwei
         """
+        prices = await self.oracle.get_current_gas_prices()
+        if prices:
+            return prices
+
         if not self.etherscan_api_key:
             logger.warning(
                 "Etherscan API key not configured, using fallback gas prices")
-            return {
-                'slow': 20.0,      # 20 Gwei
-                'standard': 30.0,   # 30 Gwei
-                'fast': 50.0        # 50 Gwei
-            }
+            return dict(FALLBACK_GAS_PRICES)
+
+        if self._etherscan_cache and time.monotonic() - self._etherscan_cache[1] < self.cache_ttl:
+            return dict(self._etherscan_cache[0])
 
         try:
             params = {
@@ -58,34 +177,270 @@ class GasEstimator:
                 'apikey': self.etherscan_api_key
             }
 
-            async with aiohttp.ClientSession() as session:
+            async def request() -> Optional[Dict]:
+                session = get_http_session(verify_ssl=True)
                 async with session.get(self.etherscan_url, params=params, timeout=aiohttp.ClientTimeout(total=5)) as response:
-                    if response.status == 200:
-                        data = await response.json()
-
-                        if data.get('status') == '1' and data.get('result'):
-                            result = data['result']
-                            gas_prices = {
-                                'slow': float(result.get('SafeGasPrice', 20)),
-                                'standard': float(result.get('ProposeGasPrice', 30)),
-                                'fast': float(result.get('FastGasPrice', 50))
-                            }
-
-                            logger.info(
-                                f"⛽ Real gas prices: Slow={gas_prices['slow']} | Standard={gas_prices['standard']} | Fast={gas_prices['fast']} Gwei")
-                            return gas_prices
-
-                    logger.warning(
-                        f"Etherscan API returned status {response.status}")
+                    if response.status == 429:
+                        raise RateLimitedError(retry_after_seconds(response.headers))
+                    if response.status != 200:
+                        logger.warning(
+                            f"Etherscan API returned status {response.status}")
+                        return None
+                    data = await response.json()
+                if data.get('status') == '0' and ETHERSCAN_RATE_LIMIT_MESSAGE in str(data.get('result')):
+                    raise RateLimitedError()
+                return data
+
+            data = await get_request_scheduler().run('etherscan', request)
+            if data and data.get('status') == '1' and data.get('result'):
+                result = data['result']
+                gas_prices = {
+                    'slow': float(result.get('SafeGasPrice', 20)),
+                    'standard': float(result.get('ProposeGasPrice', 30)),
+                    'fast': float(result.get('FastGasPrice', 50))
+                }
+
+                logger.info(
+                    f"⛽ Real gas prices: Slow={gas_prices['slow']} | Standard={gas_prices['standard']} | Fast={gas_prices['fast']} Gwei")
+                self._etherscan_cache = (gas_prices, time.monotonic())
+                return dict(gas_prices)
+
+            if data:
+                logger.warning(
+                    f"Etherscan API returned {data.get('message')}: {data.get('result')}")
 
         except Exception as e:
             logger.warning(f"Failed to fetch gas prices: {e}")
 
         # Fallback to reasonable estimates
+        return dict(FALLBACK_GAS_PRICES)
+
+    # ═══════════════════════════════════════════════════════
+    # MULTI-CHAIN COST TABLE
+    # ═══════════════════════════════════════════════════════
+
+    async def refresh_all(self) -> Dict[str, float]:
+        """
+        Refresh every chain's fee data and the native token prices concurrently
+
+        Returns:
+            Per-chain migration cost (USD, standard speed)
+        """
+        oracles = [o for o in self.oracles.values() if o.enabled]
+        results = await asyncio.gather(
+            self._refresh_native_prices(),
+            *(o.refresh() for o in oracles),
+            return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"Gas refresh failed: {result}")
+
+        previous = self.get_chain_costs()
+        self._rebuild_costs()
+        self.updated_at = time.time()
+        costs = self.get_chain_costs()
+        if costs != previous:
+            self._notify(costs)
+        return costs
+
+    async def _refresh_native_prices(self):
+        tokens = sorted(set(NATIVE_TOKENS.values()))
+        prices = await get_price_feed_manager().get_multiple_prices(tokens)
+        self.native_prices.update({t: p for t, p in prices.items() if p})
+
+    def _operation_usd(self, chain: str, operation: str, speed: str) -> Optional[float]:
+        """USD cost of one operation from live data (None if unavailable)"""
+        price = self.native_prices.get(NATIVE_TOKENS.get(chain))
+        fees = self.oracles[chain].get_fee_data() if chain in self.oracles else None
+        if not price or not fees:
+            return None
+
+        if chain == 'solana':
+            micro_lamports = fees['priority_fee_micro_lamports'][speed]
+            lamports = (SOLANA_SIGNATURE_FEE_LAMPORTS
+                        + micro_lamports * SOLANA_COMPUTE_UNITS.get(operation, 200000) / 1e6)
+            return lamports / 1e9 * price
+
+        gas_price_gwei = fees['gas_price_gwei'][speed]
+        return self.gas_units(operation) * gas_price_gwei / 1e9 * price
+
+    def _rebuild_costs(self):
+        """Recompute the cost table from cached fee data and prices"""
+        units = {op: self.gas_units(op) for op in self.gas_estimates}
+        migration_gas = sum(units[op] for op in MIGRATION_OPERATIONS)
+        costs = {}
+        for chain in FALLBACK_MIGRATION_COSTS:
+            costs[chain] = {}
+            for speed in TIERS:
+                table = {}
+                for operation, gas_units in units.items():
+                    usd = self._operation_usd(chain, operation, speed)
+                    if usd is None:
+                        # Static estimate, split by the operation's share of gas
+                        usd = FALLBACK_MIGRATION_COSTS.get(
+                            chain, DEFAULT_MIGRATION_COST) * gas_units / migration_gas
+                    table[operation] = usd
+                table['migration'] = sum(table[op] for op in MIGRATION_OPERATIONS)
+                costs[chain][speed] = table
+        self.costs = costs
+
+    def get_operation_cost(
+        self,
+        chain: str,
+        operation: str,
+        speed: str = 'standard',
+        protocol: Optional[str] = None,
+        token: Optional[str] = None
+    ) -> float:
+        """
+        Cached USD cost of one operation on a chain (no I/O)
+
+        Args:
+            chain: Chain name (testnet suffixes ignored)
+            operation: withdraw, repay, swap, deposit, approve, bridge or migration
+            speed: Gas speed tier ('slow', 'standard', 'fast')
+            protocol: Protocol, for its calibrated gas units (optional)
+            token: Token, for its calibrated gas units (optional)
+
+        Returns:
+            Cost in USD
+        """
+        chain = normalize_chain(chain)
+        table = self.costs.get(chain)
+        if table is None:
+            cost = DEFAULT_MIGRATION_COST * (
+                1.0 if operation == 'migration' else self.gas_units(operation)
+                / sum(self.gas_units(op) for op in MIGRATION_OPERATIONS))
+        else:
+            cost = table[speed][operation]
+        if protocol and token and operation != 'migration' and chain != 'solana':
+            cost *= self.gas_units(operation, protocol, token) / self.gas_units(operation)
+        return cost
+
+    def get_migration_cost(self, chain: str, speed: str = 'standard') -> float:
+        """USD cost of approve + withdraw + swap + deposit on one chain"""
+        return self.get_operation_cost(chain, 'migration', speed)
+
+    def get_chain_costs(self, speed: str = 'standard') -> Dict[str, float]:
+        """Migration cost (USD) for every chain"""
+        return {chain: table[speed]['migration'] for chain, table in self.costs.items()}
+
+    def cost_for_gas_units(
+        self,
+        chain: str,
+        gas_units: int,
+        speed: str = 'standard'
+    ) -> float:
+        """
+        USD cost of a quoted gas amount (e.g. a 1inch route's gas)
+
+        Args:
+            chain: EVM chain name
+            gas_units: Gas units
+            speed: Gas speed tier
+
+        Returns:
+            Cost in USD
+        """
+        chain = normalize_chain(chain)
+        swap_cost = self.get_operation_cost(chain, 'swap', speed)
+        return swap_cost * gas_units / self.gas_units('swap')
+
+    def estimate_migration_cost(
+        self,
+        from_chain: str,
+        to_chain: str,
+        speed: str = 'standard'
+    ) -> float:
+        """
+        USD cost of moving a position between chains (no I/O)
+
+        Source chain pays approve + withdraw + swap (+ bridge when
+        cross-chain); the target chain pays the deposit (+ approve).
+
+        Args:
+            from_chain: Current chain
+            to_chain: Target chain
+            speed: Gas speed tier
+
+        Returns:
+            Cost in USD
+        """
+        from_chain, to_chain = normalize_chain(from_chain), normalize_chain(to_chain)
+        cost = sum(self.get_operation_cost(from_chain, op, speed)
+                   for op in ('approve', 'withdraw', 'swap'))
+        if from_chain != to_chain:
+            cost += self.get_operation_cost(from_chain, 'bridge', speed)
+            cost += self.get_operation_cost(to_chain, 'approve', speed)
+        return cost + self.get_operation_cost(to_chain, 'deposit', speed)
+
+    def add_listener(self, callback: Callable):
+        """
+        Call callback(chain_costs) whenever migration costs change
+
+        Coroutine functions are scheduled on the running loop. Called once
+        right away if costs have already been refreshed.
+        """
+        if callback in self._listeners:
+            return
+        self._listeners.append(callback)
+        if self.updated_at is not None:
+            self._notify(self.get_chain_costs(), [callback])
+
+    def remove_listener(self, callback: Callable):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, costs: Dict[str, float], callbacks: Optional[List[Callable]] = None):
+        for callback in list(callbacks or self._listeners):
+            try:
+                result = callback(dict(costs))
+                if inspect.isawaitable(result):
+                    task = asyncio.ensure_future(result)
+                    self._background_tasks.add(task)
+                    task.add_done_callback(self._background_tasks.discard)
+            except Exception as e:
+                logger.error(f"Gas cost listener failed: {e}")
+
+    def start_background_refresh(self):
+        """Refresh all chains every GAS_ORACLE_TTL on the running loop (idempotent)"""
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        get_price_feed_manager().add_hot_tokens(set(NATIVE_TOKENS.values()))
+        self._refresh_task = asyncio.ensure_future(self._refresh_loop())
+        self.calibration.start_background_refresh()
+        enabled = [c for c, o in self.oracles.items() if o.enabled]
+        logger.info(
+            f"🔄 Gas refresh started for {', '.join(enabled) or 'no chains'} "
+            f"(every {self.cache_ttl:.0f}s)")
+
+    async def stop_background_refresh(self):
+        await self.calibration.stop_background_refresh()
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh_all()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Gas refresh failed: {e}")
+            await asyncio.sleep(self.cache_ttl)
+
+    def get_stats(self) -> Dict:
         return {
-            'slow': 20.0,
-            'standard': 30.0,
-            'fast': 50.0
+            'chains': {chain: oracle.get_stats() for chain, oracle in self.oracles.items()},
+            'native_prices': dict(self.native_prices),
+            'calibration': self.calibration.get_stats(),
+            'migration_costs': self.get_chain_costs(),
+            'updated_at': self.updated_at
         }
 
     async def estimate_rebalance_cost(
@@ -112,15 +467,15 @@ class GasEstimator:
 
         # Calculate total gas needed
         total_gas = (
-            self.gas_estimates['approve'] +      # Approve token
-            self.gas_estimates['withdraw'] +     # Withdraw from source
-            self.gas_estimates['swap']           # Swap token
+            self.gas_units('approve') +      # Approve token
+            self.gas_units('withdraw') +     # Withdraw from source
+            self.gas_units('swap')           # Swap token
         )
 
         if cross_chain:
-            total_gas += self.gas_estimates['bridge']  # Bridge to new chain
+            total_gas += self.gas_units('bridge')  # Bridge to new chain
 
-        total_gas += self.gas_estimates['deposit']  # Deposit to target
+        total_gas += self.gas_units('deposit')  # Deposit to target
 
         # Convert to ETH cost
         # 1 Gwei = 0.000000001 ETH
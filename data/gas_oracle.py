@@ -0,0 +1,390 @@
+"""
+LiquidityGuard AI - EIP-1559 Gas Oracle
+
+Rolling eth_feeHistory window per EVM chain over JSON-RPC (any node:
+Alchemy, a public RPC or a local anvil fork):
+- Incremental refresh: only blocks produced since the last fetch are
+  requested, and the window rolls over the newest GAS_ORACLE_WINDOW blocks
+- Slow / standard / fast priority fees from reward percentiles across
+  the window
+- Base fee forecast for the next few blocks from the node's next-block
+  base fee and recent block fullness (EIP-1559 adjusts +-12.5% per block)
+- Fees are precomputed on refresh, so estimates are memory reads
+
+Solana priority fees come from getRecentPrioritizationFees (SolanaFeeOracle).
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from statistics import median
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from loguru import logger
+
+from data.env_config import is_configured
+from data.http_client import get_http_session
+from data.request_scheduler import (
+    Priority, RateLimitedError, get_request_scheduler, retry_after_seconds)
+from data.single_flight import SingleFlight
+
+load_dotenv()
+
+TIERS = ('slow', 'standard', 'fast')
+
+# Reward percentiles requested per block (one per tier)
+FEE_PERCENTILES = (10, 50, 90)
+
+# Average block time (seconds), to request only the blocks since last fetch
+BLOCK_TIMES = {
+    'ethereum': 12.0,
+    'arbitrum': 0.25,
+    'optimism': 2.0,
+    'base': 2.0,
+    'polygon': 2.0,
+    'avalanche': 2.0
+}
+
+# EIP-1559: base fee moves at most 1/8 per block
+BASE_FEE_MAX_CHANGE = 0.125
+
+# Fallback when nothing has been fetched (Gwei)
+FALLBACK_GAS_PRICES = {'slow': 20.0, 'standard': 30.0, 'fast': 50.0}
+
+
+def chain_rpc_url(chain: str) -> Optional[str]:
+    """
+    JSON-RPC endpoint for a chain from {CHAIN}_RPC_URL
+
+    Ethereum also accepts ETH_RPC_URL. Placeholders count as unset.
+    """
+    names = [f"{chain.upper()}_RPC_URL"]
+    if chain == 'ethereum':
+        names.append('ETH_RPC_URL')
+    for name in names:
+        value = os.getenv(name)
+        if is_configured(value):
+            return value
+    return None
+
+
+class GasOracle:
+    """
+    Cached EIP-1559 fee data for one chain
+    """
+
+    def __init__(self, chain: str = 'ethereum', rpc_url: Optional[str] = None):
+        self.chain = chain
+        self.rpc_url = rpc_url or chain_rpc_url(chain)
+        self.window = int(os.getenv('GAS_ORACLE_WINDOW', '20'))
+        self.forecast_blocks = int(os.getenv('GAS_ORACLE_FORECAST_BLOCKS', '3'))
+        self.ttl = float(os.getenv('GAS_ORACLE_TTL', '12'))
+        self.timeout = float(os.getenv('GAS_ORACLE_TIMEOUT', '10'))
+        self.block_time = BLOCK_TIMES.get(chain, 12.0)
+
+        # Rolling window: {'number', 'base_fee', 'gas_used_ratio', 'rewards'} (wei)
+        self.blocks: deque = deque(maxlen=self.window)
+        self.next_base_fee: Optional[int] = None  # Wei, as reported by the node
+        self.fetched_at: Optional[float] = None  # time.monotonic()
+        self._fees: Optional[Dict] = None
+
+        self._flight = SingleFlight(f"gas_oracle:{chain}")
+        self._background_tasks: set = set()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+        # Stats
+        self.fetches = 0
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rpc_url is not None
+
+    @property
+    def age(self) -> Optional[float]:
+        if self.fetched_at is None:
+            return None
+        return time.monotonic() - self.fetched_at
+
+    # ═══════════════════════════════════════════════════════
+    # READS (no I/O)
+    # ═══════════════════════════════════════════════════════
+
+    def get_gas_prices(self) -> Optional[Dict[str, float]]:
+        """
+        Cached slow/standard/fast gas prices in Gwei
+
+        Returns:
+            Dict with 'slow', 'standard', 'fast', or None before the first fetch
+        """
+        if self._fees is None:
+            return None
+        return dict(self._fees['gas_price_gwei'])
+
+    def get_fee_data(self) -> Optional[Dict]:
+        """
+        Cached EIP-1559 fee data
+
+        Returns:
+            Dict with base fee, base fee forecast, per-tier priority fee,
+            effective gas price and suggested maxFeePerGas (all Gwei)
+        """
+        if self._fees is None:
+            return None
+        return {**self._fees, 'age_seconds': self.age}
+
+    async def get_current_gas_prices(self) -> Optional[Dict[str, float]]:
+        """
+        Gas prices, fetching only when nothing is cached
+
+        Stale data is served immediately while a refresh runs in the
+        background.
+
+        Returns:
+            Dict with 'slow', 'standard', 'fast' in Gwei, or None if unavailable
+        """
+        if not self.enabled:
+            return None
+        if self._fees is None:
+            await self.refresh()
+        elif self.age >= self.ttl:
+            self._refresh_in_background()
+        return self.get_gas_prices()
+
+    # ═══════════════════════════════════════════════════════
+    # FETCH
+    # ═══════════════════════════════════════════════════════
+
+    async def refresh(self, priority: Optional[int] = None) -> bool:
+        """
+        Fetch new blocks' fee history (coalesced with concurrent refreshes)
+
+        Returns:
+            True if fee data was updated
+        """
+        if not self.enabled:
+            return False
+        return await self._flight.do("fee_history", lambda: self._fetch(priority))
+
+    def _refresh_in_background(self):
+        if self._flight.in_flight("fee_history"):
+            return
+        task = asyncio.ensure_future(self.refresh())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    def _blocks_to_fetch(self) -> int:
+        if not self.blocks or self.age is None:
+            return self.window
+        produced = math.ceil(self.age / self.block_time)
+        # One block of overlap replaces a reorged head
+        return max(1, min(self.window, produced + 1))
+
+    async def _rpc(self, method: str, params: list, priority: Optional[int]):
+        payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
+
+        async def request() -> Dict:
+            session = get_http_session(verify_ssl=True)
+            async with session.post(self.rpc_url, json=payload, timeout=self.timeout) as response:
+                if response.status == 429:
+                    raise RateLimitedError(retry_after_seconds(response.headers))
+                if response.status != 200:
+                    raise ConnectionError(f"RPC error: {response.status}")
+                return await response.json(content_type=None)
+
+        reply = await get_request_scheduler().run('rpc', request, priority)
+        if reply.get('error'):
+            raise ValueError(reply['error'].get('message', reply['error']))
+        return reply['result']
+
+    async def _fee_history(self, count: int, priority: Optional[int]) -> Dict:
+        return await self._rpc(
+            'eth_feeHistory', [hex(count), "latest", list(FEE_PERCENTILES)], priority)
+
+    async def _fetch(self, priority: Optional[int] = None) -> bool:
+        try:
+            fees = await self._update(priority)
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"⛽ {self.chain} fee data fetch failed: {e}")
+            return False
+
+        self.fetches += 1
+        self.fetched_at = time.monotonic()
+        self._fees = fees
+        logger.debug(f"⛽ {self.chain} fees updated: {self._describe()}")
+        return True
+
+    async def _update(self, priority: Optional[int]) -> Dict:
+        """Fetch new blocks into the window and recompute fee data"""
+        result = await self._fee_history(self._blocks_to_fetch(), priority)
+        oldest = int(result['oldestBlock'], 16)
+        if self.blocks and oldest > self.blocks[-1]['number'] + 1:
+            # More blocks than the block time predicted: fetch the gap too
+            newest = oldest + len(result.get('gasUsedRatio') or []) - 1
+            count = min(self.window, newest - self.blocks[-1]['number'])
+            result = await self._fee_history(count, priority)
+        self._ingest(result)
+        return self._compute_fees()
+
+    def _describe(self) -> str:
+        prices = self._fees['gas_price_gwei']
+        return (f"block {self._fees['block']}, Slow={prices['slow']:.2f} | "
+                f"Standard={prices['standard']:.2f} | Fast={prices['fast']:.2f} Gwei")
+
+    def _ingest(self, result: Dict):
+        """Merge an eth_feeHistory result into the rolling window"""
+        oldest = int(result['oldestBlock'], 16)
+        base_fees = [int(v, 16) for v in result['baseFeePerGas']]
+        ratios = result.get('gasUsedRatio') or []
+        rewards = result.get('reward') or []
+
+        # Blocks at or after `oldest` are superseded (overlap or reorg)
+        while self.blocks and self.blocks[-1]['number'] >= oldest:
+            self.blocks.pop()
+
+        for i, ratio in enumerate(ratios):
+            block_rewards = rewards[i] if i < len(rewards) else []
+            self.blocks.append({
+                'number': oldest + i,
+                'base_fee': base_fees[i],
+                'gas_used_ratio': float(ratio),
+                'rewards': [int(v, 16) for v in block_rewards]
+            })
+        # baseFeePerGas has one extra entry: the next block's base fee
+        self.next_base_fee = base_fees[len(ratios)] if len(base_fees) > len(ratios) else base_fees[-1]
+
+    def _compute_fees(self) -> Dict:
+        blocks = list(self.blocks)
+
+        # Empty blocks report zero rewards; they say nothing about the tip market
+        busy = [b for b in blocks if b['gas_used_ratio'] > 0 and b['rewards']]
+        priority_fees = {}
+        for i, tier in enumerate(TIERS):
+            samples = [b['rewards'][i] for b in busy if i < len(b['rewards'])]
+            priority_fees[tier] = median(samples) if samples else 0
+
+        # Base fee trend from average fullness vs the 50% target
+        fullness = sum(b['gas_used_ratio'] for b in blocks) / len(blocks) if blocks else 0.5
+        change = max(-BASE_FEE_MAX_CHANGE, min(
+            BASE_FEE_MAX_CHANGE, BASE_FEE_MAX_CHANGE * (2 * fullness - 1)))
+        floor = min((b['base_fee'] for b in blocks), default=0)
+        base = self.next_base_fee or 0
+        forecast = [max(floor, base * (1 + change) ** k) for k in range(max(1, self.forecast_blocks))]
+
+        # Slow waits for the cheapest forecast block, fast pays for the dearest
+        base_by_tier = {
+            'slow': min(forecast),
+            'standard': sum(forecast) / len(forecast),
+            'fast': max(forecast)
+        }
+        return {
+            'chain': self.chain,
+            'block': blocks[-1]['number'] if blocks else None,
+            'base_fee_gwei': base / 1e9,
+            'base_fee_forecast_gwei': [f / 1e9 for f in forecast],
+            'priority_fee_gwei': {t: priority_fees[t] / 1e9 for t in TIERS},
+            'gas_price_gwei': {
+                t: (base_by_tier[t] + priority_fees[t]) / 1e9 for t in TIERS},
+            # Standard wallet rule: survives ~6 full blocks of base fee increases
+            'max_fee_gwei': {
+                t: (2 * max(forecast) + priority_fees[t]) / 1e9 for t in TIERS}
+        }
+
+    # ═══════════════════════════════════════════════════════
+    # BACKGROUND REFRESH
+    # ═══════════════════════════════════════════════════════
+
+    def start_background_refresh(self):
+        """Refresh fee history every TTL on the running loop (idempotent)"""
+        if not self.enabled:
+            logger.debug(f"⛽ {self.chain} gas oracle disabled: no RPC URL")
+            return
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.ensure_future(self._refresh_loop())
+        logger.info(f"🔄 {self.chain} gas oracle refresh started (every {self.ttl:.0f}s)")
+
+    async def stop_background_refresh(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh(Priority.NORMAL)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"{self.chain} gas oracle refresh failed: {e}")
+            await asyncio.sleep(self.ttl)
+
+    def get_stats(self) -> Dict:
+        return {
+            'chain': self.chain,
+            'enabled': self.enabled,
+            'blocks': len(self.blocks),
+            'latest_block': self.blocks[-1]['number'] if self.blocks else None,
+            'age_seconds': self.age,
+            'fetches': self.fetches,
+            'failures': self.failures
+        }
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class SolanaFeeOracle(GasOracle):
+    """
+    Cached Solana priority fees from getRecentPrioritizationFees
+
+    Fees are micro-lamports per compute unit, on top of the fixed
+    per-signature base fee.
+    """
+
+    def __init__(self, rpc_url: Optional[str] = None):
+        super().__init__('solana', rpc_url)
+
+    def get_gas_prices(self) -> Optional[Dict[str, float]]:
+        """Solana has no Gwei gas price; see get_fee_data()"""
+        return None
+
+    async def _update(self, priority: Optional[int]) -> Dict:
+        result = await self._rpc('getRecentPrioritizationFees', [], priority)
+        fees = sorted(float(f['prioritizationFee']) for f in result)
+        return {
+            'chain': self.chain,
+            'slot': max((f['slot'] for f in result), default=None),
+            'priority_fee_micro_lamports': {
+                tier: _percentile(fees, pct) for tier, pct in zip(TIERS, FEE_PERCENTILES)}
+        }
+
+    def _describe(self) -> str:
+        fees = self._fees['priority_fee_micro_lamports']
+        return (f"slot {self._fees['slot']}, Slow={fees['slow']:.0f} | "
+                f"Standard={fees['standard']:.0f} | Fast={fees['fast']:.0f} micro-lamports/CU")
+
+
+# Per-chain singleton instances
+_gas_oracles: Dict[str, GasOracle] = {}
+
+
+def get_gas_oracle(chain: str = 'ethereum') -> GasOracle:
+    """Get the shared GasOracle for a chain (SolanaFeeOracle for solana)"""
+    oracle = _gas_oracles.get(chain)
+    if oracle is None:
+        oracle = SolanaFeeOracle() if chain == 'solana' else GasOracle(chain)
+        _gas_oracles[chain] = oracle
+    return oracle
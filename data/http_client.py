@@ -0,0 +1,143 @@
+"""
+LiquidityGuard AI - Shared HTTP Client
+
+One long-lived aiohttp session per event loop, shared by every data
+fetcher and agent instead of opening a new ClientSession (and a new TLS
+handshake) for each request.
+
+Features:
+- Per-host connection pools with keep-alive
+- DNS caching
+- Configurable concurrency limits and timeouts (see .env.example)
+"""
+
+import aiohttp
+import asyncio
+import os
+import ssl
+import threading
+from typing import Dict, Tuple
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+
+
+class HttpClient:
+    """
+    Pooled HTTP client shared across data/ and agents/
+
+    aiohttp sessions are bound to the event loop that created them, so one
+    session is kept per (loop, verify_ssl) pair. Agents run a single loop,
+    which means in practice every module shares the same connection pool.
+    """
+
+    def __init__(self):
+        self.pool_limit = int(os.getenv('HTTP_POOL_LIMIT', '100'))
+        self.pool_limit_per_host = int(
+            os.getenv('HTTP_POOL_LIMIT_PER_HOST', '10'))
+        self.keepalive_timeout = float(
+            os.getenv('HTTP_KEEPALIVE_TIMEOUT', '60'))
+        self.dns_cache_ttl = int(os.getenv('HTTP_DNS_CACHE_TTL', '300'))
+        self.timeout = aiohttp.ClientTimeout(
+            total=float(os.getenv('HTTP_TIMEOUT', '30')),
+            connect=float(os.getenv('HTTP_CONNECT_TIMEOUT', '10'))
+        )
+
+        # SSL contexts are built once and reused by every connection
+        self._verified_ssl = ssl.create_default_context()
+        self._unverified_ssl = ssl.create_default_context()
+        self._unverified_ssl.check_hostname = False
+        self._unverified_ssl.verify_mode = ssl.CERT_NONE
+
+        self._sessions: Dict[Tuple[asyncio.AbstractEventLoop, bool],
+                             aiohttp.ClientSession] = {}
+        # Agent HTTP handlers run on their own threads and loops
+        self._lock = threading.Lock()
+
+        logger.info("🌐 HttpClient initialized")
+        logger.info(
+            f"   Pool: {self.pool_limit} total, {self.pool_limit_per_host} per host | "
+            f"Keep-alive: {self.keepalive_timeout:.0f}s | DNS cache: {self.dns_cache_ttl}s")
+
+    def get_session(self, verify_ssl: bool = True) -> aiohttp.ClientSession:
+        """
+        Get the shared session for the running event loop
+
+        Args:
+            verify_ssl: Verify TLS certificates. Development fetchers that
+                previously disabled verification pass False.
+
+        Returns:
+            Long-lived aiohttp.ClientSession (do not close it per request)
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            return self._get_or_create_session(loop, verify_ssl)
+
+    def _get_or_create_session(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        verify_ssl: bool
+    ) -> aiohttp.ClientSession:
+        """Return the cached session for (loop, verify_ssl), creating it if needed"""
+        self._prune_closed_loops()
+
+        key = (loop, verify_ssl)
+        session = self._sessions.get(key)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                ssl=self._verified_ssl if verify_ssl else self._unverified_ssl,
+                limit=self.pool_limit,
+                limit_per_host=self.pool_limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+                use_dns_cache=True
+            )
+            session = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout)
+            self._sessions[key] = session
+            logger.debug(
+                f"🌐 Opened pooled HTTP session (verify_ssl={verify_ssl})")
+
+        return session
+
+    async def close(self):
+        """Close the sessions owned by the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            sessions = [self._sessions.pop(k)
+                        for k in list(self._sessions) if k[0] is loop]
+
+        for session in sessions:
+            if not session.closed:
+                await session.close()
+        logger.debug("🌐 Closed pooled HTTP sessions")
+
+    def _prune_closed_loops(self):
+        """Forget sessions whose event loop has already been closed"""
+        for key in [k for k in list(self._sessions) if k[0].is_closed()]:
+            del self._sessions[key]
+
+
+# Singleton instance
+_http_client = None
+
+
+def get_http_client() -> HttpClient:
+    """Get singleton instance of HttpClient"""
+    global _http_client
+    if _http_client is None:
+        _http_client = HttpClient()
+    return _http_client
+
+
+def get_http_session(verify_ssl: bool = True) -> aiohttp.ClientSession:
+    """Shortcut for get_http_client().get_session()"""
+    return get_http_client().get_session(verify_ssl=verify_ssl)
+
+
+async def close_http_client():
+    """Close pooled sessions for the running loop (call on agent shutdown)"""
+    if _http_client is not None:
+        await _http_client.close()
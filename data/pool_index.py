@@ -0,0 +1,392 @@
+"""
+LiquidityGuard AI - Columnar Pool Index
+
+The pools snapshot re-laid out for queries: one array per field, rows
+pre-sorted by APY (highest first), with project, chain and token stored
+as categorical codes normalised once per snapshot.
+
+- Filters are bitmasks (Python ints, one bit per row) combined with & / |
+- min_apy is a prefix of the APY-sorted rows (bisect)
+- Ranked results are the set bits in row order - no per-query sort
+- Token extraction is leftmost-longest, so "WSTETH" is always STETH
+  (the old per-query scan depended on set iteration order)
+- An inverted index maps (protocol, chain, token) keys to the best pool,
+  so current-APY lookups are dictionary hits
+- top_k_diverse: streaming top-k with a per-protocol cap
+"""
+
+import heapq
+import itertools
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+# Pools above this APY are data errors for every query (e.g. 352,603%)
+MAX_REALISTIC_APY = 100.0
+
+# Lending protocols (substring of the project slug with '-' removed)
+LENDING_PROTOCOLS = (
+    'aave', 'compound', 'spark', 'morpho',
+    'kamino', 'solend', 'marginfi', 'drift',
+    'venus', 'benqi', 'radiant',
+    'lido', 'rocketpool', 'frax'
+)
+
+SUPPORTED_CHAINS = (
+    'ethereum', 'arbitrum', 'optimism', 'base', 'polygon',
+    'solana', 'avalanche'
+)
+
+# Common tokens we care about (code = position + 1, 0 = none)
+SUPPORTED_TOKENS = (
+    'ETH', 'WETH', 'STETH', 'RETH',
+    'USDC', 'USDT', 'DAI', 'USDE',
+    'WBTC', 'BTC',
+    'SOL', 'MSOL', 'JSOL'
+)
+
+MIN_POOL_TVL = 100000  # < $100k - likely unreliable
+
+# Leftmost match wins, longest alternative first at the same position
+# ("WETH-USDC" -> WETH, "WSTETH" -> STETH, "MSOL" -> MSOL)
+_TOKEN_PATTERN = re.compile('|'.join(
+    re.escape(t) for t in sorted(SUPPORTED_TOKENS, key=len, reverse=True)))
+_TOKEN_CODES = {t: i + 1 for i, t in enumerate(SUPPORTED_TOKENS)}
+
+
+def extract_token(symbol: str) -> Optional[str]:
+    """Extract the supported token from a pool symbol ("aUSDC" -> "USDC")"""
+    match = _TOKEN_PATTERN.search(symbol.upper())
+    return match.group(0) if match else None
+
+
+def normalize_project(project: str) -> str:
+    """Normalize a project slug (remove version suffixes, liquidity, finance, etc.)"""
+    return (project.lower().replace('-', '')
+            .replace('v3', '').replace('v2', '').replace('v1', '')
+            .replace('liquidity', '').replace('finance', '')
+            .replace('_', '')
+            .strip())
+
+
+def token_key(token: str) -> str:
+    """Lookup key for a token (WETH/ETH/STETH pools all contain "ETH")"""
+    token = token.upper()
+    return 'ETH' if token == 'WETH' else token
+
+
+def top_k_diverse(
+    items: Iterable[Any],
+    limit: int,
+    max_per_group: int,
+    group: Callable[[Any], Hashable],
+    score: Optional[Callable[[Any], float]] = None
+) -> List[Any]:
+    """
+    Best `limit` items with at most `max_per_group` from any one group
+
+    Args:
+        items: Candidates (best first if score is None)
+        limit: Number of items to return
+        max_per_group: Cap per group (e.g. 3 pools per protocol)
+        group: Group key of an item (e.g. protocol)
+        score: Ranking key (higher is better); None if items are already ranked
+
+    Returns:
+        Selected items, best first (ties keep input order)
+    """
+    if limit <= 0:
+        return []
+
+    if score is None:
+        # Already ranked: walk until full, no materialisation
+        selected = []
+        counts: Dict[Hashable, int] = {}
+        for item in items:
+            key = group(item)
+            count = counts.get(key, 0)
+            if count < max_per_group:
+                selected.append(item)
+                counts[key] = count + 1
+                if len(selected) >= limit:
+                    break
+        return selected
+
+    # Bounded min-heap per group keeps its best max_per_group: O(n log k)
+    seq = itertools.count()
+    heaps: Dict[Hashable, List[Tuple[float, int, Any]]] = {}
+    for item in items:
+        entry = (score(item), -next(seq), item)
+        heap = heaps.setdefault(group(item), [])
+        if len(heap) < max_per_group:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+
+    # Global selection over the survivors (at most groups x max_per_group)
+    survivors = (entry for heap in heaps.values() for entry in heap)
+    best = heapq.nlargest(limit, survivors, key=lambda e: e[:2])
+    return [item for _, _, item in best]
+
+
+def _bitmask(rows: Iterable[int], size: int) -> int:
+    bits = bytearray((size + 7) // 8)
+    for row in rows:
+        bits[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(bits, 'little')
+
+
+class PoolIndex:
+    """
+    Columnar, APY-ranked view of one pools snapshot
+    """
+
+    def __init__(self, pools: List[Dict], version: int = 0):
+        """
+        Args:
+            pools: Compact pool dicts from the snapshot
+            version: Snapshot version the index was built from
+        """
+        self.version = version
+
+        # Row order = APY descending (stable, so ties keep snapshot order)
+        order = sorted(range(len(pools)), key=lambda i: -pools[i]['apy'])
+        self.size = len(order)
+
+        # Categories (code -> value)
+        self.projects: List[str] = []       # Normalized project name
+        self.project_slugs: List[str] = []  # Raw DeFi Llama slug
+        self.chains: List[str] = []         # Lowercase chain
+        project_codes: Dict[str, int] = {}
+        chain_codes: Dict[str, int] = {}
+
+        # Columns
+        self.apy = array('d')
+        self.tvl = array('d')
+        self.project = array('H')
+        self.chain = array('H')
+        self.token = array('B')
+        self.symbols: List[str] = []
+        self.pool_ids: List[str] = []
+
+        for pool in (pools[i] for i in order):
+            slug = pool['project']
+            code = project_codes.get(slug)
+            if code is None:
+                code = project_codes[slug] = len(self.project_slugs)
+                self.project_slugs.append(slug)
+                self.projects.append(normalize_project(slug))
+            self.project.append(code)
+
+            chain = pool['chain'].lower()
+            code = chain_codes.get(chain)
+            if code is None:
+                code = chain_codes[chain] = len(self.chains)
+                self.chains.append(chain)
+            self.chain.append(code)
+
+            token = extract_token(pool['symbol'])
+            self.token.append(_TOKEN_CODES[token] if token else 0)
+
+            self.apy.append(pool['apy'])
+            self.tvl.append(pool['tvlUsd'])
+            self.symbols.append(pool['symbol'])
+            self.pool_ids.append(pool['pool'])
+
+        # Ascending copy for bisecting the min_apy prefix
+        self._neg_apy = array('d', (-apy for apy in self.apy))
+
+        # Per-category row masks
+        self.chain_masks = self._masks(self.chain, len(self.chains))
+        self.token_masks = self._masks(self.token, len(SUPPORTED_TOKENS) + 1)
+        self.slug_masks = self._masks(self.project, len(self.project_slugs))
+        self.project_masks: Dict[str, int] = {}
+        for code, name in enumerate(self.projects):
+            self.project_masks[name] = self.project_masks.get(name, 0) | self.slug_masks[code]
+
+        # Rows every yield query starts from: lending protocol on a
+        # supported chain, realistic APY, enough TVL, known token
+        lending = 0
+        for code, slug in enumerate(self.project_slugs):
+            if any(lp in slug.lower().replace('-', '') for lp in LENDING_PROTOCOLS):
+                lending |= self.slug_masks[code]
+        chains = 0
+        for code, chain in enumerate(self.chains):
+            if chain in SUPPORTED_CHAINS:
+                chains |= self.chain_masks[code]
+        realistic = self.apy_at_most(MAX_REALISTIC_APY)
+        liquid = _bitmask(
+            (row for row, tvl in enumerate(self.tvl) if tvl >= MIN_POOL_TVL),
+            self.size)
+        known_token = self.all_rows & ~self.token_masks[0]
+        self.lending = lending & chains & realistic & liquid & known_token
+
+        # Inverted index: (project code, chain code, token key) -> best row
+        self._best: Dict[Tuple[int, int, str], int] = {}
+        self._lookups: Dict[Tuple[str, str, str], Optional[int]] = {}
+        self._build_apy_index()
+
+    def _build_apy_index(self):
+        tokens_by_symbol: Dict[str, Tuple[str, ...]] = {}
+
+        for row in range(self.size):
+            # Ranked rows: the first row seen for a key has its best APY
+            if self.apy[row] <= 0:
+                break
+            symbol = self.symbols[row]
+            tokens = tokens_by_symbol.get(symbol)
+            if tokens is None:
+                upper = symbol.upper()
+                tokens = tuple(t for t in SUPPORTED_TOKENS if t in upper)
+                tokens_by_symbol[symbol] = tokens
+            project = self.project[row]
+            chain = self.chain[row]
+            for token in tokens:
+                self._best.setdefault((project, chain, token), row)
+
+    def _masks(self, codes: array, count: int) -> List[int]:
+        rows: List[List[int]] = [[] for _ in range(count)]
+        for row, code in enumerate(codes):
+            rows[code].append(row)
+        return [_bitmask(r, self.size) for r in rows]
+
+    @property
+    def all_rows(self) -> int:
+        return (1 << self.size) - 1
+
+    def apy_at_least(self, min_apy: float) -> int:
+        """Mask of rows with apy >= min_apy (a prefix of the ranking)"""
+        return (1 << bisect_right(self._neg_apy, -min_apy)) - 1
+
+    def apy_at_most(self, max_apy: float) -> int:
+        """Mask of rows with apy <= max_apy (a suffix of the ranking)"""
+        return self.all_rows & ~self.apy_above(max_apy)
+
+    def apy_above(self, apy: float) -> int:
+        """Mask of rows with apy > value"""
+        return (1 << bisect_left(self._neg_apy, -apy)) - 1
+
+    def token_mask(self, token: str) -> int:
+        """Mask of rows whose extracted token is token (0 if unsupported)"""
+        code = _TOKEN_CODES.get(token.upper())
+        return self.token_masks[code] if code else 0
+
+    def chain_mask(self, chains: Iterable[str]) -> int:
+        """Mask of rows on any of chains"""
+        wanted = {c.lower() for c in chains}
+        mask = 0
+        for code, chain in enumerate(self.chains):
+            if chain in wanted:
+                mask |= self.chain_masks[code]
+        return mask
+
+    def protocol_mask(self, protocols: Iterable[str]) -> int:
+        """Mask of rows whose normalized project name is in protocols"""
+        mask = 0
+        for name in protocols:
+            mask |= self.project_masks.get(name, 0)
+        return mask
+
+    def yields_mask(self, token: Optional[str] = None, min_apy: float = 0.0) -> int:
+        """
+        Mask of lending yields, as filtered by get_all_yields
+
+        Args:
+            token: Optional token filter (USDC, ETH, etc.)
+            min_apy: Minimum APY threshold
+
+        Returns:
+            Row bitmask
+        """
+        mask = self.lending & self.apy_at_least(min_apy)
+        if token:
+            mask &= self.token_mask(token)
+        return mask
+
+    def best_pool(self, protocol: str, chain: str, token: str) -> Optional[int]:
+        """
+        Best-APY row for a (protocol, chain, token) position
+
+        Matching is flexible: the protocol (version suffix dropped) may be
+        any part of the project slug, the chain any part of the pool chain.
+
+        Args:
+            protocol: Protocol name (aave-v3, aave_v3, compound, kamino)
+            chain: Chain name (ethereum-sepolia -> ethereum)
+            token: Token symbol (WETH/ETH also match STETH pools)
+
+        Returns:
+            Row index, or None if no pool matches
+        """
+        protocol_search = (protocol.lower().replace('_', '-')
+                           .replace('-v3', '').replace('-v2', '').replace('-', ''))
+        chain_search = chain.lower().split('-')[0]
+        token = token_key(token)
+
+        query = (protocol_search, chain_search, token)
+        if query in self._lookups:
+            return self._lookups[query]
+
+        projects = [code for code, slug in enumerate(self.project_slugs)
+                    if protocol_search in slug.lower().replace('-', '')]
+        chains = [code for code, name in enumerate(self.chains)
+                  if chain_search in name]
+
+        if token in _TOKEN_CODES:
+            rows = (self._best.get((p, c, token)) for p in projects for c in chains)
+            # Lower row = higher APY
+            row = min((r for r in rows if r is not None), default=None)
+        else:
+            row = self._scan_best(projects, chains, token)
+
+        self._lookups[query] = row
+        return row
+
+    def _scan_best(self, projects: List[int], chains: List[int], token: str) -> Optional[int]:
+        """Substring match on symbols for tokens outside the inverted index"""
+        mask = 0
+        for code in projects:
+            mask |= self.slug_masks[code]
+        chain_mask = 0
+        for code in chains:
+            chain_mask |= self.chain_masks[code]
+
+        for row in self.rows(mask & chain_mask):
+            if self.apy[row] <= 0:
+                break
+            if token in self.symbols[row].upper():
+                return row
+        return None
+
+    def rows(self, mask: int) -> Iterator[int]:
+        """Rows set in mask, best APY first"""
+        for offset, byte in enumerate(mask.to_bytes((self.size + 7) // 8, 'little')):
+            if byte:
+                base = offset << 3
+                while byte:
+                    low = byte & -byte
+                    yield base + low.bit_length() - 1
+                    byte ^= low
+
+    def count(self, mask: int) -> int:
+        return bin(mask).count('1')
+
+    def protocol(self, row: int) -> str:
+        """Normalized protocol name of a row"""
+        return self.projects[self.project[row]]
+
+    def record(self, row: int) -> Dict:
+        """Yield dict for a row (get_all_yields format)"""
+        protocol = self.protocol(row)
+        chain = self.chains[self.chain[row]]
+        token = SUPPORTED_TOKENS[self.token[row] - 1] if self.token[row] else None
+        return {
+            'protocol': protocol,
+            'chain': chain,
+            'token': token,
+            'apy': self.apy[row],
+            'pool': f"{protocol}_{chain}_{token}".lower(),
+            'pool_id': self.pool_ids[row],
+            'tvlUsd': self.tvl[row]
+        }
@@ -0,0 +1,469 @@
+"""
+LiquidityGuard AI - DeFi Llama Pools Snapshot
+
+One shared, in-memory copy of yields.llama.fi/pools for every
+ProtocolDataFetcher query, instead of a multi-megabyte download per call.
+
+- Refreshed on a TTL (DEFILLAMA_POOLS_TTL) by a background task
+- Stale snapshots are served while a refresh runs (stale-while-revalidate)
+- Concurrent cold-start callers share one download (single-flight)
+- The payload is decoded pool by pool while it downloads and only the
+  fields queries read are kept (compact records, interned strings)
+- Each refresh also builds the columnar PoolIndex queries filter on
+- The last snapshot is kept on disk (gzip) with its ETag/Last-Modified:
+  restarts serve it immediately and refreshes use conditional GETs, so
+  an unchanged dataset is never downloaded twice
+"""
+
+import asyncio
+import codecs
+import gzip
+import json
+import os
+import re
+import sys
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+from loguru import logger
+
+from data.http_client import get_http_session
+from data.pool_index import MAX_REALISTIC_APY, PoolIndex
+from data.request_scheduler import (
+    RateLimitedError, get_request_scheduler, retry_after_seconds)
+from data.single_flight import SingleFlight
+
+load_dotenv()
+
+_SEPARATORS = ' \t\r\n,'
+
+
+async def iter_json_array(
+    chunks: AsyncIterator[bytes],
+    key: str = 'data'
+) -> AsyncIterator[Any]:
+    """
+    Decode the items of a top-level object's array field as bytes arrive
+
+    Only the partially received item is buffered, so a multi-megabyte
+    payload is never held (as text or as Python objects) all at once.
+
+    Args:
+        chunks: Async iterator of raw body chunks
+        key: Array field to stream ({"status": ..., "data": [...]})
+
+    Returns:
+        Async iterator over the decoded array items
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    array_start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    chunk_iter = chunks.__aiter__()
+
+    buffer = ''
+    pos = 0
+    in_array = False
+    eof = False
+
+    while True:
+        if not in_array:
+            match = array_start.search(buffer)
+            if match:
+                in_array = True
+                pos = match.end()
+                continue
+        else:
+            while pos < len(buffer) and buffer[pos] in _SEPARATORS:
+                pos += 1
+            if pos < len(buffer):
+                if buffer[pos] == ']':
+                    return
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    # A value running to the end of the buffer may be cut short
+                    if end < len(buffer) or eof:
+                        pos = end
+                        yield item
+                        continue
+
+        if eof:
+            raise ValueError(
+                f"truncated JSON array '{key}'" if in_array
+                else f"no '{key}' array in response")
+
+        try:
+            chunk = await chunk_iter.__anext__()
+        except StopAsyncIteration:
+            eof = True
+            buffer = buffer[pos:] + utf8.decode(b'', final=True)
+        else:
+            buffer = buffer[pos:] + utf8.decode(chunk)
+        pos = 0
+
+
+def compact_pool(pool: Dict) -> Optional[Dict]:
+    """
+    Reduce a DeFi Llama pool to the fields protocol queries read
+
+    Args:
+        pool: Raw pool dict from /pools
+
+    Returns:
+        Compact pool dict, or None if no query can use it
+    """
+    apy = pool.get('apy') or 0
+    if apy > MAX_REALISTIC_APY:
+        return None
+
+    # Project/chain/symbol repeat across thousands of pools
+    return {
+        'pool': pool.get('pool') or '',
+        'project': sys.intern(pool.get('project') or ''),
+        'chain': sys.intern(pool.get('chain') or ''),
+        'symbol': sys.intern(pool.get('symbol') or ''),
+        'apy': apy,
+        'tvlUsd': pool.get('tvlUsd') or 0
+    }
+
+
+class PoolSnapshot:
+    """
+    Shared DeFi Llama pools dataset with background refresh
+    """
+
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = base_url or os.getenv(
+            'DEFILLAMA_BASE_URL',
+            'https://yields.llama.fi'
+        )
+        self.ttl = float(os.getenv('DEFILLAMA_POOLS_TTL', '300'))
+        # Older snapshots are still served (and refreshed in the background)
+        self.max_staleness = float(
+            os.getenv('DEFILLAMA_POOLS_MAX_STALENESS', '3600'))
+        self.timeout = float(os.getenv('DEFILLAMA_POOLS_TIMEOUT', '30'))
+
+        # On-disk copy for warm starts (empty path disables it)
+        self.cache_path = os.getenv(
+            'DEFILLAMA_POOLS_CACHE_PATH', './data/cache/defillama_pools.json.gz')
+        self.cache_max_age = float(
+            os.getenv('DEFILLAMA_POOLS_CACHE_MAX_AGE', '86400'))
+
+        self.pools: List[Dict] = []  # Compact records (see compact_pool)
+        self.index = PoolIndex([])
+        self.fetched_at: Optional[float] = None  # time.monotonic()
+        self.version = 0  # Bumped on every successful refresh
+        self.source: Optional[str] = None  # 'network' or 'disk'
+
+        # Validators of the current dataset (conditional GET)
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self._cache_checked = False
+
+        # Called with (index, fetched_at wall time) after every new version
+        self._listeners: List[Callable[[PoolIndex, float], None]] = []
+
+        self._flight = SingleFlight("pools_snapshot")
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._background_tasks: set = set()
+
+        # Stats
+        self.downloads = 0
+        self.not_modified = 0
+        self.failures = 0
+
+    def add_listener(self, callback: Callable[[PoolIndex, float], None]):
+        """Call callback(index, fetched_at) whenever a new snapshot is swapped in"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+        # Late subscribers see the current snapshot too
+        if self.index.size:
+            self._notify(callback, time.time() - (self.age or 0.0))
+
+    def remove_listener(self, callback: Callable[[PoolIndex, float], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, callback: Callable[[PoolIndex, float], None], fetched_at: float):
+        try:
+            callback(self.index, fetched_at)
+        except Exception as e:
+            logger.error(f"Pools snapshot listener failed: {e}")
+
+    @property
+    def age(self) -> Optional[float]:
+        """Seconds since the last successful refresh (None if never loaded)"""
+        if self.fetched_at is None:
+            return None
+        return time.monotonic() - self.fetched_at
+
+    async def get_pools(self) -> List[Dict]:
+        """
+        Get the current pools snapshot
+
+        Returns:
+            Compact DeFi Llama pool dicts (empty if never loaded successfully)
+        """
+        await self._ensure_fresh()
+        return self.pools
+
+    async def get_index(self) -> PoolIndex:
+        """
+        Get the columnar index of the current snapshot
+
+        Returns:
+            PoolIndex (empty if never loaded successfully)
+        """
+        await self._ensure_fresh()
+        return self.index
+
+    async def _ensure_fresh(self):
+        if not self._cache_checked:
+            self.load_cache()
+
+        age = self.age
+        if age is not None and age < self.ttl:
+            return
+
+        # A warm-start copy is always served while the refresh runs
+        if age is not None and (age < self.max_staleness or self.source == 'disk'):
+            self._refresh_in_background()
+            return
+
+        await self.refresh()
+
+    async def refresh(self) -> bool:
+        """
+        Download a fresh snapshot (coalesced with concurrent refreshes)
+
+        Returns:
+            True if the snapshot was updated
+        """
+        return await self._flight.do("pools", self._download)
+
+    def _refresh_in_background(self):
+        if self._flight.in_flight("pools"):
+            return
+        task = asyncio.ensure_future(self.refresh())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _download(self) -> bool:
+        """Stream /pools, keeping compact records, and swap the snapshot in"""
+        url = f"{self.base_url}/pools"
+        started = time.monotonic()
+        pools = []
+        scanned = 0
+
+        # Only revalidate what we actually hold
+        headers = {}
+        if self.pools:
+            if self.etag:
+                headers['If-None-Match'] = self.etag
+            if self.last_modified:
+                headers['If-Modified-Since'] = self.last_modified
+
+        etag = last_modified = None
+
+        async def request() -> int:
+            nonlocal scanned, etag, last_modified
+            session = get_http_session(verify_ssl=False)
+            async with session.get(url, headers=headers, timeout=self.timeout) as response:
+                if response.status == 429:
+                    raise RateLimitedError(retry_after_seconds(response.headers))
+                if response.status != 200:
+                    return response.status
+
+                async for pool in iter_json_array(
+                        response.content.iter_chunked(65536)):
+                    scanned += 1
+                    record = compact_pool(pool)
+                    if record is not None:
+                        pools.append(record)
+
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+                return response.status
+
+        try:
+            # 429s are re-queued under the DeFi Llama quota, not failed
+            status = await get_request_scheduler().run('defillama', request)
+        except asyncio.TimeoutError:
+            logger.error("DeFi Llama API timeout")
+            self.failures += 1
+            return False
+        except Exception as e:
+            logger.error(f"DeFi Llama pools download failed: {e}")
+            self.failures += 1
+            return False
+
+        if status == 304 and self.pools:
+            self._mark_not_modified()
+            return True
+        if status != 200:
+            logger.error(f"DeFi Llama API error: {status}")
+            self.failures += 1
+            return False
+
+        self._set_pools(pools)
+        self.source = 'network'
+        self.etag = etag
+        self.last_modified = last_modified
+        self.downloads += 1
+        logger.info(
+            f"📡 Pools snapshot refreshed: kept {len(pools)}/{scanned} pools in {time.monotonic() - started:.2f}s")
+
+        if self.cache_path:
+            await asyncio.to_thread(
+                self._write_cache, pools, etag, last_modified)
+        return True
+
+    def _mark_not_modified(self):
+        """304: the data we hold is current again"""
+        self.fetched_at = time.monotonic()
+        self.source = 'network'
+        self.not_modified += 1
+        logger.debug("📡 Pools snapshot not modified")
+
+        # The cache file's mtime is its fetch time
+        if self.cache_path and os.path.exists(self.cache_path):
+            try:
+                os.utime(self.cache_path)
+            except OSError as e:
+                logger.warning(f"Could not touch pools cache: {e}")
+
+    def _set_pools(self, pools: List[Dict], age: float = 0.0):
+        """Swap in a new dataset and its index, then notify listeners"""
+        started = time.monotonic()
+        index = PoolIndex(pools, self.version + 1)
+        logger.debug(
+            f"Pool index built: {index.size} rows, {len(index.project_slugs)} projects in {time.monotonic() - started:.3f}s")
+
+        self.pools = pools
+        self.index = index
+        self.fetched_at = time.monotonic() - age
+        self.version += 1
+
+        fetched_at = time.time() - age
+        for callback in list(self._listeners):
+            self._notify(callback, fetched_at)
+
+    # ═══════════════════════════════════════════════════════
+    # ON-DISK CACHE
+    # ═══════════════════════════════════════════════════════
+
+    def load_cache(self) -> bool:
+        """
+        Warm start from the on-disk copy (once; no-op if already loaded)
+
+        Returns:
+            True if the cached snapshot was loaded
+        """
+        self._cache_checked = True
+        if self.pools or not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+
+        try:
+            cache_age = max(0.0, time.time() - os.path.getmtime(self.cache_path))
+            if cache_age > self.cache_max_age:
+                logger.info(
+                    f"Pools cache too old ({cache_age / 3600:.1f}h) - ignoring")
+                return False
+
+            with gzip.open(self.cache_path, 'rt', encoding='utf-8') as f:
+                cached = json.load(f)
+            pools = cached['data']
+        except Exception as e:
+            logger.warning(f"Could not load pools cache {self.cache_path}: {e}")
+            return False
+
+        self.source = 'disk'
+        self._set_pools(pools, age=cache_age)
+        self.etag = cached.get('etag')
+        self.last_modified = cached.get('last_modified')
+        logger.info(
+            f"💾 Pools snapshot loaded from disk: {len(pools)} pools ({cache_age:.0f}s old)")
+        return True
+
+    def _write_cache(self, pools: List[Dict], etag: Optional[str], last_modified: Optional[str]):
+        """Atomically replace the on-disk copy (runs in a worker thread)"""
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            directory = os.path.dirname(self.cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+                json.dump({
+                    'etag': etag,
+                    'last_modified': last_modified,
+                    'data': pools
+                }, f, separators=(',', ':'))
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f"Could not write pools cache {self.cache_path}: {e}")
+
+    # ═══════════════════════════════════════════════════════
+    # BACKGROUND REFRESH
+    # ═══════════════════════════════════════════════════════
+
+    def start_background_refresh(self):
+        """Refresh the snapshot every TTL on the running loop (idempotent)"""
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        if not self._cache_checked:
+            self.load_cache()
+        self._refresh_task = asyncio.ensure_future(self._refresh_loop())
+        logger.info(
+            f"🔄 Pools snapshot refresh started (every {self.ttl:.0f}s)")
+
+    async def stop_background_refresh(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self):
+        while True:
+            age = self.age
+            if age is None or age >= self.ttl:
+                try:
+                    await self.refresh()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Pools snapshot refresh failed: {e}")
+
+            # Sleep until the snapshot is due; retry sooner while we have nothing to serve
+            if self.pools:
+                await asyncio.sleep(max(1.0, self.ttl - (self.age or 0.0)))
+            else:
+                await asyncio.sleep(min(30.0, self.ttl))
+
+    def get_stats(self) -> Dict:
+        return {
+            'pools': len(self.pools),
+            'age_seconds': self.age,
+            'version': self.version,
+            'source': self.source,
+            'downloads': self.downloads,
+            'not_modified': self.not_modified,
+            'failures': self.failures
+        }
+
+
+# Singleton instance
+_pool_snapshot = None
+
+
+def get_pool_snapshot() -> PoolSnapshot:
+    """Get singleton instance of PoolSnapshot"""
+    global _pool_snapshot
+    if _pool_snapshot is None:
+        _pool_snapshot = PoolSnapshot()
+    return _pool_snapshot
@@ -1,34 +1,51 @@
 """
 LiquidityGuard AI - Price Feed Manager
 
-Fetches real-time price data from CoinGecko API with caching.
+Fetches real-time price data with caching. Reads go through
+PriceAggregator (data/price_sources.py): CoinGecko first, hedged with
+Chainlink and Uniswap TWAP reads when it is slow, median when several
+sources answer.
+
+A background refresher keeps hot tokens warm (stale-while-revalidate), so
+reads on the monitoring path are memory lookups with bounded staleness.
+Pushed prices (data/price_stream.py) go through the same cache and fire
+deviation subscribers as soon as a move happens.
+
+Observed prices can be recorded to disk and replayed as a drop-in source
+(data/price_recorder.py) for deterministic benchmarks and backtests.
 
 Priority:
-1. CoinGecko API (real-time prices)
+1. Price sources (CoinGecko, Chainlink, Uniswap TWAP)
 2. Demo mode (mock prices for testing)
 """
 
-import aiohttp
 import asyncio
-import ssl
-from typing import Dict, Optional
+import inspect
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
 import os
 from dotenv import load_dotenv
 from loguru import logger
 
+from data.price_history import PriceHistory
+from data.price_recorder import PriceRecorder, PriceRecording, ReplayPriceSource
+from data.price_sources import PriceAggregator, PriceSource, build_default_sources
+from data.single_flight import SingleFlight
+
 load_dotenv()
 
 
 class PriceFeedManager:
     """
-    Fetches real-time price data from CoinGecko
+    Fetches real-time price data from multiple sources
 
     Supports:
     - CoinGecko API (off-chain, real-time)
+    - Chainlink aggregators and Uniswap V3 TWAPs (on-chain, via RPC)
     - Demo mode (mock prices, testing)
     """
 
-    def __init__(self):
+    def __init__(self, sources: Optional[List[PriceSource]] = None):
         self.coingecko_api_key = os.getenv('COINGECKO_API_KEY')
         self.demo_mode = os.getenv('DEMO_MODE', 'false').lower() == 'true'
 
@@ -36,6 +53,58 @@ class PriceFeedManager:
         self.price_cache = {}
         self.cache_ttl = 60  # Cache for 60 seconds
 
+        # Stale-while-revalidate: cached prices up to this age are served
+        # immediately while a refresh runs in the background
+        self.max_staleness = float(os.getenv('PRICE_MAX_STALENESS', '120'))
+
+        # Background refresher keeps hot tokens warm before they expire
+        self.refresh_interval = float(
+            os.getenv('PRICE_REFRESH_INTERVAL', '15'))
+        self.hot_tokens: List[str] = [
+            t.strip() for t in os.getenv(
+                'PRICE_HOT_TOKENS', 'WETH,WBTC,USDC,USDT,DAI').split(',')
+            if t.strip()
+        ]
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._background_tasks: set = set()
+
+        # Every observed price feeds the rolling volatility/correlation stats
+        self.history = PriceHistory()
+
+        # Deviation subscribers: id -> {token, threshold_pct, callback, refs}
+        self._subscribers: Dict[int, Dict] = {}
+        self._next_subscriber_id = 1
+
+        # Record observed prices to disk (PRICE_RECORD_PATH)
+        self.recorder: Optional[PriceRecorder] = None
+        if os.getenv('PRICE_RECORD_PATH'):
+            self.start_recording(os.getenv('PRICE_RECORD_PATH'))
+
+        # Replay a recording instead of live sources (PRICE_REPLAY_PATH)
+        self.replay_speed = None
+        self.replay_source: Optional[ReplayPriceSource] = None
+        replay_path = os.getenv('PRICE_REPLAY_PATH')
+        if sources is None and replay_path:
+            self.replay_speed = float(os.getenv('PRICE_REPLAY_SPEED', '1'))
+            self.replay_source = ReplayPriceSource(
+                PriceRecording(replay_path), speed=self.replay_speed)
+            sources = [self.replay_source]
+            if self.replay_speed > 0:
+                # Keep cache lifetimes constant in recording time
+                self.cache_ttl /= self.replay_speed
+                self.max_staleness /= self.replay_speed
+                self.refresh_interval /= self.replay_speed
+            logger.info(
+                f"⏯️  Replaying prices from {replay_path} at {self.replay_speed:g}x")
+
+        # Hedged multi-source reads with median consensus
+        if sources is None:
+            sources = build_default_sources(self.coingecko_api_key)
+        self.aggregator = PriceAggregator(sources)
+
+        # Concurrent misses on the same cache key share one upstream read
+        self._price_flight = SingleFlight("price_cache")
+
         logger.info("PriceFeedManager initialized")
         logger.info(f"Demo mode: {self.demo_mode}")
 
@@ -45,11 +114,14 @@ class PriceFeedManager:
         chain: str = "ethereum"
     ) -> Optional[float]:
         """
-        Get current token price in USD from CoinGecko
+        Get current token price in USD
 
         Priority:
         1. Demo mode (if enabled) - instant mock prices
-        2. CoinGecko API - real-time price data
+        2. Fresh cache entry
+        3. Stale cache entry (< max_staleness) - returned immediately while
+           a background refresh runs
+        4. Price sources - hedged read, median of the answers
 
         Args:
             token_symbol: Token symbol (ETH, WBTC, SOL)
@@ -66,92 +138,128 @@ class PriceFeedManager:
 
         # Check cache
         cache_key = f"{token_symbol}_{chain}"
-        if cache_key in self.price_cache:
-            cached_price, timestamp = self.price_cache[cache_key]
-            if asyncio.get_event_loop().time() - timestamp < self.cache_ttl:
+        cached = self.get_price_with_age(token_symbol, chain)
+        if cached:
+            cached_price, age = cached
+            if age < self.cache_ttl:
                 logger.debug(
                     f"[CACHE] {token_symbol} price: ${cached_price:.2f}")
                 return cached_price
 
-        # Fetch from CoinGecko
-        price = await self._fetch_from_coingecko(token_symbol)
+            if age < self.max_staleness:
+                self._revalidate_in_background(token_symbol, chain)
+                logger.debug(
+                    f"[STALE] {token_symbol} price: ${cached_price:.2f} ({age:.0f}s old, refreshing)")
+                return cached_price
+
+        # Fetch from the price sources (coalesced with concurrent misses)
+        price = await self._price_flight.do(
+            cache_key,
+            lambda: self._fetch_and_cache(token_symbol, chain)
+        )
         if price:
-            self.price_cache[cache_key] = (
-                price, asyncio.get_event_loop().time())
             return price
 
         logger.warning(f"Failed to fetch price for {token_symbol}")
         return None
 
-    async def _fetch_from_coingecko(self, symbol: str) -> Optional[float]:
+    def get_price_with_age(
+        self,
+        token_symbol: str,
+        chain: str = "ethereum"
+    ) -> Optional[Tuple[float, float]]:
         """
-        Fetch price from CoinGecko API
-
-        Benefits:
-        - Real-time price data
-        - Wide token coverage
-        - Simple REST API
-        - Perfect for liquidation monitoring
-
-        API Docs: https://www.coingecko.com/en/api/documentation
+        Read a price from memory without any network call
 
         Args:
-            symbol: Token symbol (e.g., 'ETH', 'WBTC', 'USDC')
+            token_symbol: Token symbol (ETH, WBTC, SOL)
+            chain: Blockchain name (used for the cache key)
 
         Returns:
-            Price in USD or None if failed
+            (price, age_seconds) or None if the token was never fetched
         """
-        # Map token symbols to CoinGecko IDs
-        token_id_map = {
-            "ETH": "ethereum",
-            "WETH": "ethereum",
-            "WBTC": "wrapped-bitcoin",
-            "SOL": "solana",
-            "USDC": "usd-coin",
-            "USDT": "tether",
-            "DAI": "dai",
-            "PYUSD": "paypal-usd"
-        }
+        if self.demo_mode and token_symbol in self.mock_prices:
+            return self.mock_prices[token_symbol], 0.0
 
-        token_id = token_id_map.get(symbol.upper())
-        if not token_id:
-            logger.warning(f"Unknown token symbol: {symbol}")
+        entry = self.price_cache.get(f"{token_symbol}_{chain}")
+        if entry is None:
             return None
 
-        url = "https://api.coingecko.com/api/v3/simple/price"
-        params = {
-            "ids": token_id,
-            "vs_currencies": "usd"
-        }
-
-        # Add API key if available
-        if self.coingecko_api_key and self.coingecko_api_key != "your_coingecko_api_key_here":
-            params["x_cg_demo_api_key"] = self.coingecko_api_key
-
-        try:
-            # Create SSL context that doesn't verify certificates (for development)
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
-
-            connector = aiohttp.TCPConnector(ssl=ssl_context)
-            async with aiohttp.ClientSession(connector=connector) as session:
-                async with session.get(url, params=params, timeout=10) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if token_id in data and "usd" in data[token_id]:
-                            price = data[token_id]["usd"]
-                            logger.info(
-                                f"💰 CoinGecko: {symbol} = ${price:,.2f}")
-                            return price
-                    else:
-                        logger.error(f"CoinGecko API error: {response.status}")
-        except asyncio.TimeoutError:
-            logger.error("CoinGecko API timeout")
-        except Exception as e:
-            logger.error(f"CoinGecko fetch failed: {e}")
+        price, timestamp = entry
+        return price, time.monotonic() - timestamp
 
-        return None
+    def _revalidate_in_background(self, token_symbol: str, chain: str):
+        """Start a refresh for a stale entry unless one is already running"""
+        cache_key = f"{token_symbol}_{chain}"
+        if self._price_flight.in_flight(cache_key):
+            return
+
+        task = asyncio.ensure_future(self._price_flight.do(
+            cache_key,
+            lambda: self._fetch_and_cache(token_symbol, chain)
+        ))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _fetch_and_cache(self, token_symbol: str, chain: str) -> Optional[float]:
+        """Fetch one price from the sources and store it in the cache"""
+        fetched = await self._fetch_batch_and_cache([token_symbol], chain)
+        return fetched.get(token_symbol)
+
+    def _store_price(
+        self,
+        token_symbol: str,
+        price: float,
+        chain: str = "ethereum",
+        timestamp: Optional[float] = None
+    ):
+        """Write a price into the cache, history, recording and subscribers"""
+        self.price_cache[f"{token_symbol}_{chain}"] = (price, time.monotonic())
+        self.history.record(token_symbol, price, timestamp)
+        if self.recorder:
+            self.recorder.record(token_symbol, price, timestamp, chain)
+        self._notify_subscribers(token_symbol, price)
+
+    def start_recording(self, path: str):
+        """Record every observed price to path (appends to an existing log)"""
+        self.stop_recording()
+        self.recorder = PriceRecorder(path)
+
+    def stop_recording(self):
+        """Flush and close the price recording"""
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
+    def get_volatility(self, token_symbol: str) -> Optional[float]:
+        """Rolling 24h volatility in percent from recorded prices (or None)"""
+        return self.history.get_volatility(token_symbol)
+
+    def get_price_stats(self, token_symbol: str) -> Optional[Dict]:
+        """Rolling statistics (volatility, EWMA, trend) for a token"""
+        return self.history.get_stats(token_symbol)
+
+    def get_correlation_matrix(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Pairwise return correlations between all recorded tokens"""
+        return self.history.get_correlation_matrix()
+
+    async def _fetch_batch_and_cache(
+        self,
+        symbols: List[str],
+        chain: str
+    ) -> Dict[str, float]:
+        """Batch-fetch prices from the sources and store them in the cache"""
+        fetched = await self.aggregator.get_prices(symbols)
+        for token, price in fetched.items():
+            # Replayed prices keep their recorded time, as on the push path
+            timestamp = (self.replay_source.observed_at.get(token)
+                         if self.replay_source else None)
+            self._store_price(token, price, chain, timestamp)
+        if fetched:
+            logger.info(
+                f"💰 Prices: {len(fetched)}/{len(symbols)} fetched "
+                f"({', '.join(f'{t}=${p:,.2f}' for t, p in fetched.items())})")
+        return fetched
 
     def set_mock_price(self, token_symbol: str, price: float):
         """Set mock price for demo mode"""
@@ -164,29 +272,242 @@ class PriceFeedManager:
 
     async def get_multiple_prices(
         self,
-        tokens: list[str]
+        tokens: list[str],
+        chain: str = "ethereum"
     ) -> Dict[str, float]:
         """
         Get prices for multiple tokens efficiently
 
+        Demo and cached prices are served locally; every remaining token is
+        fetched with a single batched read per price source.
+
         Args:
             tokens: List of token symbols
+            chain: Blockchain name (used for the cache key)
 
         Returns:
             Dictionary of {token: price}
         """
-        tasks = [self.get_token_price(token) for token in tokens]
-        prices = await asyncio.gather(*tasks, return_exceptions=True)
-
         result = {}
-        for token, price in zip(tokens, prices):
-            if isinstance(price, Exception):
-                logger.error(f"Error fetching {token}: {price}")
-                result[token] = None
-            else:
+        misses = []
+
+        for token in tokens:
+            cached = self.get_price_with_age(token, chain)
+            if cached and cached[1] < self.cache_ttl:
+                result[token] = cached[0]
+                continue
+
+            if token not in misses:
+                misses.append(token)
+
+        if misses:
+            prices = await self._fetch_batch_coalesced(misses, chain)
+            for token in misses:
+                price = prices.get(token)
+                if not price:
+                    logger.warning(f"Failed to fetch price for {token}")
                 result[token] = price
 
-        return result
+        return {token: result.get(token) for token in tokens}
+
+    async def _fetch_batch_coalesced(
+        self,
+        tokens: List[str],
+        chain: str
+    ) -> Dict[str, Optional[float]]:
+        """
+        Fetch several tokens through the single-flight layer
+
+        Tokens already being fetched join that request; the rest share one
+        batched read. Whether a token joins is decided inside do(), so a
+        flight that finishes or starts in the meantime can't leave it out.
+        """
+        batch: Optional[asyncio.Task] = None
+        members: List[str] = []
+
+        async def fetch_batch(symbols: List[str]) -> Dict[str, float]:
+            nonlocal batch
+            # Membership closes once the batch starts; later tokens open a new one
+            batch = None
+            return await self._fetch_batch_and_cache(symbols, chain)
+
+        def join_batch(token: str) -> asyncio.Task:
+            nonlocal batch, members
+            if batch is None:
+                members = []
+                batch = asyncio.ensure_future(fetch_batch(members))
+            members.append(token)
+            return batch
+
+        def from_batch(token: str) -> Awaitable[Optional[float]]:
+            shared = join_batch(token)
+
+            async def price() -> Optional[float]:
+                return (await shared).get(token)
+            return price()
+
+        prices = await asyncio.gather(*[
+            self._price_flight.do(f"{token}_{chain}", lambda t=token: from_batch(t))
+            for token in tokens
+        ])
+        return dict(zip(tokens, prices))
+
+    # ═══════════════════════════════════════════════════════
+    # PUSH INGESTION & DEVIATION SUBSCRIBERS
+    # ═══════════════════════════════════════════════════════
+
+    def ingest_price(
+        self,
+        token_symbol: str,
+        price: float,
+        chain: str = "ethereum",
+        source: str = "stream",
+        timestamp: Optional[float] = None
+    ):
+        """
+        Ingest a pushed price (e.g. from PriceStream) into the cache
+
+        Args:
+            token_symbol: Token symbol (ETH, WBTC, SOL)
+            price: Price in USD
+            chain: Blockchain name (used for the cache key)
+            source: Where the tick came from (for logging)
+            timestamp: Observation time (unix seconds, defaults to now);
+                replays pass the recorded time
+        """
+        logger.debug(f"[{source.upper()}] {token_symbol} = ${price:,.2f}")
+        self._store_price(token_symbol, price, chain, timestamp)
+
+    def subscribe_deviation(
+        self,
+        token_symbol: Optional[str],
+        threshold_pct: float,
+        callback: Callable
+    ) -> int:
+        """
+        Register a callback fired when a price moves more than threshold_pct
+
+        The move is measured from the price at the last notification (or the
+        first price observed), so a slow drift fires once per threshold step.
+
+        Args:
+            token_symbol: Token to watch, or None for every token
+            threshold_pct: Deviation threshold in percent (1.0 = 1%)
+            callback: callback(token, reference_price, new_price, change_pct);
+                coroutine functions are scheduled on the running loop
+
+        Returns:
+            Subscription id for unsubscribe()
+        """
+        subscription_id = self._next_subscriber_id
+        self._next_subscriber_id += 1
+        self._subscribers[subscription_id] = {
+            'token': token_symbol,
+            'threshold_pct': threshold_pct,
+            'callback': callback,
+            'refs': {}
+        }
+        logger.info(
+            f"🔔 Price deviation subscription #{subscription_id}: "
+            f"{token_symbol or 'all tokens'} ±{threshold_pct:.2f}%")
+        return subscription_id
+
+    def unsubscribe(self, subscription_id: int):
+        """Remove a deviation subscription"""
+        self._subscribers.pop(subscription_id, None)
+
+    def _notify_subscribers(self, token_symbol: str, price: float):
+        """Fire callbacks whose deviation threshold was crossed"""
+        for subscription in list(self._subscribers.values()):
+            if subscription['token'] not in (None, token_symbol):
+                continue
+
+            refs = subscription['refs']
+            reference = refs.get(token_symbol)
+            if not reference:
+                refs[token_symbol] = price
+                continue
+
+            change_pct = (price - reference) / reference * 100
+            if abs(change_pct) < subscription['threshold_pct']:
+                continue
+
+            refs[token_symbol] = price
+            logger.info(
+                f"🔔 {token_symbol} moved {change_pct:+.2f}%: ${reference:,.2f} → ${price:,.2f}")
+            try:
+                result = subscription['callback'](
+                    token_symbol, reference, price, change_pct)
+                if inspect.isawaitable(result):
+                    task = asyncio.ensure_future(result)
+                    self._background_tasks.add(task)
+                    task.add_done_callback(self._background_tasks.discard)
+            except Exception as e:
+                logger.error(f"Price deviation callback failed: {e}")
+
+    # ═══════════════════════════════════════════════════════
+    # BACKGROUND REFRESH (stale-while-revalidate)
+    # ═══════════════════════════════════════════════════════
+
+    def add_hot_tokens(self, tokens: Iterable[str]):
+        """Add tokens to the set kept warm by the background refresher"""
+        for token in tokens:
+            if token and token != "UNKNOWN" and token not in self.hot_tokens:
+                self.hot_tokens.append(token)
+                logger.debug(f"🔥 Hot token added: {token}")
+
+    def start_background_refresh(self):
+        """Start the refresher on the running event loop (idempotent)"""
+        if self._refresh_task and not self._refresh_task.done():
+            return
+
+        self._refresh_task = asyncio.ensure_future(self._refresh_loop())
+        logger.info(
+            f"🔄 Background price refresh started: {', '.join(self.hot_tokens)} "
+            f"every {self.refresh_interval:.0f}s")
+
+    async def stop_background_refresh(self):
+        """Stop the refresher task"""
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def refresh_hot_tokens(self, chain: str = "ethereum") -> int:
+        """
+        Refresh hot tokens that would expire before the next refresh tick
+
+        Returns:
+            Number of tokens refreshed
+        """
+        refresh_after = max(0.0, self.cache_ttl - self.refresh_interval)
+        due = []
+        for token in self.hot_tokens:
+            if self.demo_mode and token in self.mock_prices:
+                continue
+            cached = self.get_price_with_age(token, chain)
+            if cached is None or cached[1] >= refresh_after:
+                due.append(token)
+
+        if due:
+            prices = await self._fetch_batch_coalesced(due, chain)
+            logger.debug(
+                f"🔄 Refreshed {sum(1 for p in prices.values() if p)}/{len(due)} hot prices")
+        return len(due)
+
+    async def _refresh_loop(self):
+        """Keep hot tokens warm until cancelled"""
+        while True:
+            try:
+                await self.refresh_hot_tokens()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Background price refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
 
 
 # Singleton instance
@@ -0,0 +1,365 @@
+"""
+LiquidityGuard AI - Price History & Rolling Statistics
+
+Fixed-size, array-backed ring buffers of observed prices per token, with
+statistics maintained incrementally (O(1) per tick) so risk assessment and
+the market endpoints never recompute from raw history:
+- Rolling volatility of log returns (scaled to a 24h horizon)
+- EWMA price and EWMA (RiskMetrics) volatility
+- Pairwise return correlation matrix over synchronised bars
+"""
+
+import math
+import os
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+
+SECONDS_PER_DAY = 86400.0
+
+
+class PriceRingBuffer:
+    """
+    Ring buffer of (timestamp, price) for one token
+
+    Keeps running sums of log returns, squared returns and tick intervals
+    over the window, adding the newest and subtracting the evicted value on
+    every push.
+    """
+
+    def __init__(self, capacity: int, ewma_lambda: float = 0.94):
+        if capacity < 2:
+            raise ValueError("PriceRingBuffer capacity must be at least 2")
+        self.capacity = capacity
+        self.ewma_lambda = ewma_lambda
+
+        self.prices = array('d', [0.0] * capacity)
+        self.timestamps = array('d', [0.0] * capacity)
+        # returns[i] / intervals[i] belong to the tick stored at index i
+        self.returns = array('d', [0.0] * capacity)
+        self.intervals = array('d', [0.0] * capacity)
+
+        self.head = 0   # Next write index
+        self.count = 0  # Stored ticks (<= capacity)
+
+        self.sum_r = 0.0
+        self.sum_r2 = 0.0
+        self.sum_dt = 0.0
+        self.n_returns = 0
+
+        self.ewma_price: Optional[float] = None
+        self.ewma_variance: Optional[float] = None
+
+    def push(self, price: float, timestamp: float) -> Optional[float]:
+        """
+        Append a tick
+
+        Returns:
+            Log return versus the previous tick (None for the first tick)
+        """
+        last_price = self.last_price
+        last_ts = self.last_timestamp
+
+        # The oldest tick never carries a return, so evicting it only means
+        # the next-oldest loses its predecessor: drop that return from the sums
+        if self.count == self.capacity:
+            nxt = (self.head + 1) % self.capacity
+            r_nxt = self.returns[nxt]
+            self.sum_r -= r_nxt
+            self.sum_r2 -= r_nxt * r_nxt
+            self.sum_dt -= self.intervals[nxt]
+            self.n_returns -= 1
+            self.returns[nxt] = 0.0
+            self.intervals[nxt] = 0.0
+
+        r = None
+        idx = self.head
+        self.prices[idx] = price
+        self.timestamps[idx] = timestamp
+        self.returns[idx] = 0.0
+        self.intervals[idx] = 0.0
+
+        if last_price:
+            r = math.log(price / last_price)
+            dt = max(0.0, timestamp - last_ts)
+            self.returns[idx] = r
+            self.intervals[idx] = dt
+            self.sum_r += r
+            self.sum_r2 += r * r
+            self.sum_dt += dt
+            self.n_returns += 1
+
+        self.head = (idx + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+        # EWMA price and variance of returns (RiskMetrics)
+        lam = self.ewma_lambda
+        if self.ewma_price is None:
+            self.ewma_price = price
+        else:
+            self.ewma_price = lam * self.ewma_price + (1 - lam) * price
+        if r is not None:
+            if self.ewma_variance is None:
+                self.ewma_variance = r * r
+            else:
+                self.ewma_variance = lam * self.ewma_variance + \
+                    (1 - lam) * r * r
+
+        return r
+
+    @property
+    def last_price(self) -> Optional[float]:
+        if self.count == 0:
+            return None
+        return self.prices[(self.head - 1) % self.capacity]
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        if self.count == 0:
+            return None
+        return self.timestamps[(self.head - 1) % self.capacity]
+
+    def mean_interval(self) -> Optional[float]:
+        """Average seconds between ticks in the window"""
+        if self.n_returns == 0 or self.sum_dt <= 0:
+            return None
+        return self.sum_dt / self.n_returns
+
+    def tick_volatility(self) -> Optional[float]:
+        """Sample standard deviation of per-tick log returns"""
+        n = self.n_returns
+        if n < 2:
+            return None
+        mean = self.sum_r / n
+        variance = max(0.0, (self.sum_r2 - n * mean * mean) / (n - 1))
+        return math.sqrt(variance)
+
+    def volatility(self, horizon_seconds: float = SECONDS_PER_DAY) -> Optional[float]:
+        """Rolling volatility scaled to a horizon (fraction, 0.03 = 3%)"""
+        sigma = self.tick_volatility()
+        interval = self.mean_interval()
+        if sigma is None or not interval:
+            return None
+        return sigma * math.sqrt(horizon_seconds / interval)
+
+    def ewma_volatility(self, horizon_seconds: float = SECONDS_PER_DAY) -> Optional[float]:
+        """EWMA volatility scaled to a horizon (fraction)"""
+        interval = self.mean_interval()
+        if self.ewma_variance is None or not interval:
+            return None
+        return math.sqrt(self.ewma_variance) * math.sqrt(horizon_seconds / interval)
+
+    def values(self) -> List[Tuple[float, float]]:
+        """Chronological copy of (timestamp, price) ticks"""
+        start = (self.head - self.count) % self.capacity
+        return [
+            (self.timestamps[(start + i) % self.capacity],
+             self.prices[(start + i) % self.capacity])
+            for i in range(self.count)
+        ]
+
+
+class _PairStats:
+    """Running co-moment sums for one token pair"""
+
+    __slots__ = ('n', 'sx', 'sy', 'sxx', 'syy', 'sxy')
+
+    def __init__(self):
+        self.n = 0
+        self.sx = self.sy = self.sxx = self.syy = self.sxy = 0.0
+
+    def add(self, x: float, y: float, sign: int = 1):
+        self.n += sign
+        self.sx += sign * x
+        self.sy += sign * y
+        self.sxx += sign * x * x
+        self.syy += sign * y * y
+        self.sxy += sign * x * y
+
+    def correlation(self) -> Optional[float]:
+        n = self.n
+        if n < 3:
+            return None
+        cov = n * self.sxy - self.sx * self.sy
+        var_x = n * self.sxx - self.sx * self.sx
+        var_y = n * self.syy - self.sy * self.sy
+        if var_x <= 1e-18 or var_y <= 1e-18:
+            return None
+        return max(-1.0, min(1.0, cov / math.sqrt(var_x * var_y)))
+
+
+class PriceHistory:
+    """
+    Per-token price history with incremental statistics
+
+    Volatility and EWMA update on every tick. Correlations need returns
+    sampled at the same instants, so prices are also closed into
+    synchronised bars (PRICE_BAR_SECONDS); each bar close updates the
+    running co-moments of every token pair.
+    """
+
+    def __init__(
+        self,
+        capacity: Optional[int] = None,
+        bar_seconds: Optional[float] = None,
+        correlation_window: Optional[int] = None,
+        ewma_lambda: float = 0.94
+    ):
+        self.capacity = capacity or int(
+            os.getenv('PRICE_HISTORY_SIZE', '1440'))
+        self.bar_seconds = bar_seconds or float(
+            os.getenv('PRICE_BAR_SECONDS', '60'))
+        self.correlation_window = correlation_window or int(
+            os.getenv('PRICE_CORRELATION_WINDOW', '240'))
+        self.ewma_lambda = ewma_lambda
+
+        self.buffers: Dict[str, PriceRingBuffer] = {}
+
+        # Synchronised bars for correlation
+        self._bar_start: Optional[float] = None
+        self._bar_index = 0
+        self._bar_close: Dict[str, float] = {}       # token -> last bar close
+        self._bar_returns: Dict[str, array] = {}     # token -> ring of bar returns
+        self._pairs: Dict[Tuple[str, str], _PairStats] = {}
+
+    def record(self, token: str, price: float, timestamp: Optional[float] = None):
+        """Record an observed price (O(1) amortised)"""
+        if not price or price <= 0:
+            return
+        timestamp = timestamp if timestamp is not None else time.time()
+
+        # Close the bar on the first tick past its end, before applying the
+        # tick, so every token's close reflects the same instant
+        if self._bar_start is None:
+            self._bar_start = timestamp
+        elif timestamp - self._bar_start >= self.bar_seconds:
+            self._close_bar()
+            self._bar_start = timestamp
+
+        buffer = self.buffers.get(token)
+        if buffer is None:
+            buffer = PriceRingBuffer(self.capacity, self.ewma_lambda)
+            self.buffers[token] = buffer
+        buffer.push(price, timestamp)
+
+    def _close_bar(self):
+        """Take one synchronised return per token and update pair co-moments"""
+        window = self.correlation_window
+        slot = self._bar_index % window
+        returns: Dict[str, float] = {}
+        evicted: Dict[str, float] = {}
+
+        for token, buffer in self.buffers.items():
+            price = buffer.last_price
+            previous = self._bar_close.get(token)
+            self._bar_close[token] = price
+            if not previous:
+                continue
+
+            ring = self._bar_returns.get(token)
+            if ring is None:
+                ring = array('d', [0.0] * window)
+                self._bar_returns[token] = ring
+            evicted[token] = ring[slot]
+            r = math.log(price / previous)
+            ring[slot] = r
+            returns[token] = r
+
+        tokens = sorted(returns)
+        for i, a in enumerate(tokens):
+            for b in tokens[i + 1:]:
+                pair = self._pairs.get((a, b))
+                if pair is None:
+                    pair = _PairStats()
+                    self._pairs[(a, b)] = pair
+                if pair.n >= window:
+                    pair.add(evicted[a], evicted[b], sign=-1)
+                pair.add(returns[a], returns[b])
+
+        self._bar_index += 1
+
+    # ═══════════════════════════════════════════════════════
+    # READERS
+    # ═══════════════════════════════════════════════════════
+
+    def get_volatility(self, token: str) -> Optional[float]:
+        """24h rolling volatility in percent (3.5 = 3.5%), or None"""
+        buffer = self.buffers.get(token)
+        if buffer is None:
+            return None
+        vol = buffer.volatility()
+        return vol * 100 if vol is not None else None
+
+    def get_stats(self, token: str) -> Optional[Dict]:
+        """Snapshot of the rolling statistics for a token"""
+        buffer = self.buffers.get(token)
+        if buffer is None:
+            return None
+
+        vol_24h = buffer.volatility()
+        vol_7d = buffer.volatility(7 * SECONDS_PER_DAY)
+        ewma_vol = buffer.ewma_volatility()
+        first_ts, first_price = buffer.values()[0]
+
+        return {
+            'token': token,
+            'samples': buffer.count,
+            'last_price': buffer.last_price,
+            'ewma_price': buffer.ewma_price,
+            'volatility_24h': vol_24h,
+            'volatility_7d': vol_7d,
+            'ewma_volatility_24h': ewma_vol,
+            'mean_interval_seconds': buffer.mean_interval(),
+            'trend': 'up' if buffer.last_price >= first_price else 'down',
+            'window_seconds': buffer.last_timestamp - first_ts
+        }
+
+    def get_correlation(self, token_a: str, token_b: str) -> Optional[float]:
+        """Rolling return correlation between two tokens (-1..1), or None"""
+        if token_a == token_b:
+            return 1.0 if token_a in self.buffers else None
+        key = (token_a, token_b) if token_a < token_b else (token_b, token_a)
+        pair = self._pairs.get(key)
+        return pair.correlation() if pair else None
+
+    def get_correlation_matrix(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Full pairwise correlation matrix over tracked tokens"""
+        tokens = sorted(self.buffers)
+        return {
+            a: {b: self.get_correlation(a, b) for b in tokens}
+            for a in tokens
+        }
+
+    def get_prices(self, token: str) -> List[Tuple[float, float]]:
+        """Chronological (timestamp, price) ticks for a token"""
+        buffer = self.buffers.get(token)
+        return buffer.values() if buffer else []
+
+
+# Test function
+def test_price_history():
+    """Feed synthetic ticks and print the derived statistics"""
+    import random
+
+    history = PriceHistory(capacity=500, bar_seconds=60)
+    eth, btc = 3500.0, 67000.0
+    now = time.time()
+    for i in range(1000):
+        shock = random.gauss(0, 0.002)
+        eth *= math.exp(shock + random.gauss(0, 0.0005))
+        btc *= math.exp(0.8 * shock + random.gauss(0, 0.0005))
+        history.record("WETH", eth, now + i * 30)
+        history.record("WBTC", btc, now + i * 30)
+        history.record("USDC", 1.0 + random.gauss(0, 0.0001), now + i * 30)
+
+    for token in ["WETH", "WBTC", "USDC"]:
+        logger.info(f"{token}: {history.get_stats(token)}")
+    logger.info(f"Correlation matrix: {history.get_correlation_matrix()}")
+
+
+if __name__ == "__main__":
+    test_price_history()
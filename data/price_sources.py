@@ -0,0 +1,728 @@
+"""
+LiquidityGuard AI - Multi-Source Price Aggregation
+
+Pluggable price sources behind one hedged, consensus-based read:
+- CoinGecko /simple/price (off-chain REST)
+- Chainlink aggregators (latestRoundData via JSON-RPC eth_call)
+- Uniswap V3 TWAPs (observe() tick cumulatives via JSON-RPC eth_call)
+
+PriceAggregator asks the primary source first and only sends a hedged
+request to the next source once the primary exceeds its own p95 latency
+(or fails). When several sources answer, the median is used, so one slow
+or wrong upstream neither stalls nor skews the hot path.
+
+LocalPriceSourceServer serves CoinGecko- and JSON-RPC-shaped responses
+for local runs and tests.
+"""
+
+import asyncio
+import math
+import os
+import statistics
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+from aiohttp import web
+from dotenv import load_dotenv
+from loguru import logger
+
+from data.env_config import is_configured
+from data.http_client import get_http_session
+from data.request_scheduler import (
+    RateLimitedError, get_request_scheduler, retry_after_seconds)
+from data.token_registry import (
+    COINGECKO_PLATFORMS, TokenRegistry, get_token_registry, normalize_address)
+
+load_dotenv()
+
+COINGECKO_PRICE_URL = "https://api.coingecko.com/api/v3/simple/price"
+
+# Chainlink USD aggregator proxies on Ethereum mainnet (8 decimals)
+CHAINLINK_USD_FEEDS = {
+    "ETH": "0x5f4eC3Df9cbd43714FE2740f5E3616155c5b8419",
+    "WETH": "0x5f4eC3Df9cbd43714FE2740f5E3616155c5b8419",
+    "WBTC": "0xF4030086522a5bEEa4988F8cA5B36dbC97BeE88c",  # BTC/USD
+    "SOL": "0x4ffC43a60e009B551865A93d232E33Fce9f01507",
+    "USDC": "0x8fFfFfd4AfB6115b954Bd326cbe7B4BA576818f6",
+    "USDT": "0x3E7d1eAB13ad0104d2750B8863b489D65364e32D",
+    "DAI": "0xAed0c38402a5d19df6E4c03F4E2DceD6e29c1ee9"
+}
+
+# Uniswap V3 pools quoted against USDC:
+# symbol -> (pool, token0_decimals, token1_decimals, symbol_is_token0)
+UNISWAP_V3_USDC_POOLS = {
+    "ETH": ("0x88e6A0c2dDD26FEEb64F039a2c41296FcB3f5640", 6, 18, False),
+    "WETH": ("0x88e6A0c2dDD26FEEb64F039a2c41296FcB3f5640", 6, 18, False),
+    "WBTC": ("0x99ac8cA7087fA4A2A1FB6357269965A2014ABc35", 8, 6, True),
+    "DAI": ("0x5777d92f208679DB4b9778590Fa3CAB3aC9e2168", 18, 6, True),
+    "USDT": ("0x3416cF6C708Da44DB2624D63ea0AAef7113527C6", 6, 6, False)
+}
+
+# Function selectors
+LATEST_ROUND_DATA_SELECTOR = "0xfeaf968c"  # latestRoundData()
+OBSERVE_SELECTOR = "0x883bdbfd"            # observe(uint32[])
+
+CHAINLINK_DECIMALS = 8
+
+
+def _decode_words(result: str) -> List[int]:
+    """Split an ABI-encoded hex result into unsigned 32-byte words"""
+    data = result[2:] if result.startswith("0x") else result
+    return [int(data[i:i + 64], 16) for i in range(0, len(data), 64)]
+
+
+def _to_signed(word: int) -> int:
+    """Interpret a 256-bit word as two's-complement int256"""
+    return word - (1 << 256) if word >= (1 << 255) else word
+
+
+def _encode_word(value: int) -> str:
+    """Encode a (possibly negative) integer as a 32-byte hex word"""
+    return format(value % (1 << 256), "064x")
+
+
+class PriceSource:
+    """
+    Base class for a price source
+
+    Subclasses implement _fetch(); fetch() adds latency tracking so the
+    aggregator can hedge on each source's own p95. Failed and timed-out
+    attempts are tracked as well (capped at the timeout).
+    """
+
+    name = "source"
+
+    def __init__(self, timeout: float = 10.0, latency_window: int = 100):
+        self.timeout = timeout
+        self._latencies = array('d', [0.0] * latency_window)
+        self._latency_count = 0
+        self.requests = 0
+        self.failures = 0
+
+    def supports(self, symbol: str) -> bool:
+        """Whether this source can price the symbol"""
+        return True
+
+    async def fetch(self, symbols: List[str]) -> Dict[str, float]:
+        """
+        Fetch USD prices for the supported subset of symbols
+
+        Returns:
+            Dictionary of {symbol: price}; failures raise
+        """
+        started = time.monotonic()
+        self.requests += 1
+        try:
+            prices = await self._fetch([s for s in symbols if self.supports(s)])
+        except asyncio.CancelledError:
+            # Abandoned by the aggregator (deadline or consensus reached): the
+            # elapsed time is only a lower bound, so count it if it is slow
+            elapsed = time.monotonic() - started
+            p95 = self.latency_percentile(95.0)
+            if p95 is not None and elapsed > p95:
+                self._record_latency(min(elapsed, self.timeout))
+            raise
+        except Exception:
+            # Failures and timeouts count too, or p95 only sees healthy requests
+            self.failures += 1
+            self._record_latency(min(time.monotonic() - started, self.timeout))
+            raise
+        self._record_latency(time.monotonic() - started)
+        return prices
+
+    async def _fetch(self, symbols: List[str]) -> Dict[str, float]:
+        raise NotImplementedError
+
+    def _record_latency(self, seconds: float):
+        window = len(self._latencies)
+        self._latencies[self._latency_count % window] = seconds
+        self._latency_count += 1
+
+    def latency_percentile(self, pct: float = 95.0) -> Optional[float]:
+        """Latency percentile over the recent window (None until 10 samples)"""
+        n = min(self._latency_count, len(self._latencies))
+        if n < 10:
+            return None
+        ordered = sorted(self._latencies[:n])
+        return ordered[min(n - 1, int(math.ceil(pct / 100 * n)) - 1)]
+
+    def get_stats(self) -> Dict:
+        return {
+            'requests': self.requests,
+            'failures': self.failures,
+            'p95_latency': self.latency_percentile(95.0)
+        }
+
+
+class CoinGeckoSource(PriceSource):
+    """
+    CoinGecko /simple/price, batched into one request
+
+    Tokens without a CoinGecko id (unlisted tokens from the registry) are
+    priced by contract address via /simple/token_price/{platform}.
+    """
+
+    name = "coingecko"
+
+    def __init__(
+        self,
+        url: str = COINGECKO_PRICE_URL,
+        api_key: Optional[str] = None,
+        registry: Optional[TokenRegistry] = None,
+        timeout: float = 10.0
+    ):
+        super().__init__(timeout=timeout)
+        self.url = url
+        self.token_price_url = url.replace("/simple/price", "/simple/token_price")
+        self.api_key = api_key
+        self.registry = registry or get_token_registry()
+
+    def supports(self, symbol: str) -> bool:
+        token = self.registry.get(symbol)
+        if token is None:
+            return False
+        return bool(token["coingecko_id"]) or any(
+            chain in COINGECKO_PLATFORMS for chain in token["addresses"])
+
+    def params(self, token_ids: List[str]) -> Dict[str, str]:
+        """Build /simple/price query params for one or more CoinGecko IDs"""
+        params = {
+            "ids": ",".join(token_ids),
+            "vs_currencies": "usd"
+        }
+        self._add_api_key(params)
+        return params
+
+    def _add_api_key(self, params: Dict[str, str]):
+        # Add API key if available
+        if is_configured(self.api_key):
+            params["x_cg_demo_api_key"] = self.api_key
+
+    async def _fetch(self, symbols: List[str]) -> Dict[str, float]:
+        # Symbols sharing a CoinGecko ID (ETH/WETH) are requested once
+        ids_by_symbol = {}
+        by_platform: Dict[str, Dict[str, str]] = {}
+        for symbol in symbols:
+            token = self.registry.get(symbol)
+            if token["coingecko_id"]:
+                ids_by_symbol[symbol] = token["coingecko_id"]
+                continue
+            for chain, address in token["addresses"].items():
+                if chain in COINGECKO_PLATFORMS:
+                    by_platform.setdefault(COINGECKO_PLATFORMS[chain], {})[
+                        symbol] = normalize_address(address)
+                    break
+
+        requests = []
+        if ids_by_symbol:
+            requests.append(self._fetch_by_id(ids_by_symbol))
+        for platform, addresses in by_platform.items():
+            requests.append(self._fetch_by_address(platform, addresses))
+
+        prices = {}
+        for result in await asyncio.gather(*requests):
+            prices.update(result)
+        return prices
+
+    async def _get_json(self, url: str, params: Dict[str, str]) -> Dict:
+        async def request() -> Dict:
+            session = get_http_session(verify_ssl=False)
+            async with session.get(url, params=params, timeout=self.timeout) as response:
+                if response.status == 429:
+                    raise RateLimitedError(retry_after_seconds(response.headers))
+                if response.status != 200:
+                    raise ConnectionError(f"CoinGecko API error: {response.status}")
+                return await response.json()
+
+        # Queued under the CoinGecko quota; 429s are re-queued, not failed
+        return await get_request_scheduler().run('coingecko', request)
+
+    async def _fetch_by_id(self, ids_by_symbol: Dict[str, str]) -> Dict[str, float]:
+        data = await self._get_json(
+            self.url, self.params(sorted(set(ids_by_symbol.values()))))
+
+        prices = {}
+        for symbol, token_id in ids_by_symbol.items():
+            if token_id in data and "usd" in data[token_id]:
+                prices[symbol] = float(data[token_id]["usd"])
+        return prices
+
+    async def _fetch_by_address(
+        self,
+        platform: str,
+        addresses: Dict[str, str]
+    ) -> Dict[str, float]:
+        params = {
+            "contract_addresses": ",".join(sorted(set(addresses.values()))),
+            "vs_currencies": "usd"
+        }
+        self._add_api_key(params)
+        data = await self._get_json(f"{self.token_price_url}/{platform}", params)
+
+        prices = {}
+        for symbol, address in addresses.items():
+            if address in data and "usd" in data[address]:
+                prices[symbol] = float(data[address]["usd"])
+        return prices
+
+
+class JsonRpcSource(PriceSource):
+    """Base for on-chain sources: one batched JSON-RPC eth_call per fetch"""
+
+    def __init__(self, rpc_url: str, timeout: float = 10.0):
+        super().__init__(timeout=timeout)
+        self.rpc_url = rpc_url
+
+    async def _eth_call_batch(self, calls: List[Tuple[str, str]]) -> List[Optional[str]]:
+        """
+        Execute several eth_calls in one JSON-RPC batch request
+
+        Args:
+            calls: [(to_address, calldata)]
+
+        Returns:
+            Hex results in call order (None for calls that errored)
+        """
+        payload = [
+            {
+                "jsonrpc": "2.0",
+                "id": i,
+                "method": "eth_call",
+                "params": [{"to": to, "data": data}, "latest"]
+            }
+            for i, (to, data) in enumerate(calls)
+        ]
+
+
+        async def request() -> List[Dict]:
+            session = get_http_session(verify_ssl=True)
+            async with session.post(self.rpc_url, json=payload, timeout=self.timeout) as response:
+                if response.status == 429:
+                    raise RateLimitedError(retry_after_seconds(response.headers))
+                if response.status != 200:
+                    raise ConnectionError(f"RPC error: {response.status}")
+                return await response.json(content_type=None)
+
+        replies = await get_request_scheduler().run('rpc', request)
+
+        if isinstance(replies, dict):
+            replies = [replies]
+        by_id = {r.get('id'): r.get('result') for r in replies}
+        return [by_id.get(i) for i in range(len(calls))]
+
+
+class ChainlinkSource(JsonRpcSource):
+    """Chainlink aggregator answers via latestRoundData()"""
+
+    name = "chainlink"
+
+    def __init__(
+        self,
+        rpc_url: str,
+        feeds: Optional[Dict[str, str]] = None,
+        max_age: Optional[float] = None,
+        timeout: float = 10.0
+    ):
+        super().__init__(rpc_url, timeout=timeout)
+        self.feeds = feeds or CHAINLINK_USD_FEEDS
+        # Stablecoin feeds only update on a 24h heartbeat
+        self.max_age = max_age or float(
+            os.getenv('CHAINLINK_MAX_AGE', '90000'))
+
+    def supports(self, symbol: str) -> bool:
+        return symbol.upper() in self.feeds
+
+    async def _fetch(self, symbols: List[str]) -> Dict[str, float]:
+        if not symbols:
+            return {}
+
+        results = await self._eth_call_batch([
+            (self.feeds[s.upper()], LATEST_ROUND_DATA_SELECTOR) for s in symbols
+        ])
+
+        prices = {}
+        now = time.time()
+        for symbol, result in zip(symbols, results):
+            if not result or len(result) < 2 + 64 * 5:
+                continue
+            words = _decode_words(result)
+            answer = _to_signed(words[1])
+            updated_at = words[3]
+            if answer <= 0 or now - updated_at > self.max_age:
+                logger.debug(f"Chainlink {symbol}: stale or invalid answer")
+                continue
+            prices[symbol] = answer / 10 ** CHAINLINK_DECIMALS
+        return prices
+
+
+class UniswapTwapSource(JsonRpcSource):
+    """Uniswap V3 time-weighted average price over a fixed window"""
+
+    name = "uniswap_twap"
+
+    def __init__(
+        self,
+        rpc_url: str,
+        pools: Optional[Dict[str, Tuple[str, int, int, bool]]] = None,
+        window_seconds: Optional[int] = None,
+        timeout: float = 10.0
+    ):
+        super().__init__(rpc_url, timeout=timeout)
+        self.pools = pools or UNISWAP_V3_USDC_POOLS
+        self.window = window_seconds or int(
+            os.getenv('TWAP_WINDOW_SECONDS', '1800'))
+
+    def supports(self, symbol: str) -> bool:
+        return symbol.upper() in self.pools
+
+    def observe_calldata(self) -> str:
+        """ABI-encode observe([window, 0])"""
+        return (
+            OBSERVE_SELECTOR
+            + _encode_word(0x20)
+            + _encode_word(2)
+            + _encode_word(self.window)
+            + _encode_word(0)
+        )
+
+    async def _fetch(self, symbols: List[str]) -> Dict[str, float]:
+        if not symbols:
+            return {}
+
+        calldata = self.observe_calldata()
+        results = await self._eth_call_batch([
+            (self.pools[s.upper()][0], calldata) for s in symbols
+        ])
+
+        prices = {}
+        for symbol, result in zip(symbols, results):
+            if not result:
+                continue
+            words = _decode_words(result)
+            # words[0] = offset of tickCumulatives; then length, values
+            start = words[0] // 32
+            if words[start] != 2:
+                continue
+            tick_old = _to_signed(words[start + 1])
+            tick_new = _to_signed(words[start + 2])
+            prices[symbol] = self.tick_to_price(
+                symbol, (tick_new - tick_old) / self.window)
+        return prices
+
+    def tick_to_price(self, symbol: str, tick: float) -> float:
+        """Convert an average tick into the symbol's USDC price"""
+        _, decimals0, decimals1, symbol_is_token0 = self.pools[symbol.upper()]
+        # price of token0 denominated in token1
+        price0 = 1.0001 ** tick * 10 ** (decimals0 - decimals1)
+        return price0 if symbol_is_token0 else 1 / price0
+
+
+class PriceAggregator:
+    """
+    Hedged, consensus-based price reads over several sources
+
+    1. Ask the primary source
+    2. If it hasn't answered within its p95 latency (or failed), hedge with
+       the next source, and so on down the list
+    3. Once every symbol has an answer, wait a short grace period for other
+       in-flight sources, then return the per-symbol median
+    """
+
+    def __init__(
+        self,
+        sources: List[PriceSource],
+        hedge_delay: Optional[float] = None,
+        consensus_grace: Optional[float] = None,
+        timeout: Optional[float] = None
+    ):
+        self.sources = sources
+        # Used until a source has enough latency samples for its own p95
+        self.default_hedge_delay = hedge_delay or float(
+            os.getenv('PRICE_HEDGE_DELAY', '0.5'))
+        self.min_hedge_delay = 0.05
+        self.consensus_grace = consensus_grace if consensus_grace is not None else float(
+            os.getenv('PRICE_CONSENSUS_GRACE', '0.05'))
+        self.timeout = timeout or float(os.getenv('PRICE_SOURCE_TIMEOUT', '10'))
+        self.max_disagreement_pct = float(
+            os.getenv('PRICE_MAX_DISAGREEMENT_PCT', '2.0'))
+
+        # Stats
+        self.hedges = 0
+        self.consensus_reads = 0
+
+        logger.info(
+            f"📡 PriceAggregator sources: {', '.join(s.name for s in sources) or 'none'}")
+
+    def hedge_delay(self, source: PriceSource) -> float:
+        """How long to wait on a source before hedging"""
+        p95 = source.latency_percentile(95.0)
+        if p95 is None:
+            return self.default_hedge_delay
+        return max(self.min_hedge_delay, p95)
+
+    async def get_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """
+        Fetch prices for symbols across sources
+
+        Args:
+            symbols: Token symbols (e.g., ['WETH', 'WBTC'])
+
+        Returns:
+            Dictionary of {symbol: median price} for symbols any source priced
+        """
+        symbols = list(dict.fromkeys(symbols))
+        queue = [s for s in self.sources if any(s.supports(t) for t in symbols)]
+        answers: Dict[str, Dict[str, float]] = {t: {} for t in symbols}
+        pending: Dict[asyncio.Task, PriceSource] = {}
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        next_hedge_at = None
+        covered_at = None
+
+        def launch():
+            nonlocal next_hedge_at
+            source = queue.pop(0)
+            pending[asyncio.ensure_future(source.fetch(symbols))] = source
+            next_hedge_at = loop.time() + self.hedge_delay(source) if queue else None
+
+        if queue:
+            launch()
+
+        try:
+            while pending:
+                now = loop.time()
+                wake_at = deadline
+                if covered_at is not None:
+                    wake_at = min(wake_at, covered_at + self.consensus_grace)
+                elif next_hedge_at is not None:
+                    wake_at = min(wake_at, next_hedge_at)
+
+                done, _ = await asyncio.wait(
+                    pending, timeout=max(0.0, wake_at - now),
+                    return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    source = pending.pop(task)
+                    if task.exception() is not None:
+                        logger.warning(f"{source.name} price fetch failed: {task.exception()}")
+                        continue
+                    for symbol, price in task.result().items():
+                        if symbol in answers and price and price > 0:
+                            answers[symbol][source.name] = price
+
+                now = loop.time()
+                missing = [t for t in symbols if not answers[t]]
+                if not missing and covered_at is None:
+                    covered_at = now
+
+                if now >= deadline:
+                    logger.warning(f"Price sources timed out for {missing or symbols}")
+                    break
+                if covered_at is not None:
+                    if now >= covered_at + self.consensus_grace:
+                        break
+                    continue
+
+                # Still missing prices: hedge on slowness, fail over on errors
+                if queue and (not pending or now >= next_hedge_at):
+                    if pending:
+                        self.hedges += 1
+                        logger.debug(f"📡 Hedging price read with {queue[0].name}")
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return self._consensus(answers)
+
+    def _consensus(self, answers: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+        """Median per symbol; logs sources that disagree beyond the threshold"""
+        prices = {}
+        for symbol, by_source in answers.items():
+            if not by_source:
+                continue
+            median = statistics.median(by_source.values())
+            prices[symbol] = median
+            if len(by_source) > 1:
+                self.consensus_reads += 1
+                for name, price in by_source.items():
+                    deviation = abs(price - median) / median * 100
+                    if deviation > self.max_disagreement_pct:
+                        logger.warning(
+                            f"⚠️  {name} {symbol} ${price:,.2f} deviates {deviation:.1f}% from median ${median:,.2f}")
+        return prices
+
+    def get_stats(self) -> Dict:
+        return {
+            'hedges': self.hedges,
+            'consensus_reads': self.consensus_reads,
+            'sources': {s.name: s.get_stats() for s in self.sources}
+        }
+
+
+def build_default_sources(coingecko_api_key: Optional[str] = None) -> List[PriceSource]:
+    """
+    Build sources in PRICE_SOURCES order, skipping unconfigured ones
+
+    On-chain sources need ETHEREUM_RPC_URL (or ETH_RPC_URL).
+    """
+    rpc_url = os.getenv('ETHEREUM_RPC_URL')
+    if not is_configured(rpc_url):
+        rpc_url = os.getenv('ETH_RPC_URL')
+
+    names = [n.strip() for n in os.getenv(
+        'PRICE_SOURCES', 'coingecko,chainlink,uniswap_twap').split(',') if n.strip()]
+
+    sources: List[PriceSource] = []
+    for name in names:
+        if name == 'coingecko':
+            sources.append(CoinGeckoSource(api_key=coingecko_api_key))
+        elif name in ('chainlink', 'uniswap_twap'):
+            if not is_configured(rpc_url):
+                logger.debug(f"{name} price source disabled: no RPC URL")
+                continue
+            source_cls = ChainlinkSource if name == 'chainlink' else UniswapTwapSource
+            sources.append(source_cls(rpc_url))
+        else:
+            logger.warning(f"Unknown price source: {name}")
+    return sources
+
+
+class LocalPriceSourceServer:
+    """
+    Local stand-in for every price source
+
+    Serves CoinGecko /simple/price and a JSON-RPC endpoint that answers
+    latestRoundData() and observe() for the configured feeds and pools.
+    Per-source latency and failures can be injected to exercise hedging.
+    """
+
+    def __init__(self, prices: Dict[str, float], host: str = "127.0.0.1", port: int = 0):
+        self.prices = dict(prices)
+        self.host = host
+        self.port = port
+        self.token_prices: Dict[str, float] = {}  # lowercase address -> price
+        self.latency = {'coingecko': 0.0, 'rpc': 0.0}
+        self.fail = {'coingecko': False, 'rpc': False}
+        self.twap_window = int(os.getenv('TWAP_WINDOW_SECONDS', '1800'))
+        self.requests = {'coingecko': 0, 'rpc': 0}
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def coingecko_url(self) -> str:
+        return f"http://{self.host}:{self.port}/simple/price"
+
+    @property
+    def rpc_url(self) -> str:
+        return f"http://{self.host}:{self.port}/rpc"
+
+    async def start(self):
+        """Start serving (port=0 picks a free port)"""
+        app = web.Application()
+        app.router.add_get('/simple/price', self._handle_coingecko)
+        app.router.add_get('/simple/token_price/{platform}', self._handle_token_price)
+        app.router.add_post('/rpc', self._handle_rpc)
+
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        logger.info(f"📡 Local price sources serving on {self.host}:{self.port}")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_coingecko(self, request: web.Request) -> web.Response:
+        self.requests['coingecko'] += 1
+        await asyncio.sleep(self.latency['coingecko'])
+        if self.fail['coingecko']:
+            return web.json_response({'error': 'rate limited'}, status=429)
+
+        ids = request.query.get('ids', '').split(',')
+        registry = get_token_registry()
+        data = {}
+        for symbol, price in self.prices.items():
+            token_id = registry.get_coingecko_id(symbol)
+            if token_id in ids:
+                data[token_id] = {'usd': price}
+        return web.json_response(data)
+
+    async def _handle_token_price(self, request: web.Request) -> web.Response:
+        self.requests['coingecko'] += 1
+        await asyncio.sleep(self.latency['coingecko'])
+        if self.fail['coingecko']:
+            return web.json_response({'error': 'rate limited'}, status=429)
+
+        addresses = request.query.get('contract_addresses', '').split(',')
+        return web.json_response({
+            address: {'usd': self.token_prices[address]}
+            for address in addresses if address in self.token_prices
+        })
+
+    async def _handle_rpc(self, request: web.Request) -> web.Response:
+        self.requests['rpc'] += 1
+        await asyncio.sleep(self.latency['rpc'])
+        if self.fail['rpc']:
+            return web.json_response({'error': 'unavailable'}, status=503)
+
+        calls = await request.json()
+        replies = [self._eth_call(c) for c in (calls if isinstance(calls, list) else [calls])]
+        return web.json_response(replies if isinstance(calls, list) else replies[0])
+
+    def _eth_call(self, call: Dict) -> Dict:
+        to = call['params'][0]['to'].lower()
+        data = call['params'][0]['data']
+        reply = {'jsonrpc': '2.0', 'id': call.get('id')}
+
+        if data.startswith(LATEST_ROUND_DATA_SELECTOR):
+            for symbol, feed in CHAINLINK_USD_FEEDS.items():
+                if feed.lower() == to and symbol in self.prices:
+                    answer = int(round(self.prices[symbol] * 10 ** CHAINLINK_DECIMALS))
+                    now = int(time.time())
+                    reply['result'] = "0x" + "".join(
+                        _encode_word(w) for w in (1, answer, now, now, 1))
+                    return reply
+
+        if data.startswith(OBSERVE_SELECTOR):
+            for symbol, (pool, decimals0, decimals1, is_token0) in UNISWAP_V3_USDC_POOLS.items():
+                if pool.lower() == to and symbol in self.prices:
+                    price0 = self.prices[symbol] if is_token0 else 1 / self.prices[symbol]
+                    tick = math.log(price0 / 10 ** (decimals0 - decimals1)) / math.log(1.0001)
+                    cumulative = int(round(tick * self.twap_window))
+                    words = (0x40, 0xa0, 2, 0, cumulative, 2, 0, 0)
+                    reply['result'] = "0x" + "".join(_encode_word(w) for w in words)
+                    return reply
+
+        reply['error'] = {'code': -32000, 'message': 'execution reverted'}
+        return reply
+
+
+# Test function
+async def test_price_sources():
+    """Hedge a slow CoinGecko stand-in with on-chain stand-ins"""
+    server = LocalPriceSourceServer({"WETH": 3500.0, "WBTC": 67000.0, "USDC": 1.0})
+    await server.start()
+
+    aggregator = PriceAggregator([
+        CoinGeckoSource(url=server.coingecko_url),
+        ChainlinkSource(server.rpc_url),
+        UniswapTwapSource(server.rpc_url)
+    ], hedge_delay=0.2)
+
+    logger.info(f"Normal read: {await aggregator.get_prices(['WETH', 'WBTC', 'USDC'])}")
+
+    server.latency['coingecko'] = 3.0
+    started = time.monotonic()
+    prices = await aggregator.get_prices(['WETH', 'WBTC'])
+    logger.info(f"Slow CoinGecko: {prices} in {time.monotonic() - started:.2f}s")
+    logger.info(f"Stats: {aggregator.get_stats()}")
+
+    await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(test_price_sources())
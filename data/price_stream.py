@@ -0,0 +1,267 @@
+"""
+LiquidityGuard AI - Streaming Price Ingestion
+
+Push-based price source for PriceFeedManager. Connects to a WebSocket
+(ws://, wss://) or Server-Sent Events (http://, https://) feed and
+ingests every tick into the price cache, which notifies deviation
+subscribers immediately instead of waiting for the next poll.
+
+Message format (one JSON object per WebSocket message / SSE data line):
+    {"symbol": "WETH", "price": 3512.4}
+    [{"symbol": "WETH", "price": 3512.4}, {"symbol": "WBTC", "price": 67000}]
+
+LocalPriceStreamServer is a stand-in feed for local runs and tests.
+"""
+
+import aiohttp
+import asyncio
+import json
+import os
+from typing import Dict, List, Optional
+from aiohttp import web
+from dotenv import load_dotenv
+from loguru import logger
+
+from data.http_client import get_http_session
+
+load_dotenv()
+
+
+def parse_price_message(raw: str) -> List[Dict]:
+    """
+    Parse a feed message into [{'symbol', 'price'}] ticks
+
+    Malformed entries are skipped rather than failing the whole message.
+    """
+    try:
+        payload = json.loads(raw)
+    except (TypeError, ValueError):
+        logger.debug(f"Ignoring non-JSON stream message: {raw!r:.80}")
+        return []
+
+    items = payload if isinstance(payload, list) else [payload]
+    ticks = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        symbol = item.get('symbol')
+        price = item.get('price')
+        if not symbol or not isinstance(price, (int, float)) or price <= 0:
+            continue
+        ticks.append({'symbol': str(symbol).upper(), 'price': float(price)})
+    return ticks
+
+
+class PriceStream:
+    """
+    WebSocket / SSE price stream client
+
+    Reconnects with exponential backoff until stopped.
+    """
+
+    def __init__(self, price_manager, url: Optional[str] = None, chain: str = "ethereum"):
+        self.price_manager = price_manager
+        self.url = url or os.getenv('PRICE_STREAM_URL')
+        self.chain = chain
+
+        self.reconnect_min = 1.0
+        self.reconnect_max = 30.0
+
+        self._task: Optional[asyncio.Task] = None
+        self.connected = False
+        self.ticks_received = 0
+
+    def start(self):
+        """Start consuming the stream on the running event loop (idempotent)"""
+        if not self.url:
+            logger.debug("PRICE_STREAM_URL not set - price streaming disabled")
+            return
+        if self._task and not self._task.done():
+            return
+
+        self._task = asyncio.ensure_future(self._run())
+        logger.info(f"📶 Price stream starting: {self.url}")
+
+    async def stop(self):
+        """Stop consuming the stream"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.connected = False
+
+    async def _run(self):
+        """Connect, consume and reconnect until cancelled"""
+        delay = self.reconnect_min
+        while True:
+            try:
+                if self.url.startswith(('ws://', 'wss://')):
+                    await self._consume_websocket()
+                else:
+                    await self._consume_sse()
+                delay = self.reconnect_min
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Price stream error: {e}")
+
+            self.connected = False
+            logger.info(f"📶 Price stream reconnecting in {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(self.reconnect_max, delay * 2)
+
+    async def _consume_websocket(self):
+        """Read ticks from a WebSocket feed"""
+        session = get_http_session()
+        async with session.ws_connect(self.url, heartbeat=30) as ws:
+            self.connected = True
+            logger.success(f"📶 Price stream connected (WebSocket)")
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    self._ingest(msg.data)
+                elif msg.type == aiohttp.WSMsgType.ERROR:
+                    raise ws.exception() or ConnectionError("WebSocket error")
+
+    async def _consume_sse(self):
+        """Read ticks from a Server-Sent Events feed"""
+        session = get_http_session()
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=None)
+        headers = {'Accept': 'text/event-stream'}
+        async with session.get(self.url, headers=headers, timeout=timeout) as response:
+            if response.status != 200:
+                raise ConnectionError(f"SSE feed returned {response.status}")
+
+            self.connected = True
+            logger.success(f"📶 Price stream connected (SSE)")
+            async for line in response.content:
+                line = line.decode('utf-8', errors='ignore').strip()
+                if line.startswith('data:'):
+                    self._ingest(line[5:].strip())
+
+    def _ingest(self, raw: str):
+        """Push parsed ticks into the price manager"""
+        for tick in parse_price_message(raw):
+            self.ticks_received += 1
+            self.price_manager.ingest_price(
+                tick['symbol'], tick['price'], chain=self.chain, source="stream")
+
+
+class LocalPriceStreamServer:
+    """
+    Local stand-in price feed
+
+    Serves a WebSocket feed on /prices and an SSE feed on /prices/sse.
+    Call publish() to broadcast a tick to every connected client.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+        self._websockets: set = set()
+        self._sse_queues: set = set()
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://{self.host}:{self.port}/prices"
+
+    @property
+    def sse_url(self) -> str:
+        return f"http://{self.host}:{self.port}/prices/sse"
+
+    async def start(self):
+        """Start serving (port=0 picks a free port)"""
+        app = web.Application()
+        app.router.add_get('/prices', self._handle_ws)
+        app.router.add_get('/prices/sse', self._handle_sse)
+
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        logger.info(f"📶 Local price stream serving on {self.ws_url}")
+
+    async def stop(self):
+        """Close client connections and stop serving"""
+        for ws in list(self._websockets):
+            await ws.close()
+        for queue in list(self._sse_queues):
+            queue.put_nowait(None)
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def publish(self, symbol: str, price: float):
+        """Broadcast one tick to every connected client"""
+        message = json.dumps({'symbol': symbol, 'price': price})
+        for ws in list(self._websockets):
+            if not ws.closed:
+                await ws.send_str(message)
+        for queue in list(self._sse_queues):
+            queue.put_nowait(message)
+
+    async def _handle_ws(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._websockets.add(ws)
+        try:
+            async for _ in ws:
+                pass  # Feed is one-way
+        finally:
+            self._websockets.discard(ws)
+        return ws
+
+    async def _handle_sse(self, request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(
+            headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'})
+        await response.prepare(request)
+
+        queue: asyncio.Queue = asyncio.Queue()
+        self._sse_queues.add(queue)
+        try:
+            while True:
+                message = await queue.get()
+                if message is None:
+                    break
+                await response.write(f"data: {message}\n\n".encode())
+        finally:
+            self._sse_queues.discard(queue)
+        return response
+
+
+# Test function
+async def test_price_stream():
+    """Stream ticks from the local stand-in server into PriceFeedManager"""
+    from data.price_feeds import PriceFeedManager
+
+    server = LocalPriceStreamServer()
+    await server.start()
+
+    manager = PriceFeedManager()
+    manager.subscribe_deviation(
+        "WETH", 1.0,
+        lambda token, old, new, change: logger.warning(
+            f"   Deviation callback: {token} ${old:.2f} → ${new:.2f} ({change:+.2f}%)")
+    )
+
+    stream = PriceStream(manager, url=server.ws_url)
+    stream.start()
+    await asyncio.sleep(0.5)
+
+    for price in [3500.0, 3510.0, 3460.0, 3300.0]:
+        await server.publish("WETH", price)
+        await asyncio.sleep(0.1)
+
+    logger.info(f"Ticks received: {stream.ticks_received}")
+    logger.info(f"Cached WETH: {manager.get_price_with_age('WETH')}")
+
+    await stream.stop()
+    await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(test_price_stream())
@@ -9,14 +9,18 @@ Sources:
 3. Mock data for demo
 """
 
-import aiohttp
 import asyncio
-import ssl
+import itertools
 from typing import Dict, Optional, List
 import os
 from dotenv import load_dotenv
 from loguru import logger
 
+from data.apy_history import get_apy_history
+from data.gas_estimator import get_gas_estimator
+from data.pool_index import top_k_diverse
+from data.pool_snapshot import get_pool_snapshot
+
 load_dotenv()
 
 
@@ -30,8 +34,15 @@ class ProtocolDataFetcher:
             'DEFILLAMA_BASE_URL',
             'https://yields.llama.fi'
         )
-        self.apy_cache = {}
-        self.cache_ttl = 300  # Cache for 5 minutes
+        # Every query reads the shared in-memory /pools snapshot
+        self.snapshot = get_pool_snapshot()
+
+        # Per-pool APY series, fed by every snapshot refresh
+        self.apy_history = get_apy_history()
+        # Cached per-chain execution costs
+        self.gas_estimator = get_gas_estimator()
+        self.snapshot.add_listener(self.apy_history.record_index)
+        self.backfill_pools = int(os.getenv('APY_HISTORY_BACKFILL_POOLS', '50'))
 
         logger.info("📡 ProtocolDataFetcher initialized")
         logger.info("   - All protocols: Real DeFi Llama API")
@@ -55,128 +66,39 @@ class ProtocolDataFetcher:
         """
         key = f"{protocol}_{chain}_{token}".lower()
 
-        # Check cache for real data
-        if key in self.apy_cache:
-            cached_apy, timestamp = self.apy_cache[key]
-            if asyncio.get_event_loop().time() - timestamp < self.cache_ttl:
-                logger.debug(f"[CACHE] {key} APY: {cached_apy:.2f}%")
-                return cached_apy
-
-        # Fetch real data from DeFi Llama
-        apy = await self._fetch_from_defillama(protocol, chain, token)
-        if apy:
-            self.apy_cache[key] = (apy, asyncio.get_event_loop().time())
-            logger.info(f"[DeFi Llama] {key} APY: {apy:.2f}%")
+        # Inverted index of the current snapshot (rebuilt on every refresh)
+        index = await self.snapshot.get_index()
+        row = index.best_pool(protocol, chain, token)
+        if row is not None:
+            apy = index.apy[row]
+            logger.debug(
+                f"[DeFi Llama] {key} APY: {apy:.2f}% ({index.project_slugs[index.project[row]]} {index.symbols[row]})")
             return apy
 
         logger.warning(f"Failed to fetch APY for {key}")
         return None
-        return None
 
-    async def _fetch_from_defillama(
+    async def get_all_yields(
         self,
-        protocol: str,
-        chain: str,
-        token: str
-    ) -> Optional[float]:
-        """
-        Fetch from DeFi Llama yields API with flexible matching
-
-        API Docs: https://defillama.com/docs/api
-        """
-        url = f"{self.defillama_base_url}/pools"
-
-        try:
-            # Create SSL context
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
-
-            connector = aiohttp.TCPConnector(ssl=ssl_context)
-            async with aiohttp.ClientSession(connector=connector) as session:
-                async with session.get(url, timeout=15) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        pools = data.get('data', [])
-
-                        # Normalize search terms
-                        protocol_search = protocol.lower().replace(
-                            '-v3', '').replace('-v2', '').replace('-', '')
-                        chain_search = chain.lower().split(
-                            '-')[0]  # ethereum-sepolia -> ethereum
-                        token_search = token.upper()
-
-                        # Map token variations
-                        if token_search in ['WETH', 'ETH']:
-                            token_variations = ['WETH', 'ETH', 'STETH']
-                        else:
-                            token_variations = [token_search]
-
-                        best_match = None
-                        best_apy = 0
-
-                        # Maximum realistic APY threshold (filter anomalies like 352,603%)
-                        MAX_REALISTIC_APY = 100.0  # 100% APY is already very high
-
-                        # Flexible matching
-                        for pool in pools:
-                            pool_project = pool.get('project', '').lower()
-                            pool_chain = pool.get('chain', '').lower()
-                            pool_symbol = pool.get('symbol', '').upper()
-                            apy = pool.get('apy', 0)
-
-                            # Skip unrealistic APY values (likely data errors)
-                            if apy > MAX_REALISTIC_APY:
-                                logger.debug(
-                                    f"Skipping unrealistic APY: {pool_project} {pool_symbol} - {apy:.2f}% (max: {MAX_REALISTIC_APY}%)")
-                                continue
-
-                            # Protocol matching: exact, startswith, or contains
-                            protocol_match = (
-                                pool_project == protocol_search or
-                                pool_project.startswith(protocol_search) or
-                                protocol_search in pool_project
-                            )
-
-                            # Chain matching
-                            chain_match = chain_search in pool_chain
-
-                            # Token matching (any variation)
-                            token_match = any(
-                                tv in pool_symbol for tv in token_variations)
-
-                            if protocol_match and chain_match and token_match:
-                                if apy > best_apy:
-                                    best_match = pool
-                                    best_apy = apy
-                                    logger.debug(
-                                        f"Matched: {pool_project} on {pool_chain} - {pool_symbol} - {apy:.2f}%")
-
-                        if best_match:
-                            return float(best_apy)
-                    else:
-                        logger.error(
-                            f"DeFi Llama API error: {response.status}")
-        except asyncio.TimeoutError:
-            logger.error("DeFi Llama API timeout")
-        except Exception as e:
-            logger.error(f"DeFi Llama fetch failed: {e}")
-
-        return None
-
-    async def get_all_yields(self, token: Optional[str] = None, min_apy: float = 0.0, limit: Optional[int] = None) -> List[Dict]:
+        token: Optional[str] = None,
+        min_apy: float = 0.0,
+        limit: Optional[int] = None,
+        rank_by: str = 'apy'
+    ) -> List[Dict]:
         """
-        Get yields from ALL protocols by fetching complete DeFi Llama pools data
+        Get yields from ALL protocols from the shared DeFi Llama pools snapshot
 
-        Instead of hardcoded list, fetches entire dataset and filters for lending protocols
+        Instead of hardcoded list, filters the entire dataset for lending protocols
 
         Args:
             token: Optional token filter (USDC, ETH, etc.)
             min_apy: Minimum APY threshold
             limit: Maximum number of yields to return (default: all, use 10 for efficiency)
+            rank_by: 'apy' (spot APY) or 'stability' (stability-adjusted APY
+                     from the pool's APY history; adds its history stats)
 
         Returns:
-            List of yield dictionaries sorted by APY (highest first):
+            List of yield dictionaries sorted by rank (highest first):
             [
                 {
                     "protocol": "kamino",
@@ -190,181 +112,82 @@ class ProtocolDataFetcher:
                 ...
             ]
         """
-        url = f"{self.defillama_base_url}/pools"
-
-        try:
-            # Create SSL context
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
-
-            connector = aiohttp.TCPConnector(ssl=ssl_context)
-            async with aiohttp.ClientSession(connector=connector) as session:
-                async with session.get(url, timeout=20) as response:
-                    if response.status != 200:
-                        logger.error(
-                            f"DeFi Llama API error: {response.status}")
-                        return []
-
-                    data = await response.json()
-                    pools = data.get('data', [])
-
-                    logger.info(
-                        f"📡 Fetched {len(pools)} pools from DeFi Llama")
-
-                    # Filter for lending protocols only
-                    lending_protocols = {
-                        'aave', 'aave-v2', 'aave-v3',
-                        'compound', 'compound-v2', 'compound-v3',
-                        'spark', 'morpho',
-                        'kamino', 'solend', 'marginfi', 'drift',
-                        'venus', 'benqi', 'radiant',
-                        'lido', 'rocket-pool', 'frax'
-                    }
-
-                    # Supported chains
-                    supported_chains = {
-                        'ethereum', 'arbitrum', 'optimism', 'base', 'polygon',
-                        'solana', 'avalanche'
-                    }
-
-                    # Common tokens we care about
-                    supported_tokens = {
-                        'ETH', 'WETH', 'STETH', 'RETH',
-                        'USDC', 'USDT', 'DAI', 'USDE',
-                        'WBTC', 'BTC',
-                        'SOL', 'MSOL', 'JSOL'
-                    }
-
-                    results = []
-                    max_realistic_apy = 100.0  # Filter anomalies
-
-                    for pool in pools:
-                        project = pool.get(
-                            'project', '').lower().replace('-', '')
-                        chain = pool.get('chain', '').lower()
-                        symbol = pool.get('symbol', '').upper()
-                        apy = pool.get('apy', 0)
-                        tvl = pool.get('tvlUsd', 0)
-
-                        # Skip if not a lending protocol
-                        if not any(lp in project for lp in lending_protocols):
-                            continue
-
-                        # Skip if chain not supported
-                        if chain not in supported_chains:
-                            continue
-
-                        # Skip unrealistic APYs
-                        if apy > max_realistic_apy or apy < min_apy:
-                            continue
-
-                        # Skip low TVL pools (< $100k - likely unreliable)
-                        if tvl < 100000:
-                            continue
-
-                        # Extract token from symbol (e.g., "aUSDC" -> "USDC", "WETH-USDC" -> "WETH")
-                        found_token = None
-                        for supported_token in supported_tokens:
-                            if supported_token in symbol:
-                                found_token = supported_token
-                                break
-
-                        if not found_token:
-                            continue
-
-                        # Token filter
-                        if token and found_token.upper() != token.upper():
-                            continue
-
-                        # Normalize project name (remove version suffixes, liquidity, finance, etc.)
-                        project_normalized = (project
-                                              .replace('v3', '').replace('v2', '').replace('v1', '')
-                                              .replace('liquidity', '').replace('finance', '')
-                                              .replace('-', '').replace('_', '')
-                                              .strip()
-                                              )
-
-                        # Estimate gas costs based on chain
-                        gas_costs = {
-                            'ethereum': 50.0,
-                            'arbitrum': 5.0,
-                            'optimism': 5.0,
-                            'base': 5.0,
-                            'polygon': 2.0,
-                            'solana': 0.1,
-                            'avalanche': 3.0
-                        }
-
-                        results.append({
-                            'protocol': project_normalized,
-                            'chain': chain,
-                            'token': found_token,
-                            'apy': apy,
-                            'pool': f"{project_normalized}_{chain}_{found_token}".lower(),
-                            'tvlUsd': tvl,
-                            'estimated_gas': gas_costs.get(chain, 10.0)
-                        })
-
-                    # Sort by APY (highest first)
-                    results.sort(key=lambda x: x['apy'], reverse=True)
-
-                    # Apply limit with protocol diversity
-                    if limit:
-                        # Get diverse protocols instead of all same protocol
-                        diverse_results = []
-                        protocol_count = {}
-                        max_per_protocol = 3  # Maximum 3 pools per protocol
-
-                        logger.debug(
-                            f"Applying diversity filter: limit={limit}, max_per_protocol={max_per_protocol}")
-
-                        for pool in results:
-                            protocol = pool['protocol']
-                            count = protocol_count.get(protocol, 0)
-
-                            # Add if we haven't hit the per-protocol limit
-                            if count < max_per_protocol:
-                                diverse_results.append(pool)
-                                protocol_count[protocol] = count + 1
-                                logger.debug(
-                                    f"  Added {protocol} (count: {protocol_count[protocol]}): {pool['apy']:.2f}%")
-
-                                # Stop when we reach desired total
-                                if len(diverse_results) >= limit:
-                                    logger.debug(
-                                        f"  Reached limit of {limit} results")
-                                    break
-                            else:
-                                logger.debug(
-                                    f"  Skipped {protocol} (already have {count}): {pool['apy']:.2f}%")
-
-                        results = diverse_results
-                        protocols_found = len(
-                            set(p['protocol'] for p in results))
-                        logger.success(
-                            f"✅ Loaded top {len(results)} lending yields from {protocols_found} protocols (max {max_per_protocol} per protocol)")
-                    else:
-                        logger.success(
-                            f"✅ Loaded {len(results)} lending yields")
-
-                    # Log top 10 yields
-                    if results:
-                        logger.info("📊 Top 10 yields:")
-                        for i, yield_data in enumerate(results[:10], 1):
-                            logger.info(
-                                f"   {i}. {yield_data['pool']}: {yield_data['apy']:.2f}%")
-
-                    return results
-
-        except asyncio.TimeoutError:
-            logger.error("DeFi Llama API timeout")
-        except Exception as e:
-            logger.error(f"Failed to fetch all yields: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
-
-        return []
+        index = await self.snapshot.get_index()
+        if not index.size:
+            logger.error("DeFi Llama pools snapshot unavailable")
+            return []
+
+        # Lending protocols on supported chains, realistic APY, TVL >= $100k,
+        # known token - as one bitmask over the APY-ranked rows
+        mask = index.yields_mask(token=token, min_apy=min_apy)
+        rows = index.rows(mask)
+
+        # Rank on spot APY (row order) or on the precomputed history stats
+        history = self.apy_history
+        score = (
+            (lambda row: history.stability_adjusted_apy(index.pool_ids[row], index.apy[row]))
+            if rank_by == 'stability' else None)
+
+        # Apply limit with protocol diversity
+        if limit:
+            # Get diverse protocols instead of all same protocol
+            max_per_protocol = 3  # Maximum 3 pools per protocol
+
+            # Rows come out ranked, so selection stops as soon as it is full
+            top = top_k_diverse(
+                rows, limit, max_per_protocol, group=index.protocol, score=score)
+            results = [self.yield_record(index, row, rank_by) for row in top]
+
+            protocols_found = len(set(p['protocol'] for p in results))
+            logger.success(
+                f"✅ Loaded top {len(results)} lending yields from {protocols_found} protocols (max {max_per_protocol} per protocol)")
+        else:
+            if score is not None:
+                rows = sorted(rows, key=score, reverse=True)
+            results = [self.yield_record(index, row, rank_by) for row in rows]
+            logger.success(
+                f"✅ Loaded {len(results)} lending yields")
+
+        # Log top 10 yields
+        if results:
+            logger.info("📊 Top 10 yields:")
+            for i, yield_data in enumerate(results[:10], 1):
+                logger.info(
+                    f"   {i}. {yield_data['pool']}: {yield_data['apy']:.2f}%")
+
+        return results
+
+
+    def yield_record(self, index, row: int, rank_by: str = 'apy') -> Dict:
+        """Yield dict for an index row (with history stats when ranking on stability)"""
+        record = index.record(row)
+        record['estimated_gas'] = self.gas_estimator.get_migration_cost(record['chain'])
+        if rank_by == 'stability':
+            stats = self.apy_history.get_stats(record['pool_id']) or {}
+            record['stable_apy'] = self.apy_history.stability_adjusted_apy(
+                record['pool_id'], record['apy'])
+            record['apy_mean'] = stats.get('mean_apy')
+            record['apy_volatility'] = stats.get('apy_volatility')
+            record['apy_trend_per_day'] = stats.get('apy_trend_per_day')
+            record['apy_history_samples'] = stats.get('samples', 0)
+        return record
+
+    async def backfill_apy_history(self, limit: Optional[int] = None) -> int:
+        """
+        Backfill APY history for the top lending pools from DeFi Llama charts
+
+        Args:
+            limit: Number of pools (default APY_HISTORY_BACKFILL_POOLS)
+
+        Returns:
+            Number of pools backfilled
+        """
+        limit = self.backfill_pools if limit is None else limit
+        if limit <= 0:
+            return 0
+        index = await self.snapshot.get_index()
+        top = itertools.islice(index.rows(index.lending), limit)
+        return await self.apy_history.backfill(index.pool_ids[row] for row in top)
 
     async def find_best_yield(
         self,
@@ -405,39 +228,19 @@ class ProtocolDataFetcher:
         # Normalize exclude chains
         exclude_chains_normalized = [c.lower() for c in exclude_chains]
 
-        # Get all yields (already sorted by APY)
-        all_yields = await self.get_all_yields(token=token, min_apy=min_apy)
-
-        # Handle token filtering
-        if token:
-            # Handle WETH/ETH equivalence
-            token_variations = [token.upper()]
-            if token.upper() in ['WETH', 'ETH']:
-                token_variations = ['WETH', 'ETH', 'STETH', 'RETH']
-        else:
-            # No token filter - accept all tokens
-            token_variations = None
-
-        # Find best yield that meets criteria
-        for yield_data in all_yields:
-            protocol = yield_data['protocol']
-            chain = yield_data['chain']
-            token_symbol = yield_data['token']
+        index = await self.snapshot.get_index()
+        if not index.size:
+            logger.error("DeFi Llama pools snapshot unavailable")
+            return None
 
-            # Check if chain is excluded
-            if chain.lower() in exclude_chains_normalized:
-                continue
+        # Same filters as get_all_yields, minus excluded protocols/chains
+        mask = index.yields_mask(token=token, min_apy=min_apy)
+        mask &= ~index.protocol_mask(exclude_normalized)
+        mask &= ~index.chain_mask(exclude_chains_normalized)
 
-            # Check if protocol is excluded (normalized comparison)
-            protocol_normalized = protocol.replace('-', '').lower()
-            if protocol_normalized in exclude_normalized:
-                continue
-
-            # Check token match (with variations for ETH/WETH) - skip if no filter
-            if token_variations and token_symbol.upper() not in token_variations:
-                continue
-
-            # Found the best yield that meets all criteria
+        # Rows are ranked by APY, so the first one left is the best
+        for row in index.rows(mask):
+            yield_data = self.yield_record(index, row)
             logger.debug(
                 f"Best yield: {yield_data['pool']} - {yield_data['apy']:.2f}%")
             return {
@@ -456,36 +259,10 @@ class ProtocolDataFetcher:
         """
         Estimate gas costs for migration in USD
 
-        Returns gas cost estimate in USD
+        Returns gas cost estimate in USD (from the cached GasEstimator table)
         """
-        # Base gas estimates (USD)
-        gas_estimates = {
-            # Same chain (Ethereum → Ethereum)
-            'same_chain': 25.0,  # Withdraw + Swap + Supply
-
-            # EVM cross-chain (Ethereum → Arbitrum/Optimism)
-            'evm_cross_chain': 40.0,  # + Stargate bridge fee
-
-            # Ethereum → Solana
-            'eth_to_sol': 50.0,  # + Wormhole bridge fee
-
-            # Solana → Ethereum
-            'sol_to_eth': 55.0,  # Higher due to ETH gas
-        }
-
-        if not cross_chain:
-            return gas_estimates['same_chain']
-
-        # Cross-chain routing
-        if from_chain == 'ethereum' and to_chain in ['arbitrum', 'optimism', 'base']:
-            return gas_estimates['evm_cross_chain']
-        elif from_chain == 'ethereum' and to_chain == 'solana':
-            return gas_estimates['eth_to_sol']
-        elif from_chain == 'solana' and to_chain == 'ethereum':
-            return gas_estimates['sol_to_eth']
-        else:
-            # Unknown route - use conservative estimate
-            return gas_estimates['evm_cross_chain']
+        return self.gas_estimator.estimate_migration_cost(
+            from_chain, to_chain if cross_chain else from_chain)
 
     def set_mock_apy(self, protocol: str, chain: str, token: str, apy: float):
         """Set mock APY for demo mode"""
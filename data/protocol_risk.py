@@ -1,13 +1,77 @@
 """
 Protocol Risk Scoring
 Fetches real risk metrics from DeFi Llama and DeFi Safety
+
+Protocol TVLs come from one shared snapshot of api.llama.fi/protocols
+(every protocol's current TVL in a single request), refreshed every
+PROTOCOL_TVL_TTL seconds, instead of a full TVL history download per
+scored protocol.
+
+Every risk input is piecewise constant, so each TVL refresh precomputes
+the score of every known protocol x chain x amount bucket; scoring a
+candidate is then one dict lookup (get_risk_score, no I/O).
 """
 
-import aiohttp
 import asyncio
-from typing import Optional, Dict
+import os
+import time
+from bisect import bisect_left
+from typing import Optional, Dict, Tuple
+from dotenv import load_dotenv
 from loguru import logger
 
+from data.http_client import get_http_session
+from data.pool_index import normalize_project
+from data.request_scheduler import (
+    RateLimitedError, get_request_scheduler, retry_after_seconds)
+from data.single_flight import SingleFlight
+
+load_dotenv()
+
+# Chain risk adjustment (Ethereum safer than newer chains)
+CHAIN_RISK_ADJUSTMENTS = {
+    'ethereum': 0,
+    'arbitrum': +1,
+    'optimism': +1,
+    'polygon': +1,
+    'base': +1,
+    'avalanche': +1,
+    'solana': +2,
+    'ethereum-sepolia': +1,  # Testnet
+}
+DEFAULT_CHAIN_ADJUSTMENT = +2
+
+UNKNOWN_PROTOCOL_RISK = 7
+
+# Amount buckets: <= $100K, <= $1M, > $1M (large amounts need extra safety)
+RISK_AMOUNT_THRESHOLDS = (100000, 1000000)
+RISK_AMOUNT_ADJUSTMENTS = (0, 0, -1)
+
+
+def tvl_adjustment(tvl: Optional[float]) -> int:
+    """Risk adjustment for a TVL in USD billions (higher TVL = lower risk)"""
+    if not tvl:
+        return 0
+    if tvl > 10:      # >$10B TVL
+        return -2
+    if tvl > 5:       # >$5B TVL
+        return -1
+    if tvl > 1:       # >$1B TVL
+        return 0
+    if tvl < 0.1:     # <$100M TVL
+        return +2
+    return +1         # $100M-$1B TVL
+
+
+def amount_bucket(amount_usd: float) -> int:
+    """Index into RISK_AMOUNT_ADJUSTMENTS"""
+    return bisect_left(RISK_AMOUNT_THRESHOLDS, amount_usd)
+
+
+def protocol_family(protocol: str) -> str:
+    """TVL lookup key: aave-v3 / Aave V3 / parent#aave -> aave"""
+    return normalize_project(protocol.split('#')[-1].replace(' ', '-'))
+
 
 class ProtocolRiskScorer:
     """
@@ -15,9 +79,22 @@ class ProtocolRiskScorer:
     """
 
     def __init__(self):
-        self.defillama_url = "https://api.llama.fi"
-        self.risk_cache = {}
-        self.cache_ttl = 3600  # 1 hour cache
+        self.defillama_url = os.getenv('DEFILLAMA_API_URL', 'https://api.llama.fi')
+        self.cache_ttl = float(os.getenv('PROTOCOL_TVL_TTL', '3600'))
+        self.timeout = float(os.getenv('PROTOCOL_TVL_TIMEOUT', '30'))
+
+        # Protocol family -> TVL (USD), summed over versions and chains
+        self.tvl_snapshot: Dict[str, float] = {}
+        self.tvl_fetched_at: Optional[float] = None  # time.monotonic()
+        self._tvl_failed_at: Optional[float] = None
+        self.tvl_retry_seconds = 60.0  # Cold-start retry interval after a failure
+        self._flight = SingleFlight("protocols_tvl")
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._background_tasks: set = set()
+
+        # (protocol family, chain) -> score per amount bucket
+        self.risk_table: Dict[Tuple[str, str], Tuple[int, ...]] = {}
+        self.risk_table_built_at: Optional[float] = None
 
         # Known protocol risk factors (updated from audits & exploits)
         self.base_risk_scores = {
@@ -34,47 +111,204 @@ class ProtocolRiskScorer:
             'marinade': 5,    # Moderate - Solana LST
         }
 
+        self.rebuild_risk_table()
+
         logger.info("🛡️ ProtocolRiskScorer initialized")
         logger.info("   Using DeFi Llama TVL + base risk scores")
 
-    async def get_protocol_tvl(self, protocol: str) -> Optional[float]:
+    # ═══════════════════════════════════════════════════════
+    # TVL SNAPSHOT
+    # ═══════════════════════════════════════════════════════
+
+    @property
+    def tvl_age(self) -> Optional[float]:
+        """Seconds since the last successful TVL refresh (None if never loaded)"""
+        if self.tvl_fetched_at is None:
+            return None
+        return time.monotonic() - self.tvl_fetched_at
+
+    def get_cached_tvl(self, protocol: str) -> Optional[float]:
         """
-        Get protocol TVL from DeFi Llama
+        Protocol TVL from the current snapshot (no I/O)
 
         Returns:
-            TVL in USD (billions)
+            TVL in USD (billions), None if unknown
         """
-        try:
-            # Normalize protocol name for DeFi Llama
-            protocol_map = {
-                'aave-v3': 'aave',
-                'compound-v3': 'compound',
-                'aave-v2': 'aave',
-            }
-
-            protocol_clean = protocol_map.get(
-                protocol.lower(), protocol.lower())
-
-            url = f"{self.defillama_url}/protocol/{protocol_clean}"
+        tvl = self.tvl_snapshot.get(protocol_family(protocol))
+        return tvl / 1e9 if tvl else None
 
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=5)) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        tvl = data.get('tvl', [{}])
+    async def get_protocol_tvl(self, protocol: str) -> Optional[float]:
+        """
+        Get protocol TVL from the DeFi Llama /protocols snapshot
 
-                        if tvl and len(tvl) > 0:
-                            current_tvl = tvl[-1].get('totalLiquidityUSD', 0)
-                            tvl_billions = current_tvl / 1e9
+        Returns:
+            TVL in USD (billions)
+        """
+        age = self.tvl_age
+        if age is None:
+            # Without a snapshot, don't retry a failed download on every call
+            if (self._tvl_failed_at is None
+                    or time.monotonic() - self._tvl_failed_at >= self.tvl_retry_seconds):
+                await self.refresh_tvl()
+        elif age >= self.cache_ttl and not self._flight.in_flight("protocols"):
+            # Serve the current snapshot while it refreshes
+            task = asyncio.ensure_future(self.refresh_tvl())
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+        return self.get_cached_tvl(protocol)
+
+    async def refresh_tvl(self) -> bool:
+        """
+        Reload every protocol's TVL (coalesced with concurrent refreshes)
 
-                            logger.info(
-                                f"📊 {protocol_clean} TVL: ${tvl_billions:.2f}B")
-                            return tvl_billions
+        Returns:
+            True if the snapshot was updated
+        """
+        return await self._flight.do("protocols", self._download_tvl)
+
+    async def _download_tvl(self) -> bool:
+        updated = await self._fetch_tvl()
+        if not updated:
+            self._tvl_failed_at = time.monotonic()
+        return updated
+
+    async def _fetch_tvl(self) -> bool:
+        url = f"{self.defillama_url}/protocols"
+        started = time.monotonic()
+
+        async def request() -> Optional[list]:
+            session = get_http_session(verify_ssl=True)
+            async with session.get(url, timeout=self.timeout) as response:
+                if response.status == 429:
+                    raise RateLimitedError(retry_after_seconds(response.headers))
+                if response.status != 200:
+                    logger.warning(f"DeFi Llama protocols error: {response.status}")
+                    return None
+                return await response.json(content_type=None)
 
+        try:
+            # 429s are re-queued under the DeFi Llama quota, not failed
+            protocols = await get_request_scheduler().run('defillama', request)
         except Exception as e:
-            logger.debug(f"Could not fetch TVL for {protocol}: {e}")
+            logger.warning(f"DeFi Llama protocols download failed: {e}")
+            return False
+        if protocols is None:
+            return False
+
+        # Versions (aave-v2, aave-v3) roll up into their parent protocol
+        snapshot: Dict[str, float] = {}
+        children: Dict[str, float] = {}
+        for entry in protocols:
+            tvl = entry.get('tvl')
+            name = entry.get('parentProtocol') or entry.get('slug') or entry.get('name')
+            if not name or not isinstance(tvl, (int, float)) or tvl <= 0:
+                continue
+            family = protocol_family(name)
+            snapshot[family] = snapshot.get(family, 0.0) + tvl
+            if entry.get('parentProtocol') and entry.get('slug'):
+                children[protocol_family(entry['slug'])] = tvl
+        # Pool slugs that don't reduce to their parent (kamino-lend) keep their own TVL
+        for child, tvl in children.items():
+            snapshot.setdefault(child, tvl)
+
+        self.tvl_snapshot = snapshot
+        self.tvl_fetched_at = time.monotonic()
+        self.rebuild_risk_table()
+        logger.info(
+            f"📊 Protocol TVL snapshot: {len(snapshot)} protocols in {time.monotonic() - started:.2f}s")
+        return True
+
+    def start_background_refresh(self):
+        """Refresh the TVL snapshot every PROTOCOL_TVL_TTL on the running loop (idempotent)"""
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.ensure_future(self._refresh_loop())
+
+    async def stop_background_refresh(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh_tvl()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Protocol TVL refresh failed: {e}")
+            await asyncio.sleep(self.cache_ttl)
+
+    # ═══════════════════════════════════════════════════════
+    # RISK TABLE
+    # ═══════════════════════════════════════════════════════
+
+    def _protocol_risk(self, family: str) -> int:
+        """Base risk plus TVL adjustment (the protocol-only part of the score)"""
+        tvl = self.tvl_snapshot.get(family)
+        return (self.base_risk_scores.get(family, UNKNOWN_PROTOCOL_RISK)
+                + tvl_adjustment(tvl / 1e9 if tvl else None))
+
+    def _score(self, family: str, chain: str, bucket: int) -> int:
+        score = (self._protocol_risk(family)
+                 + CHAIN_RISK_ADJUSTMENTS.get(chain, DEFAULT_CHAIN_ADJUSTMENT)
+                 + RISK_AMOUNT_ADJUSTMENTS[bucket])
+        return max(1, min(10, score))
+
+    def rebuild_risk_table(self):
+        """Precompute scores for every known protocol x chain x amount bucket"""
+        started = time.monotonic()
+        # Few distinct protocol/chain sums: build each score row once
+        rows: Dict[int, Tuple[int, ...]] = {}
+        table = {}
+        for family in set(self.base_risk_scores) | set(self.tvl_snapshot):
+            protocol_risk = self._protocol_risk(family)
+            for chain, chain_adjustment in CHAIN_RISK_ADJUSTMENTS.items():
+                partial = protocol_risk + chain_adjustment
+                row = rows.get(partial)
+                if row is None:
+                    row = rows[partial] = tuple(
+                        max(1, min(10, partial + a)) for a in RISK_AMOUNT_ADJUSTMENTS)
+                table[(family, chain)] = row
+        self.risk_table = table
+        self.risk_table_built_at = time.time()
+        logger.debug(
+            f"🛡️ Risk table: {len(self.risk_table)} protocol/chain rows in {time.monotonic() - started:.3f}s")
+
+    def get_risk_score(
+        self,
+        protocol: str,
+        chain: str = 'ethereum',
+        amount_usd: float = 0
+    ) -> int:
+        """
+        Risk score from the precomputed table (no I/O)
+
+        Args:
+            protocol: Protocol name or DeFi Llama slug
+            chain: Chain name
+            amount_usd: Position size in USD
 
-        return None
+        Returns:
+            Risk score 1-10 (lower is safer)
+        """
+        family, chain, bucket = protocol_family(protocol), chain.lower(), amount_bucket(amount_usd)
+        row = self.risk_table.get((family, chain))
+        if row is None:
+            return self._score(family, chain, bucket)
+        return row[bucket]
+
+    def get_stats(self) -> Dict:
+        return {
+            'protocols': len(self.tvl_snapshot),
+            'tvl_age_seconds': self.tvl_age,
+            'risk_table_rows': len(self.risk_table),
+            'risk_table_built_at': self.risk_table_built_at
+        }
 
     async def calculate_risk_score(
         self,
@@ -94,60 +328,20 @@ class ProtocolRiskScorer:
         Returns:
             Risk score 1-10
         """
-        # Start with base risk score
-        protocol_clean = protocol.lower().replace('-v3', '').replace('-v2', '')
-        base_risk = self.base_risk_scores.get(
-            protocol_clean, 7)  # Default 7/10 for unknown
-
-        # Adjust for TVL (higher TVL = lower risk)
+        # Refresh the TVL snapshot (and risk table) if it is stale
         tvl = await self.get_protocol_tvl(protocol)
+        final_score = self.get_risk_score(protocol, chain, amount_usd)
 
-        tvl_adjustment = 0
-        if tvl:
-            if tvl > 10:      # >$10B TVL
-                tvl_adjustment = -2
-            elif tvl > 5:     # >$5B TVL
-                tvl_adjustment = -1
-            elif tvl > 1:     # >$1B TVL
-                tvl_adjustment = 0
-            elif tvl < 0.1:   # <$100M TVL
-                tvl_adjustment = +2
-            else:             # $100M-$1B TVL
-                tvl_adjustment = +1
-
-        # Adjust for chain risk
-        chain_risk = {
-            'ethereum': 0,
-            'arbitrum': +1,
-            'optimism': +1,
-            'polygon': +1,
-            'base': +1,
-            'avalanche': +1,
-            'solana': +2,
-            'ethereum-sepolia': +1,  # Testnet
-        }
-
-        chain_adjustment = chain_risk.get(chain.lower(), +2)
-
-        # Adjust for amount size (large amounts need extra safety)
-        amount_adjustment = 0
-        if amount_usd > 1000000:  # >$1M
-            amount_adjustment = -1  # Be more conservative
-        elif amount_usd > 100000:  # >$100K
-            amount_adjustment = 0
-
-        # Calculate final score
-        final_score = base_risk + tvl_adjustment + chain_adjustment + amount_adjustment
-
-        # Clamp to 1-10 range
-        final_score = max(1, min(10, final_score))
-
+        family = protocol_family(protocol)
         logger.info(
             f"🛡️ Risk Score for {protocol} on {chain}: {final_score}/10")
         logger.info(
-            f"   Base: {base_risk} | TVL: {tvl_adjustment:+d} | Chain: {chain_adjustment:+d} | Amount: {amount_adjustment:+d}")
+            f"   Base: {self.base_risk_scores.get(family, UNKNOWN_PROTOCOL_RISK)} | "
+            f"TVL: {tvl_adjustment(tvl):+d} | "
+            f"Chain: {CHAIN_RISK_ADJUSTMENTS.get(chain.lower(), DEFAULT_CHAIN_ADJUSTMENT):+d} | "
+            f"Amount: {RISK_AMOUNT_ADJUSTMENTS[amount_bucket(amount_usd)]:+d}")
 
-        return int(final_score)
+        return final_score
 
     def get_risk_description(self, risk_score: int) -> str:
         """Get human-readable risk description"""
@@ -0,0 +1,322 @@
+"""
+LiquidityGuard AI - Quota-Aware Request Scheduler
+
+Every call to a rate-limited upstream (CoinGecko, DeFi Llama, Etherscan,
+1inch, The Graph, RPC) takes a token from that upstream's bucket first.
+Callers queue instead of bursting into 429s, and the queue is ordered by
+priority class, so position pricing goes ahead of dashboard refreshes.
+
+- Token bucket per upstream (rate/burst configurable via RATE_LIMIT_<NAME>)
+- Priority classes: CRITICAL > NORMAL > BACKGROUND; background work never
+  dips into the last RATE_LIMIT_RESERVE tokens kept for critical bursts
+- A 429 drains the bucket for Retry-After and the call is re-queued
+- Stats: queue depth, wait times and throttles per upstream
+"""
+
+import asyncio
+import contextvars
+import functools
+import itertools
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+
+
+class Priority:
+    """Priority classes (lower value is served first)"""
+    CRITICAL = 0    # Position pricing / health checks
+    NORMAL = 1      # Strategy search, background refresh
+    BACKGROUND = 2  # Dashboard and frontend endpoints
+
+
+# Default quotas: upstream -> (requests per second, burst)
+DEFAULT_RATE_LIMITS = {
+    'coingecko': (0.5, 5),     # Demo plan: 30 calls/min
+    'defillama': (5.0, 10),
+    'etherscan': (5.0, 5),     # Free plan: 5 calls/sec
+    'oneinch': (1.0, 1),       # Dev portal free tier: 1 RPS
+    'thegraph': (10.0, 20),
+    'rpc': (10.0, 20)
+}
+
+_current_priority: contextvars.ContextVar = contextvars.ContextVar(
+    'request_priority', default=Priority.NORMAL)
+
+
+@contextmanager
+def request_priority(priority: int):
+    """Run upstream calls made inside this block (and tasks it spawns) at priority"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def with_priority(priority: int):
+    """Decorator: run an async function's upstream calls at priority"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with request_priority(priority):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RateLimitedError(Exception):
+    """Raised by a request function when the upstream answered 429"""
+
+    def __init__(self, retry_after: Optional[float] = None):
+        super().__init__(f"rate limited (retry after {retry_after}s)")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Classic token bucket; tokens may go negative after a 429 penalty"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def time_until(self, tokens: float) -> float:
+        """Seconds until the bucket holds `tokens`"""
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+
+class _Lane:
+    """Bucket, waiters and counters for one upstream"""
+
+    def __init__(self, name: str, rate: float, burst: float, reserve: float):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.reserve = min(reserve, max(0.0, burst - 1))
+        self.waiting: Dict[int, int] = {}  # seq -> priority
+
+        # Stats
+        self.requests = 0
+        self.queued = 0
+        self.throttled = 0
+        self.max_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.by_priority: Dict[int, int] = {}
+
+
+class RequestScheduler:
+    """
+    Shared per-upstream rate limiter with priority queueing
+
+    Waiters poll the bucket under a threading lock rather than parking on
+    loop-bound futures, so agents' HTTP handler threads (each with its own
+    event loop) share the same quotas safely.
+    """
+
+    def __init__(self):
+        self.reserve = float(os.getenv('RATE_LIMIT_RESERVE', '1'))
+        self.max_retries = int(os.getenv('RATE_LIMIT_MAX_RETRIES', '3'))
+        self.max_poll = 0.5  # Re-check order at least this often
+
+        self._lanes: Dict[str, _Lane] = {}
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+
+        for name in DEFAULT_RATE_LIMITS:
+            self._lane(name)
+
+        logger.info("🚦 RequestScheduler initialized")
+        logger.info("   " + " | ".join(
+            f"{l.name}: {l.bucket.rate:g}/s (burst {l.bucket.burst:g})"
+            for l in self._lanes.values()))
+
+    def _lane(self, upstream: str) -> _Lane:
+        lane = self._lanes.get(upstream)
+        if lane is None:
+            rate, burst = DEFAULT_RATE_LIMITS.get(upstream, (10.0, 10))
+            # RATE_LIMIT_COINGECKO="0.5:5" -> 0.5 req/s, burst 5
+            override = os.getenv(f'RATE_LIMIT_{upstream.upper()}')
+            if override:
+                rate_str, _, burst_str = override.partition(':')
+                rate = float(rate_str)
+                burst = float(burst_str) if burst_str else max(1.0, rate)
+            lane = _Lane(upstream, rate, burst, self.reserve)
+            self._lanes[upstream] = lane
+        return lane
+
+    async def acquire(self, upstream: str, priority: Optional[int] = None) -> float:
+        """
+        Wait for a request slot on upstream
+
+        Args:
+            upstream: Upstream name (coingecko, defillama, etherscan, ...)
+            priority: Priority class (defaults to the request_priority() context)
+
+        Returns:
+            Seconds spent queued
+        """
+        if priority is None:
+            priority = _current_priority.get()
+        key = (priority, next(self._seq))
+        enqueued = time.monotonic()
+
+        with self._lock:
+            lane = self._lane(upstream)
+            lane.waiting[key[1]] = priority
+            lane.max_depth = max(lane.max_depth, len(lane.waiting))
+
+        try:
+            while True:
+                with self._lock:
+                    ahead = sum(1 for seq, p in lane.waiting.items() if (p, seq) < key)
+                    # Background work leaves the reserve for critical bursts
+                    need = 1 + (lane.reserve if priority >= Priority.BACKGROUND else 0)
+                    lane.bucket.refill()
+                    if ahead == 0 and lane.bucket.tokens >= need:
+                        lane.bucket.tokens -= 1
+                        waited = time.monotonic() - enqueued
+                        self._record(lane, priority, waited)
+                        return waited
+                    delay = lane.bucket.time_until(ahead + need)
+
+                await asyncio.sleep(min(self.max_poll, max(0.005, delay)))
+        finally:
+            with self._lock:
+                lane.waiting.pop(key[1], None)
+
+    def _record(self, lane: _Lane, priority: int, waited: float):
+        lane.requests += 1
+        lane.by_priority[priority] = lane.by_priority.get(priority, 0) + 1
+        lane.total_wait += waited
+        lane.max_wait = max(lane.max_wait, waited)
+        if waited > 0.001:
+            lane.queued += 1
+            if waited > 1.0:
+                logger.debug(f"🚦 {lane.name}: waited {waited:.2f}s for a slot")
+
+    def penalize(self, upstream: str, retry_after: Optional[float] = None):
+        """Drain the bucket after a 429 so every caller backs off together"""
+        with self._lock:
+            lane = self._lane(upstream)
+            lane.throttled += 1
+            lane.bucket.refill()
+            backoff = retry_after if retry_after else 1.0 / lane.bucket.rate
+            # Next slot opens after `backoff` seconds
+            lane.bucket.tokens = min(lane.bucket.tokens, 1 - backoff * lane.bucket.rate)
+        logger.warning(f"🚦 {upstream} throttled us - backing off {backoff:.1f}s")
+
+    @asynccontextmanager
+    async def slot(self, upstream: str, priority: Optional[int] = None):
+        """async with scheduler.slot('coingecko'): ... (one request)"""
+        await self.acquire(upstream, priority)
+        yield
+
+    async def run(
+        self,
+        upstream: str,
+        fn: Callable[[], Awaitable[Any]],
+        priority: Optional[int] = None
+    ) -> Any:
+        """
+        Run one request under the upstream's quota
+
+        fn raises RateLimitedError on a 429; the call is then re-queued
+        (after the Retry-After penalty) up to RATE_LIMIT_MAX_RETRIES times.
+
+        Args:
+            upstream: Upstream name
+            fn: Zero-argument coroutine factory performing the request
+            priority: Priority class (defaults to the request_priority() context)
+
+        Returns:
+            Result of fn
+        """
+        attempt = 0
+        while True:
+            await self.acquire(upstream, priority)
+            try:
+                return await fn()
+            except RateLimitedError as e:
+                self.penalize(upstream, e.retry_after)
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Per-upstream queue depth, wait times and throttle counts"""
+        with self._lock:
+            stats = {}
+            for lane in self._lanes.values():
+                lane.bucket.refill()
+                stats[lane.name] = {
+                    'rate_per_second': lane.bucket.rate,
+                    'burst': lane.bucket.burst,
+                    'tokens': round(lane.bucket.tokens, 2),
+                    'queue_depth': len(lane.waiting),
+                    'max_queue_depth': lane.max_depth,
+                    'requests': lane.requests,
+                    'queued_requests': lane.queued,
+                    'throttled': lane.throttled,
+                    'avg_wait_seconds': lane.total_wait / lane.requests if lane.requests else 0.0,
+                    'max_wait_seconds': lane.max_wait,
+                    'by_priority': dict(lane.by_priority)
+                }
+            return stats
+
+
+def retry_after_seconds(headers) -> Optional[float]:
+    """Parse a Retry-After header (seconds form) if present"""
+    value = headers.get('Retry-After') if headers else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+# Singleton instance
+_request_scheduler = None
+
+
+def get_request_scheduler() -> RequestScheduler:
+    """Get singleton instance of RequestScheduler"""
+    global _request_scheduler
+    if _request_scheduler is None:
+        _request_scheduler = RequestScheduler()
+    return _request_scheduler
+
+
+# Test function
+async def test_request_scheduler():
+    """Burst 20 requests at a 2/s upstream: critical work overtakes background"""
+    os.environ.setdefault('RATE_LIMIT_DEMO', '2:2')
+    scheduler = get_request_scheduler()
+    started = time.monotonic()
+    order = []
+
+    async def call(i: int, priority: int):
+        await scheduler.acquire('demo', priority)
+        order.append((i, priority, round(time.monotonic() - started, 2)))
+
+    tasks = [call(i, Priority.BACKGROUND) for i in range(15)]
+    tasks += [call(100 + i, Priority.CRITICAL) for i in range(5)]
+    await asyncio.gather(*tasks)
+
+    for i, priority, t in order:
+        logger.info(f"  request {i:3d} (priority {priority}) at {t:.2f}s")
+    logger.info(f"Stats: {scheduler.get_stats()['demo']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_request_scheduler())
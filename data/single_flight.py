@@ -0,0 +1,82 @@
+"""
+LiquidityGuard AI - Single-Flight Request Coalescing
+
+Concurrent cache misses on the same key share one in-flight upstream
+request and its result, instead of each caller hitting CoinGecko or
+DeFi Llama separately.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from loguru import logger
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls per key into one shared task
+
+    The first caller for a key starts the work; callers arriving while it
+    is still running await the same task. Once it finishes the key is
+    released, so the next miss triggers a fresh request.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+        # Stats
+        self.started = 0
+        self.shared = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Check whether a request for key is currently running on this loop"""
+        return self._get(key) is not None
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn once per key across concurrent callers
+
+        Args:
+            key: Coalescing key (e.g. the cache key)
+            fn: Zero-argument coroutine factory performing the request
+
+        Returns:
+            Result of the shared call (exceptions propagate to every caller)
+        """
+        task = self._get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t, k=key: self._release(k, t))
+            self.started += 1
+        else:
+            self.shared += 1
+            logger.debug(f"[{self.name}] Joined in-flight request: {key}")
+
+        # Shield so one cancelled caller doesn't cancel the shared request
+        return await asyncio.shield(task)
+
+    def _get(self, key: Hashable) -> Optional[asyncio.Task]:
+        """Return the running task for key if it belongs to the current loop"""
+        task = self._calls.get(key)
+        if task is None or task.done():
+            return None
+        if task.get_loop() is not asyncio.get_running_loop():
+            return None
+        return task
+
+    def _release(self, key: Hashable, task: asyncio.Task):
+        """Forget a finished task (unless a newer one replaced it)"""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(
+                f"[{self.name}] Shared request failed for {key}: {task.exception()}")
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return coalescing counters"""
+        return {
+            'started': self.started,
+            'shared': self.shared,
+            'in_flight': len(self._calls)
+        }
@@ -8,6 +8,10 @@ import aiohttp
 from typing import Dict, List, Optional
 from loguru import logger
 
+from data.http_client import get_http_session
+from data.request_scheduler import (
+    Priority, RateLimitedError, get_request_scheduler, retry_after_seconds)
+
 SUBGRAPH_URL = os.getenv(
     "LIQX_SUBGRAPH_URL", "https://api.studio.thegraph.com/query/1704206/liq-x/version/latest")
 
@@ -22,20 +26,15 @@ class SubgraphFetcher:
     async def _query(self, query: str, variables: Optional[Dict] = None) -> Dict:
         """Execute a GraphQL query against the subgraph"""
         try:
-            # Create SSL context that doesn't verify certificates (for development)
-            import ssl
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
-
-            connector = aiohttp.TCPConnector(ssl=ssl_context)
-
-            async with aiohttp.ClientSession(connector=connector) as session:
-                payload = {"query": query}
-                if variables:
-                    payload["variables"] = variables
+            session = get_http_session(verify_ssl=False)
+            payload = {"query": query}
+            if variables:
+                payload["variables"] = variables
 
+            async def request() -> Dict:
                 async with session.post(self.url, json=payload, timeout=aiohttp.ClientTimeout(total=30)) as response:
+                    if response.status == 429:
+                        raise RateLimitedError(retry_after_seconds(response.headers))
                     if response.status != 200:
                         logger.error(
                             f"Subgraph query failed with status {response.status}")
@@ -49,6 +48,9 @@ class SubgraphFetcher:
 
                     return data.get("data", {})
 
+            # Positions feed health monitoring: served ahead of strategy search
+            return await get_request_scheduler().run('thegraph', request, Priority.CRITICAL)
+
         except Exception as e:
             logger.error(f"Subgraph query error: {e}")
             return {}
@@ -0,0 +1,277 @@
+"""
+LiquidityGuard AI - Token Registry
+
+Single source of token knowledge for every agent: symbol, decimals,
+CoinGecko id and per-chain addresses (cross-chain equivalents).
+
+Indexes are built once at load time:
+- (chain, address) -> token
+- symbol / alias / CoinGecko id (case-insensitive) -> token
+
+Tokens seen on-chain but missing from the table are registered on first
+sight, keyed by their address, so positions holding them are still priced
+(CoinGecko by contract address) instead of being dropped as UNKNOWN.
+"""
+
+from typing import Dict, List, Optional
+from loguru import logger
+
+# CoinGecko asset platform ids per chain (for contract-address pricing)
+COINGECKO_PLATFORMS = {
+    "ethereum": "ethereum",
+    "arbitrum": "arbitrum-one",
+    "optimism": "optimistic-ethereum",
+    "base": "base",
+    "polygon": "polygon-pos",
+    "solana": "solana"
+}
+
+# Source: https://docs.aave.com/developers/deployed-contracts/v3-mainnet
+# and the canonical bridged/native deployments on each L2
+TOKENS: List[Dict] = [
+    {
+        "symbol": "WETH", "name": "Wrapped Ether", "decimals": 18,
+        "coingecko_id": "ethereum", "aliases": ["ETH"],
+        "addresses": {
+            "ethereum": "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2",
+            "arbitrum": "0x82aF49447D8a07e3bd95BD0d56f35241523fBab1",
+            "optimism": "0x4200000000000000000000000000000000000006",
+            "base": "0x4200000000000000000000000000000000000006",
+            "polygon": "0x7ceB23fD6bC0adD59E62ac25578270cFf1b9f619"
+        }
+    },
+    {
+        "symbol": "USDC", "name": "USD Coin", "decimals": 6,
+        "coingecko_id": "usd-coin", "aliases": [],
+        "addresses": {
+            "ethereum": "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48",
+            "arbitrum": "0xaf88d065e77c8cC2239327C5EDb3A432268e5831",
+            "optimism": "0x0b2C639c533813f4Aa9D7837CAf62653d097Ff85",
+            "base": "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913",
+            "polygon": "0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359",
+            "solana": "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+        }
+    },
+    {
+        "symbol": "USDT", "name": "Tether USD", "decimals": 6,
+        "coingecko_id": "tether", "aliases": [],
+        "addresses": {
+            "ethereum": "0xdAC17F958D2ee523a2206206994597C13D831ec7",
+            "arbitrum": "0xFd086bC7CD5C481DCC9C85ebE478A1C0b69FCbb9",
+            "optimism": "0x94b008aA00579c1307B0EF2c499aD98a8ce58e58",
+            "base": "0xfde4C96c8593536E31F229EA8f37b2ADa2699bb2"
+        }
+    },
+    {
+        "symbol": "DAI", "name": "Dai Stablecoin", "decimals": 18,
+        "coingecko_id": "dai", "aliases": [],
+        "addresses": {
+            "ethereum": "0x6B175474E89094C44Da98b954EedeAC495271d0F"
+        }
+    },
+    {
+        "symbol": "WBTC", "name": "Wrapped Bitcoin", "decimals": 8,
+        "coingecko_id": "wrapped-bitcoin", "aliases": ["BTC", "bitcoin"],
+        "addresses": {
+            "ethereum": "0x2260FAC5E5542a773Aa44fBCfeDf7C193bc2C599"
+        }
+    },
+    {
+        "symbol": "AAVE", "name": "Aave Token", "decimals": 18,
+        "coingecko_id": "aave", "aliases": [],
+        "addresses": {
+            "ethereum": "0x7Fc66500c84A76Ad7e9c93437bFc5Ac33E2DDaE9"
+        }
+    },
+    {
+        "symbol": "LINK", "name": "Chainlink", "decimals": 18,
+        "coingecko_id": "chainlink", "aliases": [],
+        "addresses": {
+            "ethereum": "0x514910771AF9Ca656af840dff83E8264EcF986CA"
+        }
+    },
+    {
+        "symbol": "UNI", "name": "Uniswap", "decimals": 18,
+        "coingecko_id": "uniswap", "aliases": [],
+        "addresses": {
+            "ethereum": "0x1f9840a85d5aF5bf1D1762F925BDADdC4201F984"
+        }
+    },
+    {
+        "symbol": "GNO", "name": "Gnosis", "decimals": 18,
+        "coingecko_id": "gnosis", "aliases": [],
+        "addresses": {
+            "ethereum": "0x6810e776880C02933D47DB1b9fc05908e5386b96"
+        }
+    },
+    {
+        "symbol": "rETH", "name": "Rocket Pool ETH", "decimals": 18,
+        "coingecko_id": "rocket-pool-eth", "aliases": [],
+        "addresses": {
+            "ethereum": "0xae78736Cd615f374D3085123A210448E74Fc6393"
+        }
+    },
+    {
+        "symbol": "PYUSD", "name": "PayPal USD", "decimals": 6,
+        "coingecko_id": "paypal-usd", "aliases": [],
+        "addresses": {
+            "ethereum": "0x6c3ea9036406852006290770BEdFcAbA0e23A0e8"
+        }
+    },
+    {
+        "symbol": "POL", "name": "Polygon Ecosystem Token", "decimals": 18,
+        "coingecko_id": "polygon-ecosystem-token", "aliases": ["MATIC"],
+        "addresses": {
+            "ethereum": "0x455e53CBB86018Ac2B8091FdaD1dC1d7a4c7eFc3",
+            "polygon": "0x0000000000000000000000000000000000001010"
+        }
+    },
+    {
+        "symbol": "SOL", "name": "Solana", "decimals": 9,
+        "coingecko_id": "solana", "aliases": [],
+        "addresses": {
+            "solana": "So11111111111111111111111111111111111111112"
+        }
+    }
+]
+
+
+def normalize_address(address: str) -> str:
+    """EVM addresses are case-insensitive; Solana (base58) ones are not"""
+    return address.lower() if address.startswith("0x") else address
+
+
+class TokenRegistry:
+    """
+    O(1) token lookups by (chain, address), symbol, alias or CoinGecko id
+    """
+
+    def __init__(self, tokens: Optional[List[Dict]] = None):
+        self._by_address: Dict[tuple, Dict] = {}
+        self._by_name: Dict[str, Dict] = {}
+
+        for token in tokens if tokens is not None else TOKENS:
+            self.register(token)
+
+        logger.info(f"🪙 TokenRegistry loaded: {len(self._by_name)} names, "
+                    f"{len(self._by_address)} addresses")
+
+    def register(self, token: Dict) -> Dict:
+        """
+        Add a token to every index
+
+        Args:
+            token: Dict with symbol, decimals, coingecko_id, aliases, addresses
+
+        Returns:
+            The registered token dict
+        """
+        token.setdefault("name", token["symbol"])
+        token.setdefault("aliases", [])
+        token.setdefault("coingecko_id", None)
+        token.setdefault("addresses", {})
+
+        for chain, address in token["addresses"].items():
+            self._by_address[(chain, normalize_address(address))] = token
+
+        names = [token["symbol"], *token["aliases"]]
+        if token["coingecko_id"]:
+            names.append(token["coingecko_id"])
+        for name in names:
+            # First registration wins (e.g. "ethereum" stays WETH)
+            self._by_name.setdefault(name.lower(), token)
+        return token
+
+    # ═══════════════════════════════════════════════════════
+    # LOOKUPS
+    # ═══════════════════════════════════════════════════════
+
+    def get(self, name: str) -> Optional[Dict]:
+        """Look up by symbol, alias, CoinGecko id or registered address"""
+        if not name:
+            return None
+        return self._by_name.get(name.lower())
+
+    def get_by_address(self, address: str, chain: str = "ethereum") -> Optional[Dict]:
+        """Look up by contract address on a chain"""
+        if not address:
+            return None
+        return self._by_address.get((chain, normalize_address(address)))
+
+    def resolve(self, address: str, chain: str = "ethereum") -> Optional[Dict]:
+        """
+        Look up by address, registering unknown tokens on first sight
+
+        Unknown tokens use their address as symbol, have no CoinGecko id and
+        unknown decimals, but can still be priced by contract address.
+
+        Returns:
+            Token dict, or None for an empty address
+        """
+        if not address:
+            return None
+
+        token = self.get_by_address(address, chain)
+        if token is None:
+            normalized = normalize_address(address)
+            token = self.register({
+                "symbol": normalized,
+                "name": f"Unlisted token {normalized}",
+                "decimals": None,
+                "addresses": {chain: address}
+            })
+            logger.warning(
+                f"🪙 Unlisted token {normalized} on {chain} - pricing by contract address")
+        return token
+
+    def get_symbol(self, address: str, chain: str = "ethereum") -> str:
+        """Token symbol for an address ("UNKNOWN" only for empty input)"""
+        token = self.resolve(address, chain)
+        return token["symbol"] if token else "UNKNOWN"
+
+    def get_decimals(self, name: str, default: Optional[int] = None) -> Optional[int]:
+        """Token decimals by symbol/alias/id"""
+        token = self.get(name)
+        if token is None or token["decimals"] is None:
+            return default
+        return token["decimals"]
+
+    def get_coingecko_id(self, name: str) -> Optional[str]:
+        """CoinGecko id by symbol/alias"""
+        token = self.get(name)
+        return token["coingecko_id"] if token else None
+
+    def get_address(self, name: str, chain: str = "ethereum") -> Optional[str]:
+        """Contract address of a token on a chain (cross-chain equivalent)"""
+        token = self.get(name)
+        return token["addresses"].get(chain) if token else None
+
+    def get_equivalent(
+        self,
+        address: str,
+        from_chain: str,
+        to_chain: str
+    ) -> Optional[str]:
+        """Address of the same token on another chain"""
+        token = self.get_by_address(address, from_chain)
+        return token["addresses"].get(to_chain) if token else None
+
+    def symbols_on(self, chain: str) -> Dict[str, str]:
+        """{lowercase address: symbol} for every known token on a chain"""
+        return {
+            address: token["symbol"]
+            for (token_chain, address), token in self._by_address.items()
+            if token_chain == chain
+        }
+
+
+# Singleton instance
+_token_registry = None
+
+
+def get_token_registry() -> TokenRegistry:
+    """Get singleton instance of TokenRegistry"""
+    global _token_registry
+    if _token_registry is None:
+        _token_registry = TokenRegistry()
+    return _token_registry
@@ -0,0 +1,269 @@
+"""
+LiquidityGuard AI - Cross-Chain Yield Spread Matrix
+
+Execution costs and net yields of every tracked opportunity, precomputed
+per (source chain, source token) and position size bucket, so strategy
+search on an alert is a lookup plus a small re-rank.
+
+- Rebuilt when the opportunity set (pools snapshot) or gas costs change
+- Net APY = stable APY - execution cost amortised over a year at the
+  bucket's position size
+- Lookups walk the nearest bucket's order only until no remaining target
+  can still reach the top at the real position size (exact ranking)
+"""
+
+import heapq
+import math
+import os
+from typing import Dict, List, Tuple
+from dotenv import load_dotenv
+from loguru import logger
+
+from data.pool_index import SUPPORTED_CHAINS, SUPPORTED_TOKENS, PoolIndex
+from data.yield_watcher import YieldWatcher, get_yield_watcher
+
+load_dotenv()
+
+# Bridge cost (USD) into a chain from elsewhere
+BRIDGE_COSTS = {
+    'solana': 15.0,     # Wormhole ETH→Solana
+    'arbitrum': 10.0,   # LayerZero/Stargate
+    'optimism': 10.0,
+    'base': 10.0
+}
+
+SWAP_COST = 5.0  # 1inch swap cost (~0.3% slippage + gas)
+
+
+def _parse_buckets(value: str) -> List[float]:
+    return sorted(float(v) for v in value.split(',') if v.strip())
+
+
+class SpreadMatrix:
+    """
+    Precomputed (source chain, source token) x size bucket -> ranked targets
+    """
+
+    def __init__(self, watcher: YieldWatcher):
+        self.watcher = watcher
+        self.size_buckets = _parse_buckets(
+            os.getenv('SPREAD_SIZE_BUCKETS', '1000,10000,100000,1000000'))
+
+        # Per-chain migration gas cost (USD) pushed by the GasEstimator;
+        # defaults to each pool's estimate
+        self.gas_costs: Dict[str, float] = {}
+        self.gas_version = 0
+
+        # (source_chain, source_token) -> {'ranked': per-bucket ranked
+        # strategies, 'min_cost'/'max_cost': execution cost range}
+        self._matrix: Dict[Tuple[str, str], Dict] = {}
+        self._sources = {(c, t) for c in SUPPORTED_CHAINS for t in SUPPORTED_TOKENS}
+        self._built_for: Tuple[int, int] = (-1, -1)  # (yields, gas) versions
+
+        # Stats
+        self.rebuilds = 0
+        self.lookups = 0
+
+    def start(self):
+        """Rebuild after every snapshot (the watcher re-ranks first) and gas change"""
+        self.watcher.fetcher.snapshot.add_listener(self.on_snapshot)
+        self.watcher.fetcher.gas_estimator.add_listener(self.update_gas_costs)
+
+    def stop(self):
+        self.watcher.fetcher.snapshot.remove_listener(self.on_snapshot)
+        self.watcher.fetcher.gas_estimator.remove_listener(self.update_gas_costs)
+
+    def on_snapshot(self, index: PoolIndex, fetched_at: float):
+        self.rebuild()
+
+    def update_gas_costs(self, gas_costs: Dict[str, float]):
+        """
+        Set per-chain execution gas costs (USD) and rebuild
+
+        Args:
+            gas_costs: {chain: usd}
+        """
+        changed = {c: v for c, v in gas_costs.items() if self.gas_costs.get(c) != v}
+        if not changed:
+            return
+        self.gas_costs.update(changed)
+        self.gas_version += 1
+        self.rebuild()
+
+    # ═══════════════════════════════════════════════════════
+    # COSTS
+    # ═══════════════════════════════════════════════════════
+
+    def execution_costs(self, source_chain: str, source_token: str, target: Dict) -> Dict:
+        """
+        Gas, bridge and swap cost (USD) of moving into a target pool
+
+        Args:
+            source_chain: Chain of the current position
+            source_token: Collateral token of the current position
+            target: Yield dict (get_all_yields format)
+
+        Returns:
+            {'gas_cost', 'bridge_cost', 'swap_cost', 'execution_cost'}
+        """
+        chain = target['chain']
+        gas_cost = self.gas_costs.get(chain, target.get('estimated_gas', 50.0))
+        bridge_cost = BRIDGE_COSTS.get(chain, 0.0) if chain != source_chain else 0.0
+        target_token = target.get('token', 'USDC')
+        swap_cost = SWAP_COST if target_token != source_token else 0.0
+        return {
+            'gas_cost': gas_cost,
+            'bridge_cost': bridge_cost,
+            'swap_cost': swap_cost,
+            'execution_cost': gas_cost + bridge_cost + swap_cost
+        }
+
+    def strategy(self, source_chain: str, source_token: str, target: Dict) -> Dict:
+        """
+        Strategy dict for moving a position into a target pool
+
+        Args:
+            source_chain: Chain of the current position
+            source_token: Collateral token of the current position
+            target: Yield dict (get_all_yields format)
+
+        Returns:
+            Strategy dict with execution costs and cross-chain/asset flags
+        """
+        costs = self.execution_costs(source_chain, source_token, target)
+        target_token = target.get('token', 'USDC')
+        return {
+            'protocol': target['protocol'],
+            'chain': target['chain'],
+            'token': target_token,
+            'apy': target['apy'],
+            'pool': target.get('pool', 'unknown'),
+            'pool_id': target.get('pool_id'),
+            'tvl': target.get('tvlUsd', 0),
+            **costs,
+            'is_cross_chain': target['chain'] != source_chain,
+            'is_cross_asset': target_token != source_token,
+            'stable_apy': target.get('stable_apy', target['apy']),
+            'apy_volatility': target.get('apy_volatility')
+        }
+
+    @staticmethod
+    def net_apy(strategy: Dict, position_size: float) -> float:
+        """Stable APY minus execution cost amortised over one year"""
+        return strategy['stable_apy'] - strategy['execution_cost'] / max(position_size, 1.0) * 100
+
+    # ═══════════════════════════════════════════════════════
+    # MATRIX
+    # ═══════════════════════════════════════════════════════
+
+    def rebuild(self):
+        """Recompute every tracked source row from the current opportunity set"""
+        targets = self.watcher.opportunities
+        self._matrix = {
+            source: self._build_row(source, targets) for source in self._sources}
+        self._built_for = (self.watcher.version, self.gas_version)
+        self.rebuilds += 1
+        logger.debug(
+            f"📐 Spread matrix rebuilt: {len(self._matrix)} sources x {len(targets)} targets x {len(self.size_buckets)} sizes")
+
+    def _build_row(self, source: Tuple[str, str], targets: List[Dict]) -> Dict:
+        source_chain, source_token = source
+        strategies = [self.strategy(source_chain, source_token, t) for t in targets]
+        costs = [s['execution_cost'] for s in strategies]
+        return {
+            'ranked': [
+                sorted(strategies, key=lambda s: self.net_apy(s, size), reverse=True)
+                for size in self.size_buckets
+            ],
+            'min_cost': min(costs, default=0.0),
+            'max_cost': max(costs, default=0.0)
+        }
+
+    def _bucket(self, position_size: float) -> int:
+        """Nearest bucket in log space ($900k ranks with $1M, not $100k)"""
+        size = math.log(max(position_size, 1.0))
+        return min(range(len(self.size_buckets)),
+                   key=lambda i: abs(math.log(self.size_buckets[i]) - size))
+
+    def get_strategies(
+        self,
+        source_chain: str,
+        source_token: str,
+        position_size: float,
+        min_apy: float = 0.0,
+        limit: int = 15
+    ) -> List[Dict]:
+        """
+        Best strategies out of a position, net of execution cost
+
+        Args:
+            source_chain: Chain of the current position
+            source_token: Collateral token of the current position
+            position_size: Position size in USD (picks the size bucket)
+            min_apy: Minimum target spot APY
+            limit: Number of strategies
+
+        Returns:
+            Strategy dicts (with costs and net_apy), best net APY first
+        """
+        self.lookups += 1
+        if self._built_for != (self.watcher.version, self.gas_version):
+            self.rebuild()
+
+        source = (source_chain, source_token)
+        row = self._matrix.get(source)
+        if row is None:
+            # New source: track it from now on
+            self._sources.add(source)
+            row = self._matrix[source] = self._build_row(source, self.watcher.opportunities)
+
+        bucket = self._bucket(position_size)
+        bucket_size = self.size_buckets[bucket]
+
+        # net(real size) = net(bucket size) + cost * shift, so each row's net
+        # at the real size is bounded by its bucket net plus the cost range
+        shift = 100 / max(bucket_size, 1.0) - 100 / max(position_size, 1.0)
+        slack = shift * (row['max_cost'] if shift > 0 else row['min_cost'])
+
+        best: List[Tuple[float, int]] = []  # min-heap of the `limit` best nets
+        picked: Dict[int, Dict] = {}
+        for i, s in enumerate(row['ranked'][bucket]):
+            if len(best) >= limit and self.net_apy(s, bucket_size) + slack <= best[0][0]:
+                break  # Rows further down can't beat the current top `limit`
+            if s['apy'] < min_apy:
+                continue
+            entry = (self.net_apy(s, position_size), -i)
+            if len(best) < limit:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                picked.pop(-heapq.heapreplace(best, entry)[1], None)
+            else:
+                continue
+            picked[i] = s
+
+        ranked = sorted(best, reverse=True)
+        return [
+            {**picked[-i], 'net_apy': net} for net, i in ranked]
+
+    def get_stats(self) -> Dict:
+        return {
+            'sources': len(self._matrix),
+            'targets': len(self.watcher.opportunities),
+            'size_buckets': self.size_buckets,
+            'yields_version': self._built_for[0],
+            'gas_version': self._built_for[1],
+            'rebuilds': self.rebuilds,
+            'lookups': self.lookups
+        }
+
+
+# Singleton instance
+_spread_matrix = None
+
+
+def get_spread_matrix() -> SpreadMatrix:
+    """Get singleton instance of SpreadMatrix"""
+    global _spread_matrix
+    if _spread_matrix is None:
+        _spread_matrix = SpreadMatrix(get_yield_watcher())
+    return _spread_matrix
@@ -0,0 +1,242 @@
+"""
+LiquidityGuard AI - Yield Opportunity Watcher
+
+Diffs successive pools snapshots and pushes changes, so agents hold an
+always-current ranked opportunity set instead of querying DeFi Llama
+inside alert handling.
+
+Events (dicts with 'type'):
+- entered:     a pool joined the top-k opportunity set
+- left:        a pool dropped out of it
+- apy_changed: a top-k pool's APY moved more than YIELD_CHANGE_THRESHOLD
+               points since its last event
+"""
+
+import asyncio
+import inspect
+import os
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional
+from dotenv import load_dotenv
+from loguru import logger
+
+from data.pool_index import PoolIndex, top_k_diverse
+from data.protocol_data import ProtocolDataFetcher, get_protocol_data_fetcher
+
+load_dotenv()
+
+EVENT_TYPES = ('entered', 'left', 'apy_changed')
+
+
+class YieldWatcher:
+    """
+    Ranked opportunity set kept current by pools snapshot refreshes
+    """
+
+    def __init__(self, fetcher: ProtocolDataFetcher):
+        self.fetcher = fetcher
+        self.top_k = int(os.getenv('YIELD_WATCH_TOP_K', '50'))
+        self.max_per_protocol = 3
+        # APY move (percentage points) that fires apy_changed
+        self.threshold = float(os.getenv('YIELD_CHANGE_THRESHOLD', '0.5'))
+
+        # Current ranked set (stability-adjusted, best first)
+        self.opportunities: List[Dict] = []
+        self._by_pool: Dict[str, Dict] = {}
+        self._refs: Dict[str, float] = {}  # pool_id -> APY at last event
+        self.version = 0
+        self.updated_at: Optional[float] = None
+
+        self.events: deque = deque(maxlen=200)
+        self._subscribers: Dict[int, Dict] = {}
+        self._next_subscriber_id = 1
+        self._background_tasks: set = set()
+        self._running = False
+
+    def start(self):
+        """Follow the shared pools snapshot (idempotent)"""
+        if self._running:
+            return
+        self._running = True
+        self.fetcher.snapshot.add_listener(self.on_snapshot)
+        logger.info(
+            f"👀 Yield watcher started (top {self.top_k}, ±{self.threshold:.2f} APY points)")
+
+    def stop(self):
+        self._running = False
+        self.fetcher.snapshot.remove_listener(self.on_snapshot)
+
+    # ═══════════════════════════════════════════════════════
+    # SNAPSHOT DIFF
+    # ═══════════════════════════════════════════════════════
+
+    def on_snapshot(self, index: PoolIndex, fetched_at: float):
+        """Re-rank a new snapshot and publish what changed (snapshot listener)"""
+        if index.version <= self.version:
+            return
+
+        history = self.fetcher.apy_history
+
+        def score(row: int) -> float:
+            return history.stability_adjusted_apy(index.pool_ids[row], index.apy[row])
+
+        top = top_k_diverse(
+            index.rows(index.lending), self.top_k, self.max_per_protocol,
+            group=index.protocol, score=score)
+        opportunities = [
+            self.fetcher.yield_record(index, row, 'stability') for row in top]
+        by_pool = {o['pool_id']: o for o in opportunities}
+
+        first = self.version == 0
+        self.version = index.version
+        previous = self._by_pool
+        self.opportunities = opportunities
+        self._by_pool = by_pool
+        self.updated_at = fetched_at
+
+        if first:
+            self._refs = {pid: o['apy'] for pid, o in by_pool.items()}
+            logger.info(f"👀 Tracking {len(opportunities)} yield opportunities")
+            return
+
+        events = []
+        for rank, opportunity in enumerate(opportunities, 1):
+            pool_id = opportunity['pool_id']
+            if pool_id not in previous:
+                self._refs[pool_id] = opportunity['apy']
+                events.append(self._event('entered', opportunity, rank))
+                continue
+
+            reference = self._refs.get(pool_id, opportunity['apy'])
+            if abs(opportunity['apy'] - reference) >= self.threshold:
+                self._refs[pool_id] = opportunity['apy']
+                events.append(self._event(
+                    'apy_changed', opportunity, rank, previous_apy=reference))
+
+        for pool_id, opportunity in previous.items():
+            if pool_id not in by_pool:
+                self._refs.pop(pool_id, None)
+                events.append(self._event('left', opportunity, None))
+
+        if events:
+            counts = {t: sum(1 for e in events if e['type'] == t) for t in EVENT_TYPES}
+            logger.info(
+                f"👀 Yield changes: +{counts['entered']} / -{counts['left']} / ~{counts['apy_changed']}")
+        for event in events:
+            self.events.append(event)
+            self._publish(event)
+
+    def _event(self, event_type: str, opportunity: Dict, rank: Optional[int], **extra) -> Dict:
+        return {
+            'type': event_type,
+            'pool_id': opportunity['pool_id'],
+            'pool': opportunity['pool'],
+            'protocol': opportunity['protocol'],
+            'chain': opportunity['chain'],
+            'token': opportunity['token'],
+            'apy': opportunity['apy'],
+            'stable_apy': opportunity.get('stable_apy'),
+            'rank': rank,
+            'version': self.version,
+            'timestamp': time.time(),
+            **extra
+        }
+
+    # ═══════════════════════════════════════════════════════
+    # SUBSCRIPTIONS
+    # ═══════════════════════════════════════════════════════
+
+    def subscribe(
+        self,
+        callback: Callable,
+        event_types: Optional[Iterable[str]] = None
+    ) -> int:
+        """
+        Register a callback for opportunity events
+
+        Args:
+            callback: callback(event); coroutine functions are scheduled on
+                the running loop
+            event_types: Subset of EVENT_TYPES (default: all)
+
+        Returns:
+            Subscription id for unsubscribe()
+        """
+        subscription_id = self._next_subscriber_id
+        self._next_subscriber_id += 1
+        self._subscribers[subscription_id] = {
+            'callback': callback,
+            'types': set(event_types) if event_types else set(EVENT_TYPES)
+        }
+        return subscription_id
+
+    def unsubscribe(self, subscription_id: int):
+        """Remove an event subscription"""
+        self._subscribers.pop(subscription_id, None)
+
+    def _publish(self, event: Dict):
+        for subscription in list(self._subscribers.values()):
+            if event['type'] not in subscription['types']:
+                continue
+            try:
+                result = subscription['callback'](event)
+                if inspect.isawaitable(result):
+                    task = asyncio.ensure_future(result)
+                    self._background_tasks.add(task)
+                    task.add_done_callback(self._background_tasks.discard)
+            except Exception as e:
+                logger.error(f"Yield event callback failed: {e}")
+
+    # ═══════════════════════════════════════════════════════
+    # QUERIES
+    # ═══════════════════════════════════════════════════════
+
+    def get_opportunities(
+        self,
+        token: Optional[str] = None,
+        min_apy: float = 0.0,
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Current ranked opportunities (no I/O)
+
+        Args:
+            token: Optional token filter (USDC, ETH, etc.)
+            min_apy: Minimum spot APY
+            limit: Maximum number of opportunities
+
+        Returns:
+            Yield dicts (get_all_yields format), best first
+        """
+        results = []
+        for opportunity in self.opportunities:
+            if opportunity['apy'] < min_apy:
+                continue
+            if token and opportunity['token'] != token.upper():
+                continue
+            results.append(dict(opportunity))
+            if limit and len(results) >= limit:
+                break
+        return results
+
+    def get_stats(self) -> Dict:
+        return {
+            'opportunities': len(self.opportunities),
+            'version': self.version,
+            'updated_at': self.updated_at,
+            'events': len(self.events),
+            'subscribers': len(self._subscribers)
+        }
+
+
+# Singleton instance
+_yield_watcher = None
+
+
+def get_yield_watcher() -> YieldWatcher:
+    """Get singleton instance of YieldWatcher"""
+    global _yield_watcher
+    if _yield_watcher is None:
+        _yield_watcher = YieldWatcher(get_protocol_data_fetcher())
+    return _yield_watcher
@@ -25,7 +25,30 @@ export async function GET(request: Request) {
       return NextResponse.json(mockVolatility);
     }
 
-    // Presentation mode: calculate from real price data
+    // Presentation mode: prefer the Position Monitor's rolling statistics
+    try {
+      const agentResponse = await fetch(
+        `${API_CONFIG.agents.positionMonitor}/market/volatility?token=${encodeURIComponent(token)}`,
+        { cache: 'no-store' }
+      );
+      if (agentResponse.ok) {
+        const stats = await agentResponse.json();
+        const volatility24h: number = stats.volatility_24h;
+        const result: VolatilityData = {
+          token,
+          volatility24h,
+          volatility7d: stats.volatility_7d,
+          riskLevel: volatility24h < 0.02 ? 'low' : volatility24h < 0.05 ? 'medium' : 'high',
+          trendDirection: stats.trend,
+          timestamp: Date.now(),
+        };
+        return NextResponse.json(result);
+      }
+    } catch (error) {
+      console.warn('Position Monitor volatility unavailable, using CoinGecko:', error);
+    }
+
+    // Fallback: calculate from CoinGecko price data
     try {
       // Fetch 24h price data
       const response24h = await fetch(